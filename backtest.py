@@ -0,0 +1,258 @@
+"""Vectorized historical backtest of the engine's multi-timeframe entry rule.
+
+Signals are computed once per timeframe over the whole history with
+`signal_grid` (same output as `detect_signals`), then mapped onto the base
+(5-minute) timeline. A higher-timeframe bar only counts once it has closed, so
+the base bar closing at 10:05 sees the 1h bar of 09:00 but not the one of 10:00.
+As in `main()`, a side is taken when at least `agree` timeframes had an entry in
+their last `lookback` bars.
+
+Trades are filled at the next base bar's open, pay half the spread plus the
+slippage on entry and on exit, and leave at an ATR stop, an ATR target, the
+opposite signal or after `max_hold` bars. When a bar touches both stop and
+target the stop is assumed to have been hit first.
+
+Usage:
+    python backtest.py --symbol XAU/USD --stop-atr 2 --target-atr 3 --spread 0.3
+"""
+import argparse
+import logging
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import data_cache
+from intervals import interval_timedelta
+from python_signal_engine import TIMEFRAMES, EMA_LENGTH, SYMBOL
+from resample import resample_ohlc
+from signal_grid import detect_signals_grid, _true_range, _atr
+
+Costs = namedtuple('Costs', ['spread', 'slippage'])
+Stops = namedtuple('Stops', ['stop_atr', 'target_atr', 'atr_length', 'max_hold'])
+
+NO_COSTS = Costs(spread=0.0, slippage=0.0)
+DEFAULT_STOPS = Stops(stop_atr=2.0, target_atr=3.0, atr_length=14, max_hold=None)
+
+
+def load_frames(symbol, intervals=TIMEFRAMES, htf_source='resample', start=None, end=None):
+    """Load the archived history of every interval; the first one is the base series.
+
+    Bars come from the long-history archive (see data_cache.load_history), so
+    backtests are not limited to the live cache's rows. With
+    htf_source='resample' higher timeframes are built from the base series (as
+    the engine does by default), otherwise they are read as stored.
+    """
+    base = data_cache.load_history(symbol, intervals[0], start=start, end=end)
+    if base is None or len(base) == 0:
+        raise ValueError(f"No cached {intervals[0]} bars for {symbol}")
+    frames = {intervals[0]: base}
+    for interval in intervals[1:]:
+        df = data_cache.load_history(symbol, interval, start=start, end=end) if htf_source != 'resample' else None
+        frames[interval] = df if df is not None and len(df) else resample_ohlc(base, interval)
+    return frames
+
+
+def close_times(df, interval):
+    """int64 ns close time of every bar (bar start + interval)."""
+    starts = pd.to_datetime(df['datetime']).to_numpy(dtype='datetime64[ns]').view('int64')
+    return starts + interval_timedelta(interval).value
+
+
+def timeframe_signals(frames, params):
+    """Evaluate every timeframe for each (ema_length, rsi_length, band_mult) in `params`.
+
+    Returns {interval: (long_entry, short_entry)} with (len(params), bars) bool arrays.
+    """
+    out = {}
+    for interval, df in frames.items():
+        grid = detect_signals_grid(df, params)
+        out[interval] = (grid.long_entry, grid.short_entry)
+    return out
+
+
+def _recent_any(flags, lookback):
+    """True where any of the last `lookback` bars (including the current one) is True."""
+    counts = np.cumsum(flags, axis=-1, dtype=np.int32)
+    shifted = np.zeros_like(counts)
+    shifted[..., lookback:] = counts[..., :-lookback]
+    return counts - shifted > 0
+
+
+def base_index(frames, intervals=None):
+    """For each interval, the index of its last closed bar at every base bar close (-1 if none)."""
+    intervals = list(intervals or frames)
+    base_close = close_times(frames[intervals[0]], intervals[0])
+    out = {intervals[0]: np.arange(len(base_close))}
+    for interval in intervals[1:]:
+        out[interval] = np.searchsorted(close_times(frames[interval], interval), base_close, side='right') - 1
+    return out
+
+
+def agreement(signals, index, lookback=3):
+    """Count, per base bar, the timeframes with a long / short entry in their last `lookback` closed bars.
+
+    `signals` comes from `timeframe_signals`, `index` from `base_index`.
+    Returns (long_agree, short_agree) int arrays shaped (params, base bars).
+    """
+    long_agree = short_agree = 0
+    for interval, (long_entry, short_entry) in signals.items():
+        idx = index[interval]
+        seen = idx >= 0
+        safe = np.where(seen, idx, 0)
+        long_agree = long_agree + (_recent_any(long_entry, lookback)[:, safe] & seen)
+        short_agree = short_agree + (_recent_any(short_entry, lookback)[:, safe] & seen)
+    return long_agree, short_agree
+
+
+def entry_sides(long_agree, short_agree, agree=2):
+    """+1 / -1 / 0 per bar; long wins when both sides reach `agree`, as in main()."""
+    return np.where(long_agree >= agree, 1, np.where(short_agree >= agree, -1, 0)).astype(np.int8)
+
+
+def _first_true(test, start, stop, chunk=512):
+    """Index of the first bar in [start, stop) where test(slice) is True, or None.
+
+    Scans in growing chunks so short trades only touch a few bars.
+    """
+    pos = start
+    while pos < stop:
+        end = min(stop, pos + chunk)
+        hit = np.flatnonzero(test(slice(pos, end)))
+        if len(hit):
+            return pos + hit[0]
+        pos = end
+        chunk *= 2
+    return None
+
+
+def simulate(base, sides, stops=DEFAULT_STOPS, costs=NO_COSTS):
+    """Simulate one position at a time from a +1/-1/0 `sides` array on the base bars.
+
+    Returns a trades DataFrame with entry/exit times and prices, side, pnl (price
+    units per unit traded, after costs), exit reason and bars held.
+    """
+    high = base['high'].to_numpy(dtype=float)
+    low = base['low'].to_numpy(dtype=float)
+    close = base['close'].to_numpy(dtype=float)
+    atr = _atr(_true_range(high, low, close), stops.atr_length)
+    return simulate_arrays(pd.to_datetime(base['datetime']).to_numpy(), base['open'].to_numpy(dtype=float),
+                           high, low, close, atr, sides, stops, costs)
+
+
+def simulate_arrays(times, open_, high, low, close, atr, sides, stops=DEFAULT_STOPS, costs=NO_COSTS):
+    """`simulate` on plain (possibly memory-mapped) arrays with a precomputed ATR."""
+    sides = np.asarray(sides)
+    n = len(close)
+    cost = costs.spread / 2 + costs.slippage
+
+    signal_bars = np.flatnonzero(sides[:-1] != 0)
+    rows = []
+    i = 0
+    while True:
+        k = np.searchsorted(signal_bars, i)
+        if k >= len(signal_bars):
+            break
+        s = signal_bars[k]
+        side = int(sides[s])
+        if not atr[s] > 0:
+            i = s + 1
+            continue
+        entry_bar = s + 1
+        entry = open_[entry_bar] + side * cost
+        stop = entry - side * stops.stop_atr * atr[s]
+        target = entry + side * stops.target_atr * atr[s]
+        last = n if stops.max_hold is None else min(n, entry_bar + stops.max_hold)
+        if side == 1:
+            tests = (('stop', lambda sl: low[sl] <= stop), ('target', lambda sl: high[sl] >= target))
+        else:
+            tests = (('stop', lambda sl: high[sl] >= stop), ('target', lambda sl: low[sl] <= target))
+        tests += (('reverse', lambda sl: sides[sl] == -side),)
+        j, reason = last - 1, ('timeout' if last < n else 'end')
+        for name, test in tests:
+            # earlier tests win ties: stop before target before reverse on the same bar
+            hit = _first_true(test, entry_bar, j + 1)
+            if hit is not None and (hit < j or reason in ('timeout', 'end')):
+                j, reason = hit, name
+        if reason == 'stop':
+            # a gap through the stop fills at the open
+            price = open_[j] if (open_[j] - stop) * side < 0 else stop
+        elif reason == 'target':
+            price = open_[j] if (open_[j] - target) * side > 0 else target
+        else:
+            price = close[j]
+        exit_price = price - side * cost
+        rows.append((times[entry_bar], times[j], side, entry, exit_price, (exit_price - entry) * side, reason,
+                     j - entry_bar + 1))
+        # a reverse signal on the exit bar opens the next trade
+        i = j if reason == 'reverse' else j + 1
+    return pd.DataFrame(rows, columns=['entry_time', 'exit_time', 'side', 'entry', 'exit', 'pnl', 'reason', 'bars'])
+
+
+def summarize(trades):
+    """Trade count, PnL, hit rate, profit factor and maximum drawdown of the cumulative PnL."""
+    pnl = trades['pnl'].to_numpy(dtype=float)
+    equity = np.cumsum(pnl)
+    drawdown = np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:] - equity if len(pnl) else np.zeros(0)
+    gains = pnl[pnl > 0].sum()
+    losses = -pnl[pnl < 0].sum()
+    return {
+        'trades': int(len(pnl)),
+        'long_trades': int((trades['side'] == 1).sum()),
+        'short_trades': int((trades['side'] == -1).sum()),
+        'total_pnl': float(pnl.sum()),
+        'avg_pnl': float(pnl.mean()) if len(pnl) else 0.0,
+        'hit_rate': float((pnl > 0).mean()) if len(pnl) else 0.0,
+        'profit_factor': float(gains / losses) if losses > 0 else float('inf') if gains > 0 else 0.0,
+        'max_drawdown': float(drawdown.max()) if len(drawdown) else 0.0,
+    }
+
+
+def run_backtest(frames, ema_length=EMA_LENGTH, rsi_length=14, band_mult=1.2, agree=2, lookback=3,
+                 stops=DEFAULT_STOPS, costs=NO_COSTS):
+    """Backtest one parameter set over `frames` ({interval: DataFrame}, base interval first).
+
+    Returns (trades DataFrame, summary dict).
+    """
+    params = [(ema_length, rsi_length, band_mult)]
+    signals = timeframe_signals(frames, params)
+    long_agree, short_agree = agreement(signals, base_index(frames), lookback)
+    sides = entry_sides(long_agree[0], short_agree[0], agree)
+    trades = simulate(frames[next(iter(frames))], sides, stops, costs)
+    return trades, summarize(trades)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbol', default=SYMBOL)
+    parser.add_argument('--htf-source', choices=('resample', 'cache'), default='resample')
+    parser.add_argument('--start', help='first bar (timestamp) of the history to test')
+    parser.add_argument('--end', help='end of the history to test (exclusive)')
+    parser.add_argument('--ema-length', type=int, default=EMA_LENGTH)
+    parser.add_argument('--rsi-length', type=int, default=14)
+    parser.add_argument('--band-mult', type=float, default=1.2)
+    parser.add_argument('--agree', type=int, default=2, help='timeframes that must agree')
+    parser.add_argument('--lookback', type=int, default=3, help='bars per timeframe checked for an entry')
+    parser.add_argument('--stop-atr', type=float, default=DEFAULT_STOPS.stop_atr)
+    parser.add_argument('--target-atr', type=float, default=DEFAULT_STOPS.target_atr)
+    parser.add_argument('--atr-length', type=int, default=DEFAULT_STOPS.atr_length)
+    parser.add_argument('--max-hold', type=int, default=None, help='exit after this many base bars')
+    parser.add_argument('--spread', type=float, default=0.0, help='full bid/ask spread in price units')
+    parser.add_argument('--slippage', type=float, default=0.0, help='price units lost on every fill')
+    parser.add_argument('--trades-csv', help='write the trade list to this file')
+    args = parser.parse_args()
+
+    frames = load_frames(args.symbol, htf_source=args.htf_source, start=args.start, end=args.end)
+    logging.info(f"Backtesting {args.symbol}: " + ", ".join(f"{i}={len(df)} bars" for i, df in frames.items()))
+    trades, summary = run_backtest(
+        frames, args.ema_length, args.rsi_length, args.band_mult, args.agree, args.lookback,
+        stops=Stops(args.stop_atr, args.target_atr, args.atr_length, args.max_hold),
+        costs=Costs(args.spread, args.slippage))
+    for key, value in summary.items():
+        print(f"{key:>14}: {value:.4f}" if isinstance(value, float) else f"{key:>14}: {value}")
+    if args.trades_csv:
+        trades.to_csv(args.trades_csv, index=False)
+
+
+if __name__ == '__main__':
+    main()
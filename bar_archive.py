@@ -0,0 +1,311 @@
+"""Long-history OHLC archive: one memory-mapped file of fixed-width records per series.
+
+A file is a 64-byte header (magic, version, record size, record count) followed
+by 48-byte records (int64 epoch-ns `datetime`, float64 `open`, `high`, `low`,
+`close`, `volume`) sorted by time with unique timestamps. Timezone-aware input
+is stored as UTC.
+
+Files are opened with np.memmap, so a series of tens of millions of bars costs
+no RAM until it is read. `BarArchive.range(start, end)` finds its bounds by
+binary search over the mapped times (a few dozen record reads) and returns a
+zero-copy slice of the records; `to_frame` copies a slice into a DataFrame.
+
+`append` writes newer bars at the tail in O(k) and only then bumps the record
+count in the header, so readers never see a partial record. `merge` also
+updates bars already archived in place; bars that fall between archived ones
+trigger a rewrite into a temporary file that replaces the original.
+
+Writers in any process (the engine appending closed bars, a bootstrap import
+merging history) serialize on an exclusive lock of a `.lock` file next to the
+archive, so an append cannot land in a file a concurrent merge is replacing.
+"""
+import os
+import struct
+import threading
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+import pandas as pd
+
+import file_lock
+
+MAGIC = b'OHLCARC1'
+VERSION = 1
+SUFFIX = '.bars'
+RECORD = np.dtype([('datetime', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'),
+                   ('close', '<f8'), ('volume', '<f8')])
+_HEADER = struct.Struct('<8sIIq')
+HEADER_SIZE = 64
+# Bytes copied at a time when a merge rewrites the file
+_COPY_CHUNK = 16 * 1024 * 1024
+
+_lock = threading.RLock()
+
+
+def to_records(df):
+    """Cache-layout frame -> sorted RECORD array with unique times (last row wins)."""
+    dt = pd.to_datetime(df['datetime'])
+    if getattr(dt.dt, 'tz', None) is not None:
+        dt = dt.dt.tz_convert('UTC').dt.tz_localize(None)
+    recs = np.empty(len(df), dtype=RECORD)
+    recs['datetime'] = dt.to_numpy(dtype='datetime64[ns]').view('int64')
+    for name in RECORD.names[1:]:
+        recs[name] = df[name].to_numpy(dtype='float64') if name in df.columns else (1.0 if name == 'volume' else np.nan)
+    return _dedupe_sorted(recs)
+
+
+def _dedupe_sorted(recs):
+    t = recs['datetime']
+    if len(t) < 2 or np.all(t[1:] > t[:-1]):
+        return recs
+    order = np.argsort(t, kind='stable')
+    t = t[order]
+    keep = np.empty(len(t), dtype=bool)
+    keep[:-1] = t[1:] != t[:-1]
+    keep[-1] = True
+    return recs[order[keep]]
+
+
+def to_frame(recs):
+    """DataFrame copy (naive UTC datetimes) of a record slice."""
+    data = {'datetime': pd.to_datetime(np.array(recs['datetime']).view('datetime64[ns]'))}
+    for name in RECORD.names[1:]:
+        data[name] = np.array(recs[name])
+    return pd.DataFrame(data)
+
+
+def _read_header(f):
+    magic, version, size, count = _HEADER.unpack(f.read(_HEADER.size))
+    if magic != MAGIC or size != RECORD.itemsize:
+        raise ValueError(f"Not a bar archive: {getattr(f, 'name', f)}")
+    if version != VERSION:
+        raise ValueError(f"Unsupported bar archive version {version}")
+    return count
+
+
+def _write_header(f, count):
+    f.seek(0)
+    f.write(_HEADER.pack(MAGIC, VERSION, RECORD.itemsize, count).ljust(HEADER_SIZE, b'\0'))
+
+
+def _locked(path):
+    """The archive's write lock (a `.lock` file next to it), shared with other processes."""
+    return file_lock.locked(path + '.lock', _lock)
+
+
+def _timestamp_ns(value):
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return ts.value
+
+
+class BarArchive:
+    """One archive file. Reads map it on demand; writes go through append/merge (single writer)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._map = None
+        self._map_key = None
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def __len__(self):
+        if not self.exists():
+            return 0
+        with open(self.path, 'rb') as f:
+            return _read_header(f)
+
+    def records(self):
+        """All records as a read-only memmap (empty array when there are none)."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return np.empty(0, dtype=RECORD)
+        key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if self._map is None or self._map_key != key:
+            count = len(self)
+            self._map = (np.memmap(self.path, dtype=RECORD, mode='r', offset=HEADER_SIZE, shape=(count,))
+                         if count else np.empty(0, dtype=RECORD))
+            self._map_key = key
+        return self._map
+
+    def search(self, ts, side='left'):
+        """Index of `ts` (epoch ns or timestamp) among the archived times, by binary search."""
+        times = self.records()['datetime']
+        ts = ts if isinstance(ts, (int, np.integer)) else _timestamp_ns(ts)
+        return (bisect_left if side == 'left' else bisect_right)(times, ts)
+
+    def range(self, start=None, end=None):
+        """Zero-copy records with start <= datetime < end (either bound may be None)."""
+        recs = self.records()
+        lo = 0 if start is None else self.search(start, 'left')
+        hi = len(recs) if end is None else self.search(end, 'left')
+        return recs[lo:hi]
+
+    def tail(self, n):
+        recs = self.records()
+        return recs[max(0, len(recs) - int(n)):]
+
+    def last_time(self):
+        recs = self.records()
+        return int(recs['datetime'][-1]) if len(recs) else None
+
+    def append(self, df):
+        """Add bars newer than the last archived one at the tail; returns how many were written."""
+        recs = df if isinstance(df, np.ndarray) else to_records(df)
+        if len(recs) == 0:
+            return 0
+        with _locked(self.path):
+            last = self.last_time()
+            if last is not None and recs['datetime'][0] <= last:
+                raise ValueError(f"Bars from {recs['datetime'][0]} are not newer than the archive ({last})")
+            self._append(recs)
+        return len(recs)
+
+    def _append(self, recs):
+        with _locked(self.path):
+            self._append_locked(recs)
+
+    def _append_locked(self, recs):
+        if not self.exists():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'wb') as f:
+                _write_header(f, 0)
+        with open(self.path, 'r+b') as f:
+            count = _read_header(f)
+            f.seek(HEADER_SIZE + count * RECORD.itemsize)
+            f.write(recs.tobytes())
+            f.truncate()
+            f.flush()
+            # the count goes last, so a crash mid-write leaves the old series intact
+            _write_header(f, count + len(recs))
+
+    def merge(self, df):
+        """Merge bars in any order: update archived times in place, append newer ones, rewrite for the rest.
+
+        Returns {'appended', 'updated', 'inserted'} row counts.
+        """
+        recs = df if isinstance(df, np.ndarray) else to_records(df)
+        stats = {'appended': 0, 'updated': 0, 'inserted': 0}
+        if len(recs) == 0:
+            return stats
+        with _locked(self.path):
+            last = self.last_time()
+            if last is None or recs['datetime'][0] > last:
+                self._append(recs)
+                stats['appended'] = len(recs)
+                return stats
+            old = recs[recs['datetime'] <= last]
+            newer = recs[recs['datetime'] > last]
+            # only the archived span the old bars fall into is read into memory
+            first = self.search(int(old['datetime'][0]))
+            stop = self.search(int(old['datetime'][-1]), 'right')
+            region = np.array(self.records()[first:stop])
+            pos = np.searchsorted(region['datetime'], old['datetime'])
+            if len(region):
+                found = region['datetime'][np.minimum(pos, len(region) - 1)] == old['datetime']
+            else:
+                found = np.zeros(len(old), dtype=bool)
+            if len(region) and found.all():
+                with open(self.path, 'r+b') as f:
+                    if pos[-1] - pos[0] + 1 == len(pos):
+                        f.seek(HEADER_SIZE + (first + int(pos[0])) * RECORD.itemsize)
+                        f.write(old.tobytes())
+                    else:
+                        for i, rec in zip(pos, old):
+                            f.seek(HEADER_SIZE + (first + int(i)) * RECORD.itemsize)
+                            f.write(rec.tobytes())
+                stats['updated'] = len(old)
+            else:
+                self._rewrite(first, stop, _dedupe_sorted(np.concatenate([region, old])))
+                stats['updated'] = int(found.sum())
+                stats['inserted'] = len(old) - stats['updated']
+            if len(newer):
+                self._append(newer)
+                stats['appended'] = len(newer)
+            self._map = None
+        return stats
+
+    def merge_from(self, recs, block=1_000_000):
+        """Merge a large sorted, unique-time record array (e.g. another archive's memmap) with bounded memory.
+
+        Newer records are appended; otherwise both sides are streamed block by
+        block into a temporary file that replaces this one, so at most two
+        blocks are in memory. Ties take the incoming record. Returns
+        {'appended', 'updated', 'inserted'} like merge.
+        """
+        stats = {'appended': 0, 'updated': 0, 'inserted': 0}
+        if len(recs) == 0:
+            return stats
+        with _locked(self.path):
+            last = self.last_time()
+            if last is None or recs['datetime'][0] > last:
+                for i in range(0, len(recs), block):
+                    self._append(np.ascontiguousarray(recs[i:i + block]))
+                stats['appended'] = len(recs)
+                return stats
+            mine = self.records()
+            n_mine, n_new = len(mine), len(recs)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            i = j = written = 0
+            try:
+                with open(tmp, 'wb') as dst:
+                    _write_header(dst, 0)
+                    while i < n_mine or j < n_new:
+                        a = np.array(mine[i:i + block])
+                        b = np.array(recs[j:j + block])
+                        # merge up to the smaller of the two blocks' last times, so neither side runs ahead
+                        cut = min(a['datetime'][-1] if i + block < n_mine else np.iinfo(np.int64).max,
+                                  b['datetime'][-1] if j + block < n_new else np.iinfo(np.int64).max)
+                        a = a[:np.searchsorted(a['datetime'], cut, side='right')]
+                        b = b[:np.searchsorted(b['datetime'], cut, side='right')]
+                        both = np.concatenate([a, b])
+                        merged = _dedupe_sorted(both)
+                        stats['updated'] += len(both) - len(merged)
+                        dst.write(merged.tobytes())
+                        written += len(merged)
+                        i, j = i + len(a), j + len(b)
+                    _write_header(dst, written)
+                os.replace(tmp, self.path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            self._map = None
+            after = np.searchsorted(recs['datetime'], last, side='right')
+            stats['appended'] = int(n_new - after)
+            stats['inserted'] = n_new - stats['appended'] - stats['updated']
+        return stats
+
+    def _rewrite(self, first, stop, middle):
+        """Replace records [first, stop) with `middle` through a temporary file; the rest is copied in chunks."""
+        with _locked(self.path):
+            self._rewrite_locked(first, stop, middle)
+
+    def _rewrite_locked(self, first, stop, middle):
+        count = len(self)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(self.path, 'rb') as src, open(tmp, 'wb') as dst:
+                _write_header(dst, 0)
+                src.seek(HEADER_SIZE)
+                _copy(src, dst, first * RECORD.itemsize, self.path)
+                dst.write(middle.tobytes())
+                src.seek(HEADER_SIZE + stop * RECORD.itemsize)
+                _copy(src, dst, (count - stop) * RECORD.itemsize, self.path)
+                _write_header(dst, first + len(middle) + count - stop)
+            os.replace(tmp, self.path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self._map = None
+
+
+def _copy(src, dst, nbytes, path):
+    while nbytes:
+        chunk = src.read(min(_COPY_CHUNK, nbytes))
+        if not chunk:
+            raise ValueError(f"Bar archive {path} is shorter than its header says")
+        dst.write(chunk)
+        nbytes -= len(chunk)
@@ -0,0 +1,73 @@
+"""Wake the engine just after bar closes instead of on a fixed timer.
+
+Bars are on the same epoch-aligned grid as `resample` (15min bars close at
+:00/:15/:30/:45, 1h bars on the hour, weekly bars on Monday). `BarScheduler.wait()`
+sleeps until `delay` seconds after the next close of any tracked interval and
+returns the intervals that closed since the previous call, so the caller only
+fetches and evaluates the timeframes that actually rolled. An interval whose
+close was missed (e.g. a slow cycle) is still reported on the next call.
+"""
+import time
+
+from intervals import interval_seconds
+
+# Monday 1970-01-05, the first week boundary after the epoch
+_WEEK_ORIGIN = 4 * 86400
+
+
+def _grid(interval):
+    if interval.endswith('month'):
+        raise ValueError(f"Monthly bars have no fixed close grid: {interval!r}")
+    return interval_seconds(interval), _WEEK_ORIGIN if interval.endswith('week') else 0
+
+
+def last_close(interval, now):
+    """Epoch seconds of the most recent bar close at or before `now`."""
+    step, origin = _grid(interval)
+    return (now - origin) // step * step + origin
+
+
+def next_close(interval, now):
+    """Epoch seconds of the first bar close strictly after `now`."""
+    step, _ = _grid(interval)
+    return last_close(interval, now) + step
+
+
+class BarScheduler:
+    """Tracks bar closes of several intervals; `wait()` returns the ones that rolled."""
+
+    def __init__(self, intervals, delay=3.0, clock=time.time, sleep=time.sleep):
+        self.intervals = tuple(intervals)
+        self.delay = float(delay)
+        self._clock = clock
+        self._sleep = sleep
+        self._seen = None
+        for interval in self.intervals:
+            _grid(interval)
+
+    def due(self, now=None):
+        """Intervals with a close (plus delay) since the last call; all of them on the first call."""
+        now = self._clock() if now is None else now
+        closes = {i: last_close(i, now - self.delay) for i in self.intervals}
+        if self._seen is None:
+            rolled = self.intervals
+        else:
+            rolled = tuple(i for i in self.intervals if closes[i] > self._seen[i])
+        self._seen = closes
+        return rolled
+
+    def next_wake(self, now=None):
+        """Epoch seconds of the next close of any interval, plus the delay."""
+        now = self._clock() if now is None else now
+        return min(next_close(i, now - self.delay) for i in self.intervals) + self.delay
+
+    def wait(self):
+        """Return the intervals that rolled, sleeping until the next close if none has yet.
+
+        The first call returns every interval without sleeping.
+        """
+        while True:
+            rolled = self.due()
+            if rolled:
+                return rolled
+            self._sleep(max(0.0, self.next_wake() - self._clock()))
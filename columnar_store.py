@@ -0,0 +1,225 @@
+"""Append-only binary columnar storage for OHLC series.
+
+Each series lives in its own directory of segment files. A segment is a small
+header followed by one contiguous block per column (int64 epoch-ns `datetime`,
+float64 `open`, `high`, `low`, `close`, `volume`), so loading is a raw read with
+no text or datetime parsing. Appends write a new segment containing only the new
+rows; duplicates across segments are resolved on load (last write wins) and
+`compact` periodically rewrites the series as a single sorted, deduped segment.
+
+Timezone-aware series are stored as UTC and the zone name is kept in `meta.json`.
+
+Writes take an exclusive lock on `<series dir>.lock` shared with other
+processes (see file_lock), so an import rewriting a series cannot collide with
+the engine appending to it: both would otherwise pick the same next segment
+name, or the rewrite would delete a segment appended after it listed them.
+"""
+import json
+import os
+import struct
+import threading
+
+import numpy as np
+import pandas as pd
+
+import file_lock
+
+MAGIC = b'OHLCSEG1'
+COLUMNS = ('datetime', 'open', 'high', 'low', 'close', 'volume')
+_HEADER = struct.Struct('<8sq')
+_SEGMENT_PREFIX = 'seg-'
+_SEGMENT_SUFFIX = '.bin'
+_META_FILE = 'meta.json'
+
+_lock = threading.RLock()
+
+
+def _locked(path):
+    return file_lock.locked(os.path.normpath(path) + '.lock', _lock)
+
+
+def _segment_files(path):
+    if not os.path.isdir(path):
+        return []
+    names = [f for f in os.listdir(path) if f.startswith(_SEGMENT_PREFIX) and f.endswith(_SEGMENT_SUFFIX)]
+    return sorted(names)
+
+
+def _next_segment_name(path):
+    names = _segment_files(path)
+    seq = int(names[-1][len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)]) + 1 if names else 1
+    return f"{_SEGMENT_PREFIX}{seq:08d}{_SEGMENT_SUFFIX}"
+
+
+def _read_meta(path):
+    meta_path = os.path.join(path, _META_FILE)
+    if not os.path.exists(meta_path):
+        return {}
+    with open(meta_path, 'r') as f:
+        return json.load(f)
+
+
+def _write_meta(path, meta):
+    tmp = os.path.join(path, _META_FILE + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(path, _META_FILE))
+
+
+def _to_columns(df):
+    """Convert a DataFrame to (tz_name, dict of typed column arrays)."""
+    dt = pd.to_datetime(df['datetime'])
+    tz = None
+    if getattr(dt.dt, 'tz', None) is not None:
+        tz = str(dt.dt.tz)
+        dt = dt.dt.tz_convert('UTC').dt.tz_localize(None)
+    cols = {'datetime': dt.to_numpy(dtype='datetime64[ns]').view('int64')}
+    n = len(df)
+    for c in COLUMNS[1:]:
+        if c in df.columns:
+            cols[c] = df[c].to_numpy(dtype='float64')
+        else:
+            cols[c] = np.full(n, np.nan if c != 'volume' else 1.0)
+    return tz, cols
+
+
+def _write_segment(path, name, cols):
+    n = len(cols['datetime'])
+    tmp = os.path.join(path, name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, n))
+        for c in COLUMNS:
+            f.write(np.ascontiguousarray(cols[c]).tobytes())
+    os.replace(tmp, os.path.join(path, name))
+
+
+def _read_segment(filepath):
+    with open(filepath, 'rb') as f:
+        buf = f.read()
+    magic, n = _HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError(f"Not an OHLC segment: {filepath}")
+    cols = {}
+    offset = _HEADER.size
+    for c in COLUMNS:
+        dtype = 'int64' if c == 'datetime' else 'float64'
+        cols[c] = np.frombuffer(buf, dtype=dtype, count=n, offset=offset)
+        offset += n * 8
+    return cols
+
+
+def _dedupe_sorted(cols):
+    """Sort by datetime and keep the last written row for each timestamp."""
+    dt = cols['datetime']
+    if len(dt) < 2 or np.all(dt[1:] > dt[:-1]):
+        return cols
+    order = np.argsort(dt, kind='stable')
+    dt_sorted = dt[order]
+    keep = np.empty(len(dt_sorted), dtype=bool)
+    keep[:-1] = dt_sorted[1:] != dt_sorted[:-1]
+    keep[-1] = True
+    order = order[keep]
+    return {c: v[order] for c, v in cols.items()}
+
+
+def _read_all(path):
+    segments = [_read_segment(os.path.join(path, name)) for name in _segment_files(path)]
+    if not segments:
+        return None
+    if len(segments) == 1:
+        cols = segments[0]
+    else:
+        cols = {c: np.concatenate([s[c] for s in segments]) for c in COLUMNS}
+    return _dedupe_sorted(cols)
+
+
+def _to_frame(cols, tz):
+    dt = pd.to_datetime(cols['datetime'].view('datetime64[ns]'))
+    if tz:
+        dt = dt.tz_localize('UTC').tz_convert(tz)
+    data = {'datetime': dt}
+    for c in COLUMNS[1:]:
+        data[c] = cols[c]
+    return pd.DataFrame(data)
+
+
+def as_stored(path, df):
+    """Return `df` converted exactly as `load` would return it after an `append`."""
+    tz, cols = _to_columns(df)
+    return _to_frame(cols, _read_meta(path).get('tz', tz))
+
+
+def exists(path):
+    return bool(_segment_files(path))
+
+
+def segment_count(path):
+    return len(_segment_files(path))
+
+
+def signature(path):
+    """Cheap change token for a series: directory mtime, segment names and last segment size."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    names = _segment_files(path)
+    last_size = os.path.getsize(os.path.join(path, names[-1])) if names else 0
+    return (st.st_mtime_ns, tuple(names), last_size)
+
+
+def load(path):
+    """Return the whole series as a sorted, deduped DataFrame, or None if empty."""
+    if not os.path.isdir(path):
+        return None
+    with _locked(path):
+        cols = _read_all(path)
+        if cols is None:
+            return None
+        return _to_frame(cols, _read_meta(path).get('tz'))
+
+
+def append(path, df):
+    """Append `df` as a new segment. Costs O(len(df)); nothing existing is rewritten."""
+    if df is None or len(df) == 0:
+        return
+    with _locked(path):
+        os.makedirs(path, exist_ok=True)
+        tz, cols = _to_columns(df)
+        meta = _read_meta(path)
+        if not meta:
+            _write_meta(path, {'tz': tz})
+        _write_segment(path, _next_segment_name(path), cols)
+
+
+def write(path, df, max_rows=None):
+    """Replace the series with `df` (last `max_rows` rows) as a single segment."""
+    with _locked(path):
+        os.makedirs(path, exist_ok=True)
+        tz, cols = _to_columns(df)
+        cols = _dedupe_sorted(cols)
+        if max_rows is not None:
+            cols = {c: v[-max_rows:] for c, v in cols.items()}
+        _replace_segments(path, cols, tz)
+
+
+def compact(path, max_rows=None):
+    """Merge all segments into one sorted, deduped segment, keeping the last `max_rows` rows."""
+    with _locked(path):
+        cols = _read_all(path)
+        if cols is None:
+            return 0
+        if max_rows is not None:
+            cols = {c: v[-max_rows:] for c, v in cols.items()}
+        _replace_segments(path, cols, _read_meta(path).get('tz'))
+        return len(cols['datetime'])
+
+
+def _replace_segments(path, cols, tz):
+    old = _segment_files(path)
+    # The new segment gets the highest sequence number, so if we crash before the
+    # old ones are removed the load-time "last write wins" rule still holds.
+    _write_segment(path, _next_segment_name(path), cols)
+    _write_meta(path, {'tz': tz})
+    for name in old:
+        os.remove(os.path.join(path, name))
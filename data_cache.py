@@ -1,10 +1,35 @@
 import os
+import logging
+import threading
+from collections import OrderedDict
 import pandas as pd
 from typing import Optional
 
-CACHE_DIR = os.getenv('DATA_CACHE_DIR', os.path.join(os.path.dirname(__file__), 'data_cache'))
+import bar_archive
+import columnar_store
+import tracing
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data_cache')
+CACHE_DIR = os.getenv('DATA_CACHE_DIR', DEFAULT_CACHE_DIR)
 os.makedirs(CACHE_DIR, exist_ok=True)
 
+# 'columnar' (append-only binary segments, see columnar_store) or 'csv' (legacy SYMBOL__interval.csv)
+CACHE_BACKEND = os.getenv('DATA_CACHE_BACKEND', 'columnar')
+# Compact a columnar series once it has more than this many segments
+COMPACT_SEGMENTS = int(os.getenv('DATA_CACHE_COMPACT_SEGMENTS', '16'))
+# Memory budget for the in-process load_cache memo (0 disables it)
+MEMO_MAX_BYTES = int(os.getenv('DATA_CACHE_MEMO_BYTES', str(64 * 1024 * 1024)))
+# Keep every bar written to the cache in the long-history archive (bar_archive), which is never truncated
+ARCHIVE_BARS = os.getenv('DATA_CACHE_ARCHIVE', '1').lower() in ('1', 'true', 'yes')
+# Archive directory (default: 'archive' inside CACHE_DIR)
+ARCHIVE_DIR = os.getenv('BAR_ARCHIVE_DIR', '')
+
+# (symbol, interval) -> (backend, signature, DataFrame, nbytes), most recently used last
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+_memo_bytes = 0
+_memo_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
 
 def _cache_path(symbol: str, interval: str) -> str:
     safe_symbol = symbol.replace('/', '_').replace(':', '_')
@@ -12,10 +37,12 @@ def _cache_path(symbol: str, interval: str) -> str:
     return os.path.join(CACHE_DIR, filename)
 
 
-def load_cache(symbol: str, interval: str) -> Optional[pd.DataFrame]:
-    path = _cache_path(symbol, interval)
-    if not os.path.exists(path):
-        return None
+def _series_dir(symbol: str, interval: str) -> str:
+    """Directory holding the columnar segments for a series (CSV path without extension)."""
+    return os.path.splitext(_cache_path(symbol, interval))[0]
+
+
+def _load_csv(path: str) -> pd.DataFrame:
     df = pd.read_csv(path, parse_dates=['datetime'])
     # Ensure types
     for c in ['open', 'high', 'low', 'close']:
@@ -24,29 +51,339 @@ def load_cache(symbol: str, interval: str) -> Optional[pd.DataFrame]:
     return df
 
 
-def save_cache(symbol: str, interval: str, df: pd.DataFrame, max_rows: int = 2000):
+def migrate_csv(symbol: str, interval: str) -> bool:
+    """Import an existing SYMBOL__interval.csv into the columnar backend.
+
+    The CSV is left in place so switching back to DATA_CACHE_BACKEND=csv still works.
+    Returns True if a CSV was imported.
+    """
     path = _cache_path(symbol, interval)
-    # keep only last max_rows
-    if len(df) > max_rows:
-        df = df.tail(max_rows).reset_index(drop=True)
-    df.to_csv(path, index=False)
+    if not os.path.exists(path):
+        return False
+    df = _load_csv(path)
+    columnar_store.write(_series_dir(symbol, interval), df)
+    logging.info(f"Migrated {path} to columnar cache ({len(df)} rows)")
+    return True
 
 
-def append_to_cache(symbol: str, interval: str, df_new: pd.DataFrame):
-    """Append new rows to cache, dedupe by datetime, and save."""
-    df_existing = load_cache(symbol, interval)
-    if df_existing is None:
-        save_cache(symbol, interval, df_new)
-        return df_new
+def migrate_all_csv() -> int:
+    """Migrate every SYMBOL__interval.csv in CACHE_DIR that has no columnar data yet."""
+    count = 0
+    for name in sorted(os.listdir(CACHE_DIR)):
+        base, ext = os.path.splitext(name)
+        if ext.lower() != '.csv' or '__' not in base:
+            continue
+        if columnar_store.exists(os.path.join(CACHE_DIR, base)):
+            continue
+        df = _load_csv(os.path.join(CACHE_DIR, name))
+        columnar_store.write(os.path.join(CACHE_DIR, base), df)
+        logging.info(f"Migrated {name} to columnar cache ({len(df)} rows)")
+        count += 1
+    return count
+
+
+def archive_path(symbol: str, interval: str) -> str:
+    name = os.path.splitext(os.path.basename(_cache_path(symbol, interval)))[0]
+    return os.path.join(ARCHIVE_DIR or os.path.join(CACHE_DIR, 'archive'), name + bar_archive.SUFFIX)
+
+
+def open_archive(symbol: str, interval: str) -> bar_archive.BarArchive:
+    """The archive of a series (it may not exist yet)."""
+    return bar_archive.BarArchive(archive_path(symbol, interval))
+
+
+def _archive(symbol: str, interval: str, df_new: pd.DataFrame):
+    """Merge rows into the archive; the first time, what the cache already holds goes in too.
+
+    Call before the rows are written to the cache. Returns the archive, or None
+    when archiving is off or failed (the cache write goes ahead either way).
+    """
+    if not ARCHIVE_BARS or df_new is None or len(df_new) == 0:
+        return None
+    try:
+        with tracing.span('archive'):
+            archive = _seeded_archive(symbol, interval)
+            archive.merge(df_new)
+        return archive
+    except (OSError, ValueError) as e:
+        logging.warning(f"Could not archive {symbol} {interval} bars: {e}")
+        return None
+
+
+def _seeded_archive(symbol: str, interval: str) -> bar_archive.BarArchive:
+    archive = open_archive(symbol, interval)
+    if not archive.exists():
+        existing = load_cache(symbol, interval)
+        if existing is not None and len(existing):
+            archive.merge(existing)
+    return archive
+
+
+def import_records(symbol: str, interval: str, records, max_rows: int = 2000) -> dict:
+    """Merge a large sorted record array (bar_archive.RECORD, e.g. a parsed export) into a series.
+
+    Goes through the archive with bounded memory (BarArchive.merge_from), then
+    refreshes the cache with the newest `max_rows` bars, so bars newer than the
+    import are kept. Without the archive the records are merged into the cache
+    in memory. Returns the archive merge counts.
+    """
+    if not ARCHIVE_BARS:
+        existing = load_cache(symbol, interval)
+        new = bar_archive.to_frame(records)
+        _save(symbol, interval, new if existing is None else _combine(existing, new), max_rows)
+        return {'appended': len(new), 'updated': 0, 'inserted': 0}
+    stats = _seeded_archive(symbol, interval).merge_from(records)
+    refresh_cache_from_archive(symbol, interval, max_rows)
+    return stats
+
+
+def load_history(symbol: str, interval: str, start=None, end=None) -> Optional[pd.DataFrame]:
+    """Bars with start <= datetime < end from the archive, or from the cache while there is no archive.
+
+    Unlike load_cache this is not limited to the cache's max_rows, so backtests
+    and offline resampling see the full history.
+    """
+    archive = open_archive(symbol, interval)
+    if len(archive):
+        return bar_archive.to_frame(archive.range(start, end))
+    df = load_cache(symbol, interval)
+    if df is None:
+        return None
+    times = pd.to_datetime(df['datetime'])
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= times >= pd.Timestamp(start)
+    if end is not None:
+        mask &= times < pd.Timestamp(end)
+    return df[mask].reset_index(drop=True)
+
+
+def refresh_cache_from_archive(symbol: str, interval: str, max_rows: int = 2000) -> bool:
+    """Rewrite the cached series as the newest `max_rows` archived bars; False if there is no archive."""
+    if not ARCHIVE_BARS:
+        return False
+    archive = open_archive(symbol, interval)
+    if not len(archive):
+        return False
+    _save(symbol, interval, bar_archive.to_frame(archive.tail(max_rows)), max_rows)
+    return True
+
+
+def _restore_from_archive(symbol: str, interval: str) -> bool:
+    """Rebuild a missing cache series from the archive; True if it did."""
+    if not refresh_cache_from_archive(symbol, interval):
+        return False
+    logging.info(f"Restored {symbol} {interval} cache from the archive")
+    return True
+
+
+def _signature(symbol: str, interval: str):
+    """Change token for the on-disk series (mtime and size), None if it does not exist."""
+    if CACHE_BACKEND == 'csv':
+        try:
+            st = os.stat(_cache_path(symbol, interval))
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+    return columnar_store.signature(_series_dir(symbol, interval))
+
+
+def _memo_get(key, signature):
+    with _memo_lock:
+        entry = _memo.get(key)
+        if entry is None or signature is None or entry[0] != CACHE_BACKEND or entry[1] != signature:
+            _memo_stats['misses'] += 1
+            return None
+        _memo.move_to_end(key)
+        _memo_stats['hits'] += 1
+        return entry[2]
+
+
+def _memo_put(key, signature, df):
+    global _memo_bytes
+    if MEMO_MAX_BYTES <= 0 or signature is None or df is None:
+        return
+    nbytes = int(df.memory_usage(index=True, deep=False).sum())
+    with _memo_lock:
+        old = _memo.pop(key, None)
+        if old is not None:
+            _memo_bytes -= old[3]
+        if nbytes > MEMO_MAX_BYTES:
+            return
+        _memo[key] = (CACHE_BACKEND, signature, df, nbytes)
+        _memo_bytes += nbytes
+        while _memo_bytes > MEMO_MAX_BYTES:
+            _, evicted = _memo.popitem(last=False)
+            _memo_bytes -= evicted[3]
+            _memo_stats['evictions'] += 1
+
+
+def memo_stats() -> dict:
+    """Hit/miss/eviction counters and current size of the load_cache memo."""
+    with _memo_lock:
+        stats = dict(_memo_stats)
+        stats.update(entries=len(_memo), bytes=_memo_bytes, max_bytes=MEMO_MAX_BYTES)
+        return stats
+
+
+def clear_memo():
+    global _memo_bytes
+    with _memo_lock:
+        _memo.clear()
+        _memo_bytes = 0
+        for k in _memo_stats:
+            _memo_stats[k] = 0
+
+
+def use_cache_dir(path: str, archive_dir: str = ''):
+    """Point the cache (and its archive, inside `path` unless `archive_dir` is given) at another directory."""
+    global CACHE_DIR, ARCHIVE_DIR
+    os.makedirs(path, exist_ok=True)
+    CACHE_DIR, ARCHIVE_DIR = path, archive_dir
+    clear_memo()
+
+
+def load_cache(symbol: str, interval: str) -> Optional[pd.DataFrame]:
+    """Load a cached series, served from memory while the files on disk are unchanged.
+
+    The returned frame shares its data with the memo; treat it as read-only.
+    """
+    with tracing.span('load_cache'):
+        return _load_cache(symbol, interval)
+
+
+def _load_cache(symbol: str, interval: str) -> Optional[pd.DataFrame]:
+    key = (symbol, interval)
+    signature = _signature(symbol, interval)
+    df = _memo_get(key, signature)
+    if df is not None:
+        return df.copy(deep=False)
+    df = _load_uncached(symbol, interval)
+    if df is not None:
+        # migration may have created the series, so re-read the signature
+        _memo_put(key, signature if signature is not None else _signature(symbol, interval), df)
+        return df.copy(deep=False)
+    return None
+
+
+def _load_uncached(symbol: str, interval: str) -> Optional[pd.DataFrame]:
+    if CACHE_BACKEND == 'csv':
+        path = _cache_path(symbol, interval)
+        if not os.path.exists(path) and not _restore_from_archive(symbol, interval):
+            return None
+        return _load_csv(path)
+    series = _series_dir(symbol, interval)
+    if not columnar_store.exists(series) and not migrate_csv(symbol, interval) \
+            and not _restore_from_archive(symbol, interval):
+        return None
+    return columnar_store.load(series)
+
+
+def save_cache(symbol: str, interval: str, df: pd.DataFrame, max_rows: int = 2000):
+    """Replace the cached series with the last `max_rows` rows of `df`; all of `df` is archived."""
+    _archive(symbol, interval, df)
+    _save(symbol, interval, df, max_rows)
+
+
+def _save(symbol: str, interval: str, df: pd.DataFrame, max_rows: int):
+    if CACHE_BACKEND == 'csv':
+        path = _cache_path(symbol, interval)
+        # keep only last max_rows
+        if len(df) > max_rows:
+            df = df.tail(max_rows).reset_index(drop=True)
+        df.to_csv(path, index=False)
+        with _memo_lock:
+            _memo_discard((symbol, interval))
+        return
+    columnar_store.write(_series_dir(symbol, interval), df, max_rows=max_rows)
+    with _memo_lock:
+        _memo_discard((symbol, interval))
+
+
+def _memo_discard(key):
+    global _memo_bytes
+    old = _memo.pop(key, None)
+    if old is not None:
+        _memo_bytes -= old[3]
+
+
+def _combine(df_existing: pd.DataFrame, df_new: pd.DataFrame) -> pd.DataFrame:
     # Concatenate and dedupe by datetime
     df_combined = pd.concat([df_existing, df_new], ignore_index=True)
     df_combined = df_combined.drop_duplicates(subset=['datetime'], keep='last')
-    df_combined = df_combined.sort_values('datetime').reset_index(drop=True)
-    save_cache(symbol, interval, df_combined)
-    return df_combined
+    return df_combined.sort_values('datetime').reset_index(drop=True)
+
+
+def append_to_cache(symbol: str, interval: str, df_new: pd.DataFrame, max_rows: int = 2000):
+    """Append new rows to cache, dedupe by datetime, and save.
+
+    The memo entry for the series is updated in place, so the next load_cache
+    does not go back to disk.
+    """
+    with tracing.span('append_to_cache'):
+        return _append_to_cache(symbol, interval, df_new, max_rows)
+
+
+def _append_to_cache(symbol: str, interval: str, df_new: pd.DataFrame, max_rows: int):
+    key = (symbol, interval)
+    _archive(symbol, interval, df_new)
+    if CACHE_BACKEND == 'csv':
+        df_existing = load_cache(symbol, interval)
+        if df_existing is None:
+            _save(symbol, interval, df_new, max_rows)
+            return df_new
+        df_combined = _combine(df_existing, df_new)
+        _save(symbol, interval, df_combined, max_rows)
+        _memo_put(key, _signature(symbol, interval), df_combined.tail(max_rows).reset_index(drop=True))
+        return df_combined
+    series = _series_dir(symbol, interval)
+    if not columnar_store.exists(series):
+        migrate_csv(symbol, interval)
+    df_existing = load_cache(symbol, interval)
+    # Only the new rows are written; overlaps are resolved on load and by compaction
+    columnar_store.append(series, df_new)
+    if columnar_store.segment_count(series) > COMPACT_SEGMENTS:
+        columnar_store.compact(series, max_rows=max_rows)
+        df_combined = columnar_store.load(series)
+    elif df_existing is None:
+        df_combined = columnar_store.load(series)
+    else:
+        # same result as a reload, computed from the in-memory copy
+        df_combined = _combine(df_existing, columnar_store.as_stored(series, df_new))
+    _memo_put(key, _signature(symbol, interval), df_combined)
+    return df_combined.copy(deep=False)
+
+
+def persist_bars(symbol: str, interval: str, df_new: pd.DataFrame, max_rows: int = 2000):
+    """Write new rows to disk without rebuilding the in-memory copy of the series.
+
+    For callers that keep the live series elsewhere (series_store): the columnar
+    backend only writes a segment with the new rows and drops the memo entry,
+    the CSV backend falls back to append_to_cache.
+    """
+    with tracing.span('persist_bars'):
+        if CACHE_BACKEND == 'csv':
+            # archives the rows itself
+            _append_to_cache(symbol, interval, df_new, max_rows)
+            return
+        _archive(symbol, interval, df_new)
+        series = _series_dir(symbol, interval)
+        if not columnar_store.exists(series):
+            migrate_csv(symbol, interval)
+        columnar_store.append(series, df_new)
+        if columnar_store.segment_count(series) > COMPACT_SEGMENTS:
+            columnar_store.compact(series, max_rows=max_rows)
+        with _memo_lock:
+            _memo_discard((symbol, interval))
 
 
-def bootstrap_from_csv(symbol: str, interval: str, csv_path: str):
+def bootstrap_from_csv(symbol: str, interval: str, csv_path: str, max_rows: int = 2000):
+    """Import a CSV export. With the archive on, it is merged into the archive (keeping newer
+    cached bars) and the cache is refreshed with the archive's newest `max_rows` bars."""
     df = pd.read_csv(csv_path, parse_dates=['datetime'])
-    save_cache(symbol, interval, df)
+    archive = _archive(symbol, interval, df)
+    if archive is None:
+        _save(symbol, interval, df, max_rows)
+    else:
+        _save(symbol, interval, bar_archive.to_frame(archive.tail(max_rows)), max_rows)
     return df
@@ -4,17 +4,22 @@ Debug runner: fetches data, runs detect_signals on 5m/1h, prints status, optiona
 Usage:
   python debug_signal_run.py        # prints diagnostics
   python debug_signal_run.py --send # also POSTs to webhook if HTF-confirmed entry
+  python debug_signal_run.py --profile  # also prints cProfile hotspots and the span breakdown of the run
 
 - Prints detailed debug output for 5m and 1h timeframes (last up to 5 bars)
 - Only sends webhook if --send is passed and HTF confirmation is present
 - Robust to missing/short data and fetch failures
+- --profile runs the cycle under cProfile and tracing; the breakdown is also appended to TRACE_FILE
 """
 import os
 import sys
 import argparse
+import cProfile
+import pstats
 import traceback
 import logging
-from python_signal_engine import fetch_ohlc, detect_signals, send_signal_to_webhook
+import tracing
+from python_signal_engine import fetch_ohlc, evaluate_signals, send_signal_to_webhook
 import myconfig
 
 # Configurable constants
@@ -53,8 +58,9 @@ def main(send=False):
         if df5 is None or df1h is None or len(df5) < 5 or len(df1h) < 5:
             logging.warning(f'Insufficient data fetched for debug output. Got {len(df5) if df5 is not None else 0} rows for 5m, {len(df1h) if df1h is not None else 0} rows for 1h. Check your data source and API key.')
             return
-        le5, se5, z5, t5, r5 = detect_signals(df5)
-        le1h, se1h, z1h, t1h, r1h = detect_signals(df1h)
+        # memoized like the engine, so results are shared through SIGNAL_MEMO_DIR
+        le5, se5, z5, t5, r5 = evaluate_signals(df5, symbol=SYMBOL, interval='5min')
+        le1h, se1h, z1h, t1h, r1h = evaluate_signals(df1h, symbol=SYMBOL, interval='1h')
         confirmed_long_5m = le5 & (t1h == 1)
         confirmed_short_5m = se5 & (t1h == -1)
         n5 = min(5, len(df5))
@@ -91,8 +97,30 @@ def main(send=False):
             logging.info('Not sending: no HTF-confirmed entry')
 
 
+def profile(send=False, top=25):
+    """Run main() once under cProfile and a trace cycle, then print hotspots and spans."""
+    profiler = cProfile.Profile()
+    with tracing.cycle('debug') as cyc:
+        profiler.enable()
+        try:
+            main(send=send)
+        finally:
+            profiler.disable()
+    stats = pstats.Stats(profiler, stream=sys.stdout)
+    stats.strip_dirs().sort_stats('cumulative').print_stats(top)
+    print(f"=== Span breakdown ({1000 * cyc.duration:.1f}ms total) ===")
+    print(f"{'span':40} {'count':>6} {'total_ms':>10} {'max_ms':>10}")
+    for path, s in cyc.breakdown().items():
+        print(f"{path:40} {s['count']:6} {s['total_ms']:10.2f} {s['max_ms']:10.2f}")
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('--send', action='store_true', help='POST to webhook if HTF-confirmed entry')
+    parser.add_argument('--profile', action='store_true', help='Print cProfile hotspots and per-span timings of the run')
+    parser.add_argument('--top', type=int, default=25, help='Number of cProfile entries to print with --profile')
     args = parser.parse_args()
-    main(send=args.send)
+    if args.profile:
+        profile(send=args.send, top=args.top)
+    else:
+        main(send=args.send)
@@ -1,53 +1,165 @@
+"""Persistent record of sent signal ids, shared by every process using DEDUPE_DB_PATH.
+
+Each thread keeps one long-lived SQLite connection in WAL mode, so readers in
+other processes never block a writer. Lookups go through a small in-memory LRU
+first; only positive results are cached (another process may record an id at
+any time, but never un-records one), so the cache cannot hide a duplicate.
+Old rows are removed in small batches by a background thread (`start_expiry`)
+instead of a full DELETE on every send.
+"""
+import logging
 import os
 import sqlite3
 import threading
-from datetime import datetime, timezone
+import time
+from collections import OrderedDict
+
+import metrics
 
 DB_PATH = os.getenv('DEDUPE_DB_PATH', os.path.join(os.path.dirname(__file__), 'dedupe.db'))
+# In-memory front cache: max entries, and seconds an entry stays valid after its ts
+CACHE_SIZE = int(os.getenv('DEDUPE_CACHE_SIZE', '10000'))
+CACHE_TTL = int(os.getenv('DEDUPE_CACHE_TTL', '3600'))
+# Background expiry: seconds between passes and rows deleted per transaction
+EXPIRY_INTERVAL = float(os.getenv('DEDUPE_EXPIRY_INTERVAL', '60'))
+EXPIRY_BATCH = int(os.getenv('DEDUPE_EXPIRY_BATCH', '500'))
+
+_local = threading.local()
 _lock = threading.Lock()
+_schema_ready = set()
+# signal_id -> ts, most recently used last
+_cache = OrderedDict()
+_stats = {'hits': 0, 'misses': 0, 'expired': 0}
+_expiry_thread = None
+_expiry_stop = threading.Event()
+
+LOOKUPS = metrics.counter('dedupe_lookups_total', 'Dedupe lookups by result (cache_hit, db_hit, miss)', ['result'])
+LOOKUP_LATENCY = metrics.histogram('dedupe_lookup_seconds', 'Dedupe lookup latency')
 
 
-def _ensure_db():
+def _connect():
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'path', None) != DB_PATH:
+        conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=30000')
+        _local.conn = conn
+        _local.path = DB_PATH
+    if DB_PATH not in _schema_ready:
+        with _lock:
+            if DB_PATH not in _schema_ready:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS sent_signals (
+                        signal_id TEXT PRIMARY KEY,
+                        ts INTEGER
+                    )
+                ''')
+                conn.execute('CREATE INDEX IF NOT EXISTS sent_signals_ts ON sent_signals(ts)')
+                _schema_ready.add(DB_PATH)
+                _cache.clear()
+    return conn
+
+
+def _cache_get(signal_id, now):
     with _lock:
-        conn = sqlite3.connect(DB_PATH)
-        try:
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS sent_signals (
-                    signal_id TEXT PRIMARY KEY,
-                    ts INTEGER
-                )
-            ''')
-            conn.commit()
-        finally:
-            conn.close()
-
-
-def get(signal_id):
-    _ensure_db()
-    conn = sqlite3.connect(DB_PATH)
-    try:
-        cur = conn.execute('SELECT ts FROM sent_signals WHERE signal_id = ?', (signal_id,))
-        row = cur.fetchone()
-        return row[0] if row else None
-    finally:
-        conn.close()
+        ts = _cache.get(signal_id)
+        if ts is None:
+            return None
+        if ts + CACHE_TTL < now:
+            del _cache[signal_id]
+            return None
+        _cache.move_to_end(signal_id)
+        return ts
+
+
+def _cache_put(signal_id, ts):
+    if CACHE_SIZE <= 0:
+        return
+    with _lock:
+        _cache[signal_id] = ts
+        _cache.move_to_end(signal_id)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def get(signal_id, min_ts=None):
+    """Return the ts recorded for `signal_id`, or None.
+
+    With `min_ts`, records older than it are treated as absent, so callers get
+    TTL semantics without waiting for expiry to delete them.
+    """
+    start = time.perf_counter()
+    conn = _connect()
+    ts = _cache_get(signal_id, time.time())
+    if ts is not None and (min_ts is None or ts >= min_ts):
+        with _lock:
+            _stats['hits'] += 1
+        LOOKUPS.labels('cache_hit').inc()
+        LOOKUP_LATENCY.observe(time.perf_counter() - start)
+        return ts
+    with _lock:
+        _stats['misses'] += 1
+    row = conn.execute('SELECT ts FROM sent_signals WHERE signal_id = ?', (signal_id,)).fetchone()
+    if row is not None:
+        _cache_put(signal_id, row[0])
+    found = row is not None and (min_ts is None or row[0] >= min_ts)
+    LOOKUPS.labels('db_hit' if found else 'miss').inc()
+    LOOKUP_LATENCY.observe(time.perf_counter() - start)
+    return row[0] if found else None
 
 
 def set(signal_id, ts):
-    _ensure_db()
-    conn = sqlite3.connect(DB_PATH)
-    try:
-        conn.execute('INSERT OR REPLACE INTO sent_signals(signal_id, ts) VALUES (?, ?)', (signal_id, int(ts)))
-        conn.commit()
-    finally:
-        conn.close()
-
-
-def cleanup(older_than_ts):
-    _ensure_db()
-    conn = sqlite3.connect(DB_PATH)
-    try:
-        conn.execute('DELETE FROM sent_signals WHERE ts < ?', (int(older_than_ts),))
-        conn.commit()
-    finally:
-        conn.close()
+    _connect().execute('INSERT OR REPLACE INTO sent_signals(signal_id, ts) VALUES (?, ?)', (signal_id, int(ts)))
+    _cache_put(signal_id, int(ts))
+
+
+def cleanup(older_than_ts, batch=None):
+    """Delete rows older than `older_than_ts` in batches; returns the number deleted."""
+    conn = _connect()
+    batch = batch or EXPIRY_BATCH
+    deleted = 0
+    while True:
+        cur = conn.execute(
+            'DELETE FROM sent_signals WHERE rowid IN (SELECT rowid FROM sent_signals WHERE ts < ? LIMIT ?)',
+            (int(older_than_ts), batch))
+        deleted += cur.rowcount
+        if cur.rowcount < batch:
+            break
+    with _lock:
+        for signal_id in [k for k, ts in _cache.items() if ts < older_than_ts]:
+            del _cache[signal_id]
+        _stats['expired'] += deleted
+    return deleted
+
+
+def _expiry_loop(ttl, interval):
+    while not _expiry_stop.wait(interval):
+        try:
+            cleanup(time.time() - ttl)
+        except sqlite3.Error as e:
+            logging.warning(f"Dedupe expiry failed: {e}")
+
+
+def start_expiry(ttl, interval=None):
+    """Start a daemon thread deleting rows older than `ttl` seconds (idempotent)."""
+    global _expiry_thread
+    with _lock:
+        if _expiry_thread is not None and _expiry_thread.is_alive():
+            return
+        _expiry_stop.clear()
+        _expiry_thread = threading.Thread(target=_expiry_loop, args=(ttl, interval or EXPIRY_INTERVAL),
+                                          name='dedupe-expiry', daemon=True)
+        _expiry_thread.start()
+
+
+def stop_expiry(timeout=5):
+    _expiry_stop.set()
+    if _expiry_thread is not None:
+        _expiry_thread.join(timeout)
+
+
+def stats():
+    """Front-cache hit/miss counts, cached entries and rows removed by expiry."""
+    with _lock:
+        return dict(_stats, cached=len(_cache))
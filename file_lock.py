@@ -0,0 +1,67 @@
+"""Exclusive file locks shared between processes (flock, or msvcrt on Windows).
+
+Stores whose files are written by more than one process (the engine appending
+bars while a bootstrap import rewrites the same series) wrap each write in
+
+    with file_lock.locked(lock_path, thread_lock):
+        ...
+
+`thread_lock` is the store's own threading.RLock: it serializes threads of
+this process, the lock file serializes processes. The lock is re-entrant
+within a process, so a locked method may call another one.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# lock path -> nesting depth held by this process (guarded by the caller's thread lock)
+_held = {}
+
+
+@contextmanager
+def locked(path, thread_lock):
+    """Hold the exclusive lock on the file at `path` (created if missing)."""
+    with thread_lock:
+        if _held.get(path):
+            _held[path] += 1
+            try:
+                yield
+            finally:
+                _held[path] -= 1
+            return
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a+b') as f:
+            _lock(f)
+            _held[path] = 1
+            try:
+                yield
+            finally:
+                del _held[path]
+                _unlock(f)
+
+
+def _lock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return
+        except OSError:
+            time.sleep(0.05)
+
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,157 @@
+"""Shared HTTP layer for all outbound calls (webhook, Telegram, GoldAPI, Twelve Data).
+
+One `requests.Session` per scheme+host keeps a keep-alive connection pool, so
+repeated calls to the same endpoint skip the TCP/TLS handshake. Timeouts and
+retry/backoff policies are defined here instead of in each caller, and every
+response is recorded in per-host statistics (latency, errors, connection reuse).
+
+Usage:
+    resp = http_client.request('POST', url, json=payload, policy=WEBHOOK_RETRY)
+    if resp is None: ...  # every attempt failed
+"""
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+import myconfig
+
+POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', getattr(myconfig, 'HTTP_POOL_CONNECTIONS', 4)))
+POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', getattr(myconfig, 'HTTP_POOL_MAXSIZE', 16)))
+CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', getattr(myconfig, 'HTTP_CONNECT_TIMEOUT', 5)))
+READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', getattr(myconfig, 'HTTP_READ_TIMEOUT', 10)))
+
+OK_STATUSES = (200, 201, 202)
+
+
+class RetryPolicy(namedtuple('RetryPolicy', ['attempts', 'backoff', 'exponential'])):
+    """`attempts` tries; sleeps backoff**n (exponential) or backoff*n (linear) after failed try n."""
+
+    def delay(self, attempt):
+        return self.backoff ** attempt if self.exponential else self.backoff * attempt
+
+
+NO_RETRY = RetryPolicy(attempts=1, backoff=0, exponential=False)
+# Webhook POSTs: 3 attempts, 2s then 4s between them
+WEBHOOK_RETRY = RetryPolicy(attempts=3, backoff=2, exponential=True)
+# GoldAPI price polls: 3 attempts, 1s then 2s between them
+PRICE_RETRY = RetryPolicy(attempts=3, backoff=1, exponential=False)
+
+_sessions = {}
+_stats = {}
+_lock = threading.Lock()
+
+REQUESTS = metrics.counter('http_client_requests_total', 'Outbound HTTP attempts by outcome (ok, rejected, error)',
+                           ['host', 'method', 'outcome'])
+LATENCY = metrics.histogram('http_client_request_seconds', 'Outbound HTTP attempt latency', ['host', 'method'])
+
+
+def _host_key(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _host_stats(host):
+    stats = _stats.get(host)
+    if stats is None:
+        stats = {'requests': 0, 'errors': 0, 'total_latency': 0.0, 'max_latency': 0.0}
+        _stats[host] = stats
+    return stats
+
+
+def _record_response(resp, *args, **kwargs):
+    latency = resp.elapsed.total_seconds()
+    with _lock:
+        stats = _host_stats(_host_key(resp.url))
+        stats['requests'] += 1
+        stats['total_latency'] += latency
+        stats['max_latency'] = max(stats['max_latency'], latency)
+
+
+def _record_error(url):
+    with _lock:
+        _host_stats(_host_key(url))['errors'] += 1
+
+
+def get_session(url):
+    """Return the pooled session for the scheme+host of `url`, creating it on first use."""
+    host = _host_key(url)
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.hooks['response'].append(_record_response)
+            _sessions[host] = session
+        return session
+
+
+def request(method, url, *, policy=NO_RETRY, accept=None, timeout=None, **kwargs):
+    """Send a request on the pooled session for `url`, retrying according to `policy`.
+
+    `accept(response)` decides success (default: status in OK_STATUSES). Returns
+    the accepted response, or None once every attempt failed or was rejected.
+    """
+    accept = accept or (lambda resp: resp.status_code in OK_STATUSES)
+    timeout = timeout if timeout is not None else (CONNECT_TIMEOUT, READ_TIMEOUT)
+    session = get_session(url)
+    host = _host_key(url)
+    for attempt in range(1, policy.attempts + 1):
+        start = time.perf_counter()
+        try:
+            resp = session.request(method, url, timeout=timeout, **kwargs)
+            LATENCY.labels(host, method).observe(time.perf_counter() - start)
+            logging.info(f"Attempt {attempt}: {method} {host} -> {resp.status_code}")
+            if accept(resp):
+                REQUESTS.labels(host, method, 'ok').inc()
+                return resp
+            REQUESTS.labels(host, method, 'rejected').inc()
+            logging.warning(f"{method} {host} returned {resp.status_code}: {resp.text[:500]}")
+        except requests.exceptions.RequestException as e:
+            LATENCY.labels(host, method).observe(time.perf_counter() - start)
+            REQUESTS.labels(host, method, 'error').inc()
+            _record_error(url)
+            logging.warning(f"Attempt {attempt} {method} {host} failed: {e}")
+        if attempt < policy.attempts:
+            time.sleep(policy.delay(attempt))
+    return None
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def stats():
+    """Per-host request count, errors, latency (ms) and connection reuse."""
+    out = {}
+    with _lock:
+        for host, s in _stats.items():
+            opened = 0
+            session = _sessions.get(host)
+            if session is not None:
+                adapter = session.get_adapter(host)
+                for pool_key in list(adapter.poolmanager.pools.keys()):
+                    pool = adapter.poolmanager.pools.get(pool_key)
+                    if pool is not None:
+                        opened += pool.num_connections
+            out[host] = {
+                'requests': s['requests'],
+                'errors': s['errors'],
+                'avg_latency_ms': 1000 * s['total_latency'] / s['requests'] if s['requests'] else 0.0,
+                'max_latency_ms': 1000 * s['max_latency'],
+                'connections_opened': opened,
+                'connections_reused': max(0, s['requests'] - opened),
+            }
+    return out
@@ -0,0 +1,292 @@
+"""Incremental (streaming) version of `python_signal_engine.detect_signals`.
+
+`detect_signals` recomputes ZLEMA, ATR, the `ema_length*3` rolling max, RSI and
+the trend state machine over the whole window on every call. `SignalStream`
+keeps the recursive state of each indicator instead and updates it from a single
+appended bar in O(1) (amortized for the rolling max, which uses a monotonic deque).
+
+Values produced by a stream are identical (up to float rounding) to
+`detect_signals` run over every bar the stream has consumed since it was created
+or reset. Call `update()` with a bar whose timestamp equals the last one to
+replace a still-forming bar; the previous state is restored before re-applying it.
+
+Usage:
+    stream = get_stream('XAU/USD', '5min')
+    long_entry, short_entry, zlema, trend, rsi = stream.sync(df)
+"""
+import math
+import threading
+from collections import deque, namedtuple
+
+import pandas as pd
+
+# Per-bar output, same fields as the tuple returned by detect_signals
+SignalBar = namedtuple('SignalBar', ['time', 'long_entry', 'short_entry', 'zlema', 'trend', 'rsi'])
+
+_NAN = float('nan')
+
+
+def _gt(a, b):
+    # pandas comparisons against NaN are False; mirror that
+    return not (math.isnan(a) or math.isnan(b)) and a > b
+
+
+def _lt(a, b):
+    return not (math.isnan(a) or math.isnan(b)) and a < b
+
+
+def _le(a, b):
+    return not (math.isnan(a) or math.isnan(b)) and a <= b
+
+
+def _ge(a, b):
+    return not (math.isnan(a) or math.isnan(b)) and a >= b
+
+
+class _State:
+    """Scalar recursive state. Copied before each bar so the last bar can be replaced."""
+
+    __slots__ = (
+        'n', 'closes', 'zlema', 'zlema_count', 'atr', 'tr_sum', 'prev_close',
+        'prev_upper', 'prev_lower', 'prev_zlema', 'trend', 'prev_trend',
+        'rsi_up', 'rsi_dn',
+    )
+
+    def __init__(self, lag):
+        self.n = 0
+        # last lag+1 closes, needed for the zero-lag source close + (close - close[lag])
+        self.closes = deque(maxlen=lag + 1)
+        self.zlema = _NAN
+        self.zlema_count = 0
+        self.atr = 0.0
+        self.tr_sum = 0.0
+        self.prev_close = _NAN
+        self.prev_upper = _NAN
+        self.prev_lower = _NAN
+        self.prev_zlema = _NAN
+        self.trend = 0
+        self.prev_trend = 0
+        self.rsi_up = _NAN
+        self.rsi_dn = _NAN
+
+    def copy(self):
+        other = _State.__new__(_State)
+        for name in self.__slots__:
+            setattr(other, name, getattr(self, name))
+        other.closes = deque(self.closes, maxlen=self.closes.maxlen)
+        return other
+
+
+class SignalStream:
+    """Stateful, O(1)-per-bar equivalent of detect_signals for one series."""
+
+    def __init__(self, ema_length=70, rsi_length=14, band_mult=1.2, history=5):
+        self.ema_length = int(ema_length)
+        self.rsi_length = int(rsi_length)
+        self.band_mult = band_mult
+        self.min_bars = int(self.ema_length * 3)
+        self._lag = int((self.ema_length - 1) / 2)
+        self._ema_alpha = 2.0 / (self.ema_length + 1)
+        self._rsi_alpha = 1.0 / self.rsi_length
+        self._history = deque(maxlen=max(int(history), 3))
+        self.reset()
+
+    def reset(self):
+        self._state = _State(self._lag)
+        self._saved = None
+        # monotonic (index, atr) deque for the rolling max of ATR over min_bars bars
+        self._maxq = deque()
+        self._undo = None
+        self._history.clear()
+        self.last_time = None
+
+    @property
+    def ready(self):
+        """True once enough bars were consumed for detect_signals to stop returning empties."""
+        return self._state.n >= self.min_bars
+
+    @property
+    def count(self):
+        return self._state.n
+
+    def _push_max(self, i, value):
+        popped_back = []
+        q = self._maxq
+        while q and q[-1][1] <= value:
+            popped_back.append(q.pop())
+        q.append((i, value))
+        popped_front = []
+        while q[0][0] <= i - self.min_bars:
+            popped_front.append(q.popleft())
+        self._undo = (popped_back, popped_front)
+
+    def _undo_max(self):
+        popped_back, popped_front = self._undo
+        q = self._maxq
+        for item in reversed(popped_front):
+            q.appendleft(item)
+        q.pop()
+        for item in reversed(popped_back):
+            q.append(item)
+        self._undo = None
+
+    def update(self, high, low, close, time=None):
+        """Consume one bar and return its SignalBar.
+
+        If `time` is given and equals the time of the previous bar, that bar is
+        replaced instead of appended.
+        """
+        if time is not None and self.last_time is not None and time == self.last_time and self._saved is not None:
+            self._state = self._saved
+            self._undo_max()
+            self._history.pop()
+        high = float(high)
+        low = float(low)
+        close = float(close)
+        self._saved = self._state.copy()
+        s = self._state
+        i = s.n
+        L = self.ema_length
+
+        # ZLEMA: EMA (adjust=False, min_periods=L) of close + (close - close[lag]);
+        # the source is NaN for the first `lag` bars so the EMA seeds on bar `lag`.
+        s.closes.append(close)
+        if len(s.closes) > self._lag:
+            src = close + (close - s.closes[0])
+            if s.zlema_count == 0:
+                ema = src
+            else:
+                ema = (1 - self._ema_alpha) * s.zlema + self._ema_alpha * src
+            s.zlema = ema
+            s.zlema_count += 1
+        zlema = s.zlema if s.zlema_count >= L else _NAN
+
+        # ATR (Wilder) exactly as ta.volatility.AverageTrueRange: zeros until the
+        # first full window, seeded with the mean true range of that window.
+        if math.isnan(s.prev_close):
+            tr = high - low
+        else:
+            tr = max(high - low, abs(high - s.prev_close), abs(low - s.prev_close))
+        if i < L:
+            s.tr_sum += tr
+            s.atr = s.tr_sum / L if i == L - 1 else 0.0
+        else:
+            s.atr = (s.atr * (L - 1) + tr) / float(L)
+        self._push_max(i, s.atr)
+        if i >= self.min_bars - 1:
+            volatility = self._maxq[0][1] * self.band_mult
+        else:
+            volatility = _NAN
+        upper = zlema + volatility
+        lower = zlema - volatility
+
+        cross_up = _gt(close, upper) and _le(s.prev_close, s.prev_upper)
+        cross_down = _lt(close, lower) and _ge(s.prev_close, s.prev_lower)
+        prev_trend = s.trend
+        if not math.isnan(zlema):
+            if cross_up:
+                s.trend = 1
+            elif cross_down:
+                s.trend = -1
+
+        # RSI: Wilder smoothing via ewm(alpha=1/n, adjust=False, min_periods=n);
+        # the first diff is NaN which ta maps to 0 gain / 0 loss.
+        diff = 0.0 if math.isnan(s.prev_close) else close - s.prev_close
+        up = diff if diff > 0 else 0.0
+        dn = -diff if diff < 0 else 0.0
+        if i == 0:
+            s.rsi_up, s.rsi_dn = up, dn
+        else:
+            a = self._rsi_alpha
+            s.rsi_up = (1 - a) * s.rsi_up + a * up
+            s.rsi_dn = (1 - a) * s.rsi_dn + a * dn
+        if i + 1 < self.rsi_length:
+            rsi = _NAN
+        elif s.rsi_dn == 0:
+            rsi = 100.0
+        else:
+            rsi = 100 - (100 / (1 + s.rsi_up / s.rsi_dn))
+
+        zlema_cross_up = _gt(close, zlema) and _le(s.prev_close, s.prev_zlema)
+        zlema_cross_down = _lt(close, zlema) and _ge(s.prev_close, s.prev_zlema)
+        long_entry = zlema_cross_up and s.trend == 1 and prev_trend == 1 and i > 0
+        short_entry = zlema_cross_down and s.trend == -1 and prev_trend == -1 and i > 0
+
+        s.prev_close = close
+        s.prev_upper = upper
+        s.prev_lower = lower
+        s.prev_zlema = zlema
+        s.prev_trend = prev_trend
+        s.n = i + 1
+        self.last_time = time
+        bar = SignalBar(time, bool(long_entry), bool(short_entry), zlema, int(s.trend), rsi)
+        self._history.append(bar)
+        return bar
+
+    def seed(self, df):
+        """Reset and consume every bar of `df` (datetime, high, low, close columns)."""
+        self.reset()
+        return self._consume(df, 0)
+
+    def _consume(self, df, start):
+        times = df['datetime'] if 'datetime' in df.columns else df.index.to_series()
+        bar = None
+        for t, h, l, c in zip(times.iloc[start:], df['high'].iloc[start:], df['low'].iloc[start:], df['close'].iloc[start:]):
+            bar = self.update(h, l, c, time=t)
+        return bar
+
+    def sync(self, df):
+        """Bring the stream up to date with `df` and return detect_signals-style Series.
+
+        Only bars at or after the last consumed time are processed. If `df`
+        does not overlap the consumed history (first use, gap or rewritten
+        history) the stream is re-seeded from the whole frame. The returned
+        Series cover the last `history` bars, indexed like the tail of `df`.
+        """
+        if df is None or len(df) == 0:
+            return self.recent()
+        times = df['datetime'] if 'datetime' in df.columns else df.index.to_series()
+        if self.last_time is None:
+            self.seed(df)
+        else:
+            pos = times.searchsorted(self.last_time, side='left') if times.is_monotonic_increasing else None
+            if pos is None or pos >= len(df) or times.iloc[pos] != self.last_time:
+                self.seed(df)
+            else:
+                # re-apply the last known bar (it may have been revised) then append the rest
+                self._consume(df, pos)
+        return self.recent(index=df.index)
+
+    def recent(self, n=None, index=None):
+        """Return (long_entry, short_entry, zlema, trend, rsi) Series for the last `n` bars."""
+        bars = list(self._history)
+        if n is not None:
+            bars = bars[-n:]
+        if index is not None:
+            idx = index[len(index) - len(bars):] if len(bars) <= len(index) else None
+        else:
+            idx = None
+        if not self.ready:
+            # mirror detect_signals' safe empty result on short history
+            bars = [b._replace(long_entry=False, short_entry=False, zlema=_NAN, trend=0, rsi=_NAN) for b in bars]
+        long_entry = pd.Series([b.long_entry for b in bars], index=idx, dtype=bool)
+        short_entry = pd.Series([b.short_entry for b in bars], index=idx, dtype=bool)
+        zlema = pd.Series([b.zlema for b in bars], index=idx, dtype=float)
+        trend = pd.Series([b.trend for b in bars], index=idx, dtype=int)
+        rsi = pd.Series([b.rsi for b in bars], index=idx, dtype=float)
+        return long_entry, short_entry, zlema, trend, rsi
+
+
+_streams = {}
+_streams_lock = threading.Lock()
+
+
+def get_stream(symbol, interval, ema_length=70, rsi_length=14, band_mult=1.2):
+    """Return the process-wide stream for (symbol, interval, params), creating it on first use."""
+    key = (symbol, interval, int(ema_length), int(rsi_length), float(band_mult))
+    with _streams_lock:
+        stream = _streams.get(key)
+        if stream is None:
+            stream = SignalStream(ema_length, rsi_length, band_mult)
+            _streams[key] = stream
+        return stream
@@ -0,0 +1,19 @@
+"""Helpers for Twelve Data interval strings such as '5min', '1h', '1day'."""
+import re
+
+import pandas as pd
+
+_UNIT_SECONDS = {'min': 60, 'h': 3600, 'day': 86400, 'week': 7 * 86400, 'month': 30 * 86400}
+_INTERVAL_RE = re.compile(r'^(\d+)(min|h|day|week|month)$')
+
+
+def interval_seconds(interval: str) -> int:
+    """Nominal bar length in seconds ('month' is taken as 30 days)."""
+    m = _INTERVAL_RE.match(interval)
+    if not m:
+        raise ValueError(f"Unsupported interval: {interval!r}")
+    return int(m.group(1)) * _UNIT_SECONDS[m.group(2)]
+
+
+def interval_timedelta(interval: str) -> pd.Timedelta:
+    return pd.Timedelta(seconds=interval_seconds(interval))
@@ -0,0 +1,244 @@
+"""Market data providers behind fetch_ohlc.
+
+A provider answers Twelve Data style `time_series` requests (`outputsize`,
+`start_date`) with frames in the cache layout (datetime/open/high/low/close/
+volume, ascending) and owns the clock the engine schedules against:
+
+- TwelveDataProvider: the REST API through TDClient. Pointing TD_BASE_URL at
+  td_standin.py serves the same requests from a local replay.
+- ReplayProvider: historical bars from a cache directory (its bar archive, or
+  else the columnar or CSV cache, as data_cache lays them out) or generated by
+  synthetic_ohlc, released as though they were arriving live. Replay time
+  starts REPLAY_WARMUP base bars into the history and runs REPLAY_SPEED times
+  faster than the wall clock; only bars that have closed by then are returned.
+  Intervals without a file of their own are resampled from the base interval.
+"""
+import logging
+import os
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+import bar_archive
+import columnar_store
+import data_cache
+import tracing
+from intervals import interval_seconds
+from resample import resample_ohlc
+from synthetic_ohlc import generate_ohlc
+
+# Cache directory to replay, or 'synthetic' for generated bars
+REPLAY_SOURCE = os.getenv('REPLAY_SOURCE', 'synthetic')
+# Replay seconds per wall-clock second (60: an hour of bars per minute)
+REPLAY_SPEED = float(os.getenv('REPLAY_SPEED', '1'))
+# Replay start (timestamp); by default REPLAY_WARMUP base bars into the history
+REPLAY_START = os.getenv('REPLAY_START', '')
+REPLAY_WARMUP = int(os.getenv('REPLAY_WARMUP', '3000'))
+# History length per symbol for REPLAY_SOURCE=synthetic
+REPLAY_SYNTHETIC_BARS = int(os.getenv('REPLAY_SYNTHETIC_BARS', '50000'))
+
+COLUMNS = ['datetime', 'open', 'high', 'low', 'close', 'volume']
+# Twelve Data's outputsize when none is given
+DEFAULT_OUTPUTSIZE = 30
+
+
+def rows_to_frame(rows):
+    """Normalize time_series JSON rows ({'datetime', 'open', ...}) to the cache layout."""
+    bars = pd.DataFrame(list(rows))
+    bars['datetime'] = pd.to_datetime(bars['datetime'])
+    bars[['open', 'high', 'low', 'close']] = bars[['open', 'high', 'low', 'close']].astype(float)
+    bars['volume'] = 1
+    return bars[COLUMNS].sort_values('datetime').reset_index(drop=True)
+
+
+class MarketDataProvider:
+    """Interface the engine fetches through; subclasses implement time_series."""
+
+    name = None
+
+    def problem(self):
+        """Why requests cannot be served (e.g. a missing key), or None."""
+        return None
+
+    def now(self):
+        """Epoch seconds on the provider's clock."""
+        return time.time()
+
+    def sleep(self, seconds):
+        """Sleep `seconds` of provider time."""
+        time.sleep(seconds)
+
+    def time_series(self, symbol, interval, outputsize=None, start_date=None):
+        """Bars of one symbol, oldest first. Raises on failure."""
+        raise NotImplementedError
+
+    def time_series_batch(self, symbols, interval, outputsize=None, start_date=None):
+        """{symbol: frame} for the symbols that returned bars; one request where the provider allows it."""
+        out = {}
+        for symbol in symbols:
+            try:
+                out[symbol] = self.time_series(symbol, interval, outputsize=outputsize, start_date=start_date)
+            except Exception as e:
+                logging.warning(f"No bars for {symbol} {interval} from {self.name}: {e}")
+        return out
+
+
+def _params(outputsize, start_date):
+    params = {}
+    if outputsize is not None:
+        params['outputsize'] = outputsize
+    if start_date is not None:
+        params['start_date'] = start_date
+    return params
+
+
+class TwelveDataProvider(MarketDataProvider):
+    """Twelve Data REST. `get_client` and `get_api_key` are called per request, so both can be swapped at runtime."""
+
+    name = 'twelvedata'
+
+    def __init__(self, get_client, get_api_key):
+        self._get_client = get_client
+        self._get_api_key = get_api_key
+
+    def problem(self):
+        if not self._get_api_key():
+            return "Twelve Data API key is missing. Set TWELVE_DATA_API_KEY in environment or myconfig."
+        return None
+
+    def time_series(self, symbol, interval, outputsize=None, start_date=None):
+        with tracing.span('twelvedata'):
+            bars = self._get_client().time_series(symbol=symbol, interval=interval, order='ASC',
+                                                  **_params(outputsize, start_date)).as_pandas()
+        bars = bars.reset_index()
+        if 'datetime' not in bars.columns:
+            bars = bars.rename(columns={bars.columns[0]: 'datetime'})
+        bars['datetime'] = pd.to_datetime(bars['datetime'])
+        bars[['open', 'high', 'low', 'close']] = bars[['open', 'high', 'low', 'close']].astype(float)
+        bars['volume'] = 1
+        return bars
+
+    def time_series_batch(self, symbols, interval, outputsize=None, start_date=None):
+        """One comma-separated request for all `symbols`; raises if the request itself fails."""
+        with tracing.span('twelvedata_batch'):
+            resp = self._get_client().time_series(symbol=','.join(symbols), interval=interval, order='ASC',
+                                                  **_params(outputsize, start_date)).as_json()
+        # a one-symbol request comes back as a plain tuple of rows
+        per_symbol = resp if isinstance(resp, dict) else {symbols[0]: resp}
+        return {sym: rows_to_frame(rows) for sym, rows in per_symbol.items() if rows}
+
+
+def _utc_ns(times):
+    """int64 epoch ns; naive timestamps are taken as UTC."""
+    times = pd.to_datetime(times)
+    if getattr(times.dt, 'tz', None) is not None:
+        times = times.dt.tz_convert('UTC').dt.tz_localize(None)
+    return times.to_numpy(dtype='datetime64[ns]').view('int64')
+
+
+class _Series:
+    """A replayed frame with its open/close times for binary search."""
+
+    def __init__(self, df, interval):
+        self.df = df[COLUMNS].reset_index(drop=True)
+        self.opens = _utc_ns(self.df['datetime'])
+        self.closes = self.opens + interval_seconds(interval) * 10**9
+
+
+class ReplayProvider(MarketDataProvider):
+    """Serve stored or synthetic history as if it were live, at `speed` times real time.
+
+    `source` is a cache directory or 'synthetic'. `start` is the replay time of
+    the first request (default: `warmup` base bars into the first series served).
+    """
+
+    name = 'replay'
+
+    def __init__(self, source=REPLAY_SOURCE, speed=REPLAY_SPEED, start=REPLAY_START or None, warmup=REPLAY_WARMUP,
+                 base_interval='5min', synthetic_bars=REPLAY_SYNTHETIC_BARS, clock=time.monotonic, sleep=time.sleep):
+        if speed <= 0:
+            raise ValueError(f"Replay speed must be positive, got {speed}")
+        self.source = source
+        self.speed = float(speed)
+        self.warmup = int(warmup)
+        self.base_interval = base_interval
+        self.synthetic_bars = int(synthetic_bars)
+        self._start = None if start is None else int(_utc_ns(pd.Series([pd.Timestamp(start)]))[0])
+        self._clock = clock
+        self._sleep = sleep
+        self._clock0 = None
+        self._series = {}
+        self._lock = threading.RLock()
+
+    def problem(self):
+        if self.source != 'synthetic' and not os.path.isdir(self.source):
+            return f"Replay source {self.source!r} is not a directory (or 'synthetic')"
+        return None
+
+    def _load(self, symbol, interval):
+        if self.source == 'synthetic':
+            if interval != self.base_interval:
+                return None
+            return generate_ohlc(self.synthetic_bars, seed=zlib.crc32(symbol.encode('utf-8')), interval=interval,
+                                 start='2024-01-01')
+        name = os.path.splitext(os.path.basename(data_cache._cache_path(symbol, interval)))[0]
+        path = os.path.join(self.source, name)
+        # the long-history archive, when there is one, holds more than the cache
+        archive = bar_archive.BarArchive(os.path.join(self.source, 'archive', name + bar_archive.SUFFIX))
+        if len(archive):
+            return bar_archive.to_frame(archive.records())
+        if columnar_store.exists(path):
+            return columnar_store.load(path)
+        if os.path.exists(path + '.csv'):
+            return data_cache._load_csv(path + '.csv')
+        return None
+
+    def _get(self, symbol, interval):
+        key = (symbol, interval)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                df = self._load(symbol, interval)
+                if df is None and interval != self.base_interval:
+                    base = self._get(symbol, self.base_interval)
+                    df = resample_ohlc(base.df, interval)
+                if df is None or len(df) == 0:
+                    raise KeyError(f"No replay data for {symbol} {interval}")
+                series = self._series[key] = _Series(df, interval)
+            return series
+
+    def _ensure_started(self, symbol):
+        with self._lock:
+            if self._clock0 is not None:
+                return
+            if self._start is None:
+                base = self._get(symbol, self.base_interval)
+                self._start = int(base.closes[min(self.warmup, len(base.closes)) - 1])
+            self._clock0 = self._clock()
+
+    def now(self):
+        with self._lock:
+            if self._clock0 is None:
+                # not started yet: time stands at the start (wall clock if that is still unknown)
+                return self._start / 1e9 if self._start is not None else time.time()
+            return self._start / 1e9 + (self._clock() - self._clock0) * self.speed
+
+    def sleep(self, seconds):
+        self._sleep(max(0.0, seconds) / self.speed)
+
+    def time_series(self, symbol, interval, outputsize=None, start_date=None):
+        series = self._get(symbol, interval)
+        self._ensure_started(symbol)
+        now_ns = int(self.now() * 1e9)
+        end = int(np.searchsorted(series.closes, now_ns, side='right'))
+        begin = 0
+        if start_date is not None:
+            start_ns = int(_utc_ns(pd.Series([pd.Timestamp(start_date)]))[0])
+            begin = int(np.searchsorted(series.opens, start_ns, side='left'))
+        begin = max(begin, end - int(outputsize or DEFAULT_OUTPUTSIZE))
+        if begin >= end:
+            raise LookupError(f"No closed {interval} bars for {symbol} in the requested range")
+        return series.df.iloc[begin:end].reset_index(drop=True)
@@ -0,0 +1,249 @@
+"""In-process counters, gauges and latency histograms in Prometheus text format.
+
+Metrics are registered once at import time of the instrumented module:
+
+    FETCHES = metrics.counter('ohlc_fetch_total', 'fetch_ohlc calls', ['source'])
+    FETCHES.labels('cache').inc()
+    with metrics.timer(LATENCY.labels('5min')):
+        ...
+
+Recording a value is a dict lookup plus a short lock; rendering (`render()`,
+the Flask `/metrics` route or `serve()` for the engine) walks the registry.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds; spans a cache hit (~0.1ms) to a slow API call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _label_str(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{n}="{_escape(v)}"' for n, v in pairs) + '}'
+
+
+def _fmt(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+        self._fn = None
+
+    def set(self, value):
+        self.value = float(value)
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1.0):
+        self.inc(-amount)
+
+    def set_function(self, fn):
+        """Read the value from `fn()` at render time (e.g. a queue depth)."""
+        self._fn = fn
+
+    def get(self):
+        return float(self._fn()) if self._fn is not None else self.value
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), **child_args):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._child_args = child_args
+        self._children = {}
+        self._aliases = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._aliases.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            key = tuple(map(str, values))
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+                # also reachable by the raw values, so the hot path is one dict lookup
+                self._aliases[values] = child
+        return child
+
+    def _default(self):
+        return self.labels()
+
+    def _samples(self):
+        with self._lock:
+            return list(self._children.items())
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in self._samples():
+            lines.extend(self._render_child(key, child))
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1.0):
+        self._default().inc(amount)
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{_label_str(self.labelnames, key)} {_fmt(child.value)}"]
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def set_function(self, fn):
+        self._default().set_function(fn)
+
+    def _render_child(self, key, child):
+        try:
+            value = child.get()
+        except Exception:
+            value = float('nan')
+        return [f"{self.name}{_label_str(self.labelnames, key)} {_fmt(value)}"]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def _new_child(self):
+        return _HistogramChild(self._child_args['buckets'])
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def _render_child(self, key, child):
+        with child._lock:
+            counts = list(child.counts)
+            total = child.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(list(child.buckets) + [float('inf')], counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{_label_str(self.labelnames, key, [('le', _fmt(bound))])} {cumulative}")
+        lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {_fmt(total)}")
+        lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+def _register(cls, name, documentation, labelnames, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = cls(name, documentation, labelnames, **kwargs)
+            _registry[name] = metric
+        elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+            raise ValueError(f"Metric {name} is already registered with a different type or labels")
+        return metric
+
+
+def counter(name, documentation, labelnames=()):
+    return _register(Counter, name, documentation, labelnames)
+
+
+def gauge(name, documentation, labelnames=()):
+    return _register(Gauge, name, documentation, labelnames)
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram, name, documentation, labelnames, buckets=tuple(sorted(buckets)))
+
+
+@contextmanager
+def timer(hist):
+    """Observe the wall time of the with-block (seconds) on a histogram or histogram child."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        hist.observe(time.perf_counter() - start)
+
+
+def render():
+    """All registered metrics in Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port, host='0.0.0.0'):
+    """Serve /metrics on a daemon thread (for processes without a web framework); returns the server."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
@@ -0,0 +1,244 @@
+"""Durable outbox for webhook signal delivery.
+
+The engine loop only calls `enqueue()`, which commits the request to a local
+SQLite table and returns immediately. Background worker threads claim due rows
+and POST them through `http_client`; failures are retried with exponential
+backoff and jitter until OUTBOX_MAX_ATTEMPTS, after which the row is moved to
+the dead-letter state. Claimed rows carry a lease, so anything in flight when
+the process died is picked up again after a restart.
+
+Usage:
+    outbox.start()
+    outbox.enqueue(url, payload, headers={'Idempotency-Key': signal_id})
+    outbox.stats()  # queue depth, dead letters, delivery latency
+"""
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import http_client
+import metrics
+
+DB_PATH = os.getenv('OUTBOX_DB_PATH', os.path.join(os.path.dirname(__file__), 'outbox.db'))
+WORKERS = int(os.getenv('OUTBOX_WORKERS', '2'))
+MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '8'))
+BACKOFF_BASE = float(os.getenv('OUTBOX_BACKOFF_BASE', '2'))
+BACKOFF_CAP = float(os.getenv('OUTBOX_BACKOFF_CAP', '300'))
+# Seconds a worker may hold a claimed row before another worker may take it over
+LEASE_SECONDS = float(os.getenv('OUTBOX_LEASE_SECONDS', '60'))
+# Delivered rows are kept this long (seconds) for inspection, then purged
+RETENTION_SECONDS = int(os.getenv('OUTBOX_RETENTION_SECONDS', '86400'))
+POLL_SECONDS = 1.0
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()
+_wake = threading.Event()
+_stop = threading.Event()
+_workers = []
+_stats_lock = threading.Lock()
+_stats = {'delivered': 0, 'failed_attempts': 0, 'dead': 0, 'latency_total': 0.0, 'latency_max': 0.0}
+
+DELIVERIES = metrics.counter('outbox_deliveries_total', 'Outbox delivery attempts by outcome (delivered, retry, dead)',
+                             ['outcome'])
+DELIVERY_LATENCY = metrics.histogram('outbox_delivery_seconds', 'Time from enqueue to successful delivery',
+                                     buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600))
+
+
+def _connect():
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'path', None) != DB_PATH:
+        conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA busy_timeout=30000')
+        _local.conn = conn
+        _local.path = DB_PATH
+    with _schema_lock:
+        if DB_PATH not in _schema_ready:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    headers TEXT,
+                    signal_id TEXT,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    next_attempt_at REAL NOT NULL,
+                    lease_until REAL,
+                    delivered_at REAL,
+                    last_error TEXT
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS outbox_due ON outbox(status, next_attempt_at)')
+            _schema_ready.add(DB_PATH)
+    return conn
+
+
+def _json_default(obj):
+    # numpy scalars (e.g. a trend read from a Series) -> plain Python values
+    if hasattr(obj, 'item'):
+        return obj.item()
+    return str(obj)
+
+
+def enqueue(url, payload, headers=None, signal_id=None):
+    """Durably queue a JSON POST of `payload` to `url` and return its row id."""
+    now = time.time()
+    conn = _connect()
+    cur = conn.execute(
+        'INSERT INTO outbox(url, payload, headers, signal_id, created_at, next_attempt_at) VALUES (?, ?, ?, ?, ?, ?)',
+        (url, json.dumps(payload, default=_json_default), json.dumps(headers or {}), signal_id, now, now),
+    )
+    _wake.set()
+    return cur.lastrowid
+
+
+def _claim(now):
+    """Atomically lease the oldest due row (pending, or in flight with an expired lease)."""
+    conn = _connect()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        row = conn.execute(
+            "SELECT id, url, payload, headers, attempts, created_at FROM outbox "
+            "WHERE (status = 'pending' AND next_attempt_at <= ?) OR (status = 'inflight' AND lease_until < ?) "
+            "ORDER BY next_attempt_at, id LIMIT 1",
+            (now, now),
+        ).fetchone()
+        if row is not None:
+            conn.execute("UPDATE outbox SET status = 'inflight', lease_until = ? WHERE id = ?", (now + LEASE_SECONDS, row[0]))
+        conn.execute('COMMIT')
+        return row
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def _retry_delay(attempts):
+    # exponential backoff with +/-50% jitter so retries of a burst spread out
+    return min(BACKOFF_CAP, BACKOFF_BASE ** attempts) * random.uniform(0.5, 1.5)
+
+
+def _deliver(row):
+    row_id, url, payload, headers, attempts, created_at = row
+    conn = _connect()
+    attempts += 1
+    error = None
+    try:
+        resp = http_client.post(url, data=payload, headers={'Content-Type': 'application/json', **json.loads(headers or '{}')})
+        if resp is None:
+            error = 'rejected or unreachable'
+    except Exception as e:
+        error = str(e)
+    now = time.time()
+    if error is None:
+        conn.execute("UPDATE outbox SET status = 'delivered', attempts = ?, delivered_at = ?, lease_until = NULL WHERE id = ?",
+                     (attempts, now, row_id))
+        latency = now - created_at
+        with _stats_lock:
+            _stats['delivered'] += 1
+            _stats['latency_total'] += latency
+            _stats['latency_max'] = max(_stats['latency_max'], latency)
+        DELIVERIES.labels('delivered').inc()
+        DELIVERY_LATENCY.observe(latency)
+        logging.info(f"Outbox delivered #{row_id} after {attempts} attempt(s), {latency:.2f}s in queue")
+        return
+    with _stats_lock:
+        _stats['failed_attempts'] += 1
+    if attempts >= MAX_ATTEMPTS:
+        conn.execute("UPDATE outbox SET status = 'dead', attempts = ?, last_error = ?, lease_until = NULL WHERE id = ?",
+                     (attempts, error, row_id))
+        with _stats_lock:
+            _stats['dead'] += 1
+        DELIVERIES.labels('dead').inc()
+        logging.error(f"Outbox #{row_id} dead-lettered after {attempts} attempts: {error}")
+        return
+    DELIVERIES.labels('retry').inc()
+    delay = _retry_delay(attempts)
+    conn.execute("UPDATE outbox SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ?, lease_until = NULL WHERE id = ?",
+                 (attempts, now + delay, error, row_id))
+    logging.warning(f"Outbox #{row_id} attempt {attempts} failed ({error}); retrying in {delay:.1f}s")
+
+
+def _purge(now):
+    _connect().execute("DELETE FROM outbox WHERE status = 'delivered' AND delivered_at < ?", (now - RETENTION_SECONDS,))
+
+
+def process_due(limit=None):
+    """Deliver due rows in the calling thread; returns how many were processed."""
+    done = 0
+    while limit is None or done < limit:
+        row = _claim(time.time())
+        if row is None:
+            break
+        _deliver(row)
+        done += 1
+    return done
+
+
+def _worker():
+    last_purge = 0.0
+    while not _stop.is_set():
+        try:
+            if process_due() == 0:
+                now = time.time()
+                if now - last_purge > 3600:
+                    _purge(now)
+                    last_purge = now
+                _wake.wait(POLL_SECONDS)
+                _wake.clear()
+        except Exception as e:
+            logging.error(f"Outbox worker error: {e}", exc_info=True)
+            _stop.wait(POLL_SECONDS)
+
+
+def start(workers=None):
+    """Start the background delivery threads (idempotent)."""
+    if any(t.is_alive() for t in _workers):
+        return
+    _stop.clear()
+    _workers.clear()
+    for i in range(workers or WORKERS):
+        t = threading.Thread(target=_worker, name=f"outbox-{i}", daemon=True)
+        t.start()
+        _workers.append(t)
+
+
+def stop(timeout=5):
+    _stop.set()
+    _wake.set()
+    for t in _workers:
+        t.join(timeout)
+    _workers.clear()
+
+
+def requeue_dead():
+    """Move dead-lettered rows back to pending with a fresh attempt budget."""
+    cur = _connect().execute(
+        "UPDATE outbox SET status = 'pending', attempts = 0, next_attempt_at = ? WHERE status = 'dead'", (time.time(),))
+    _wake.set()
+    return cur.rowcount
+
+
+def stats():
+    """Queue depth by status, age of the oldest undelivered row and delivery latency."""
+    conn = _connect()
+    counts = dict(conn.execute('SELECT status, COUNT(*) FROM outbox GROUP BY status').fetchall())
+    oldest = conn.execute("SELECT MIN(created_at) FROM outbox WHERE status IN ('pending', 'inflight')").fetchone()[0]
+    with _stats_lock:
+        s = dict(_stats)
+    return {
+        'pending': counts.get('pending', 0),
+        'inflight': counts.get('inflight', 0),
+        'dead': counts.get('dead', 0),
+        'oldest_pending_age': time.time() - oldest if oldest else 0.0,
+        'delivered': s['delivered'],
+        'failed_attempts': s['failed_attempts'],
+        'avg_delivery_latency': s['latency_total'] / s['delivered'] if s['delivered'] else 0.0,
+        'max_delivery_latency': s['latency_max'],
+    }
@@ -0,0 +1,169 @@
+"""Sliding-window price move detection for the spot price poller.
+
+Every sample (epoch seconds, price) goes into an in-memory buffer covering the
+longest window and into one `MoveWindow` per configured (window, threshold).
+Each window keeps monotonic min/max deques, so the lowest and highest price of
+the last `seconds` are known in O(1) amortized per tick. A move of at least
+`threshold` percent from that low (up) or high (down) to the latest price
+fires once. The window then re-arms from the current price, so a trend
+produces one alert per further `threshold` percent instead of one per poll.
+
+    detector = PriceMoveDetector(parse_windows('5min:0.5,1h:1'))
+    for move in detector.add(time.time(), price):
+        ...  # Move(window, seconds, threshold, direction, percent, ref_price, ref_time, price, time)
+
+The buffer and the re-arm times are written to a JSON snapshot at most every
+`snapshot_interval` seconds (atomically), not on every poll, and reloaded on
+start so a restart keeps the windows it had.
+"""
+import json
+import logging
+import os
+from collections import deque, namedtuple
+
+from intervals import interval_seconds
+
+# Comma-separated window:threshold_percent pairs; windows are interval strings or seconds
+PRICE_MOVE_WINDOWS = os.getenv('PRICE_MOVE_WINDOWS', '5min:0.5,1h:1')
+PRICE_SNAPSHOT_FILE = os.getenv('PRICE_SNAPSHOT_FILE', 'price_window.json')
+PRICE_SNAPSHOT_INTERVAL = float(os.getenv('PRICE_SNAPSHOT_INTERVAL', '60'))
+# Hard cap on buffered samples (memory bound for very fast polling)
+PRICE_BUFFER_MAX = int(os.getenv('PRICE_BUFFER_MAX', '200000'))
+
+Move = namedtuple('Move', ['window', 'seconds', 'threshold', 'direction', 'percent',
+                           'ref_price', 'ref_time', 'price', 'time'])
+
+
+def parse_windows(spec):
+    """[(label, seconds, threshold_percent)] from e.g. '5min:0.5,1h:1' or '90:0.2'."""
+    windows = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        label, sep, threshold = part.partition(':')
+        if not sep:
+            raise ValueError(f"Price move window {part!r} is not window:threshold")
+        label = label.strip()
+        seconds = float(label) if label.replace('.', '', 1).isdigit() else interval_seconds(label)
+        if seconds <= 0 or float(threshold) <= 0:
+            raise ValueError(f"Price move window {part!r} needs a positive length and threshold")
+        windows.append((label, seconds, float(threshold)))
+    return windows
+
+
+class MoveWindow:
+    """Min/max of the samples in the last `seconds` and the move of the latest price from them."""
+
+    def __init__(self, label, seconds, threshold):
+        self.label = label
+        self.seconds = float(seconds)
+        self.threshold = float(threshold)
+        self.armed_at = float('-inf')
+        self._min = deque()  # (ts, price), prices increasing
+        self._max = deque()  # (ts, price), prices decreasing
+
+    def push(self, ts, price):
+        """Add a sample and return the Move it completes, or None."""
+        if ts < self.armed_at:
+            return None
+        while self._min and self._min[-1][1] >= price:
+            self._min.pop()
+        self._min.append((ts, price))
+        while self._max and self._max[-1][1] <= price:
+            self._max.pop()
+        self._max.append((ts, price))
+        cutoff = ts - self.seconds
+        while self._min[0][0] < cutoff:
+            self._min.popleft()
+        while self._max[0][0] < cutoff:
+            self._max.popleft()
+        low_ts, low = self._min[0]
+        high_ts, high = self._max[0]
+        up = (price - low) / low * 100 if low > 0 else 0.0
+        down = (price - high) / high * 100 if high > 0 else 0.0
+        if up >= self.threshold and up >= -down:
+            move = Move(self.label, self.seconds, self.threshold, 'up', up, low, low_ts, price, ts)
+        elif -down >= self.threshold:
+            move = Move(self.label, self.seconds, self.threshold, 'down', down, high, high_ts, price, ts)
+        else:
+            return None
+        self.rearm(ts, price)
+        return move
+
+    def rearm(self, ts, price):
+        """Forget everything before `ts`; the next move is measured from `price`."""
+        self.armed_at = ts
+        self._min.clear()
+        self._max.clear()
+        self._min.append((ts, price))
+        self._max.append((ts, price))
+
+
+class PriceMoveDetector:
+    """Buffers timestamped prices and checks every configured window on each tick."""
+
+    def __init__(self, windows, snapshot_file=None, snapshot_interval=PRICE_SNAPSHOT_INTERVAL,
+                 max_samples=PRICE_BUFFER_MAX):
+        if not windows:
+            raise ValueError("At least one price move window is required")
+        self.windows = [MoveWindow(*w) for w in windows]
+        self.horizon = max(w.seconds for w in self.windows)
+        self.samples = deque(maxlen=max_samples)
+        self.snapshot_file = snapshot_file
+        self.snapshot_interval = snapshot_interval
+        self._last_snapshot = None
+
+    def add(self, ts, price):
+        """Record a sample; returns the Moves it triggered (at most one per window)."""
+        ts, price = float(ts), float(price)
+        if self.samples and ts < self.samples[-1][0]:
+            logging.warning(f"Ignoring out-of-order price sample at {ts} (last {self.samples[-1][0]})")
+            return []
+        self.samples.append((ts, price))
+        cutoff = ts - self.horizon
+        while self.samples[0][0] < cutoff:
+            self.samples.popleft()
+        moves = [m for m in (w.push(ts, price) for w in self.windows) if m is not None]
+        if self.snapshot_file and (self._last_snapshot is None or ts - self._last_snapshot >= self.snapshot_interval):
+            self.save(ts)
+        return moves
+
+    def save(self, now=None):
+        """Write the buffer and re-arm times to `snapshot_file` (atomically)."""
+        state = {'samples': list(self.samples),
+                 'armed_at': {w.label: w.armed_at for w in self.windows if w.armed_at != float('-inf')}}
+        tmp = f"{self.snapshot_file}.tmp"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp, self.snapshot_file)
+        except OSError as e:
+            logging.warning(f"Could not write price snapshot {self.snapshot_file}: {e}")
+        self._last_snapshot = now if now is not None else (self.samples[-1][0] if self.samples else None)
+
+    def load(self, now):
+        """Restore samples from `snapshot_file` that are still inside the longest window; returns how many."""
+        if not self.snapshot_file or not os.path.exists(self.snapshot_file):
+            return 0
+        try:
+            with open(self.snapshot_file) as f:
+                state = json.load(f)
+            samples = [(float(ts), float(p)) for ts, p in state.get('samples', [])]
+            armed_at = {k: float(v) for k, v in state.get('armed_at', {}).items()}
+        except (OSError, ValueError, TypeError) as e:
+            logging.warning(f"Ignoring unreadable price snapshot {self.snapshot_file}: {e}")
+            return 0
+        for w in self.windows:
+            w.armed_at = armed_at.get(w.label, w.armed_at)
+        restored = 0
+        for ts, price in samples:
+            if ts < now - self.horizon or (self.samples and ts < self.samples[-1][0]):
+                continue
+            self.samples.append((ts, price))
+            for w in self.windows:
+                # a move completed in the replayed history was alerted (or missed) already; push re-arms past it
+                w.push(ts, price)
+            restored += 1
+        self._last_snapshot = now
+        return restored
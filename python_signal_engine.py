@@ -1,64 +1,350 @@
+import atexit
 import os
+import shutil
+import tempfile
 import pandas as pd
-import requests
 import time
 import logging
+import multiprocessing
 import numpy as np
 import hashlib
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from datetime import datetime, timezone
 from ta.trend import EMAIndicator
 from ta.volatility import AverageTrueRange
 from ta.momentum import RSIIndicator
 import myconfig
+import http_client
+import outbox
+import signal_memo
+import metrics
+import tracing
+import market_data
+import data_cache
+import series_store
 from twelvedata import TDClient
+from intervals import interval_seconds
+from bar_scheduler import BarScheduler
+from tick_stream import TickIngestor
+from data_cache import load_cache, append_to_cache, persist_bars
 
 # Configurable constants
 SYMBOL = os.getenv('SYMBOL', getattr(myconfig, 'SYMBOL', 'XAU/USD'))
 FETCH_LIMIT = int(os.getenv('FETCH_LIMIT', getattr(myconfig, 'FETCH_LIMIT', 20)))
 TD_API_KEY = os.getenv('TWELVE_DATA_API_KEY', getattr(myconfig, 'TWELVE_DATA_API_KEY', None))
+# Alternative Twelve Data host, e.g. a local td_standin.py (empty: the public API)
+TD_BASE_URL = os.getenv('TD_BASE_URL', getattr(myconfig, 'TD_BASE_URL', ''))
+# Where bars come from: 'twelvedata' or 'replay' (see market_data.py, REPLAY_* settings)
+DATA_PROVIDER = os.getenv('DATA_PROVIDER', getattr(myconfig, 'DATA_PROVIDER', 'twelvedata')).lower()
+# Cache directory for replay/stand-in runs; by default a fresh temporary one per run (never the production cache)
+REPLAY_CACHE_DIR = os.getenv('REPLAY_CACHE_DIR', getattr(myconfig, 'REPLAY_CACHE_DIR', ''))
 EMA_LENGTH = int(os.getenv('EMA_LENGTH', getattr(myconfig, 'EMA_LENGTH', 70)))
+# Universe mode: comma-separated list of symbols scanned concurrently (defaults to SYMBOL)
+SYMBOLS = [s.strip() for s in str(os.getenv('SYMBOLS', getattr(myconfig, 'SYMBOLS', SYMBOL))).split(',') if s.strip()]
+FETCH_WORKERS = int(os.getenv('FETCH_WORKERS', getattr(myconfig, 'FETCH_WORKERS', 16)))
+EVAL_WORKERS = int(os.getenv('EVAL_WORKERS', getattr(myconfig, 'EVAL_WORKERS', os.cpu_count() or 1)))
+# Group universe fetches into comma-separated Twelve Data batch requests
+BATCH_FETCH = str(os.getenv('BATCH_FETCH', getattr(myconfig, 'BATCH_FETCH', '1'))).lower() in ('1', 'true', 'yes')
+TD_BATCH_SIZE = int(os.getenv('TD_BATCH_SIZE', getattr(myconfig, 'TD_BATCH_SIZE', 50)))
+# Deliver signals from the main loop through the durable outbox (background workers)
+USE_OUTBOX = str(os.getenv('USE_OUTBOX', getattr(myconfig, 'USE_OUTBOX', '1'))).lower() in ('1', 'true', 'yes')
+# Timeframes checked for agreement; the first one supplies price/trend/rsi for the signal
+TIMEFRAMES = ("5min", "15min", "1h")
+# Fetch only bars newer than the cache instead of returning a full cache untouched
+DELTA_FETCH = str(os.getenv('DELTA_FETCH', getattr(myconfig, 'DELTA_FETCH', '1'))).lower() in ('1', 'true', 'yes')
+# Largest outputsize Twelve Data serves in one time_series request
+TD_MAX_OUTPUTSIZE = 5000
+# Where 15min/1h bars come from: 'resample' (built from BASE_INTERVAL), 'fetch' (API) or 'verify' (both, compared)
+HTF_SOURCE = os.getenv('HTF_SOURCE', getattr(myconfig, 'HTF_SOURCE', 'resample')).lower()
+BASE_INTERVAL = os.getenv('BASE_INTERVAL', getattr(myconfig, 'BASE_INTERVAL', '5min'))
+# Rows kept in the on-disk cache per series (raised automatically when a fetch needs more)
+CACHE_MAX_ROWS = 2000
+# Use the incremental per-series engine (incremental_signals) instead of recomputing every cycle
+STREAMING_SIGNALS = str(os.getenv('STREAMING_SIGNALS', getattr(myconfig, 'STREAMING_SIGNALS', '0'))).lower() in ('1', 'true', 'yes')
+# Wake BAR_CLOSE_DELAY seconds after bar closes and only refresh the timeframes that rolled (0: poll every 60s)
+BAR_SCHEDULE = str(os.getenv('BAR_SCHEDULE', getattr(myconfig, 'BAR_SCHEDULE', '1'))).lower() in ('1', 'true', 'yes')
+BAR_CLOSE_DELAY = float(os.getenv('BAR_CLOSE_DELAY', getattr(myconfig, 'BAR_CLOSE_DELAY', 3)))
+# Build bars from the WebSocket price stream and evaluate as soon as one closes (REST only backfills)
+STREAM_TICKS = str(os.getenv('STREAM_TICKS', getattr(myconfig, 'STREAM_TICKS', '0'))).lower() in ('1', 'true', 'yes')
+# Price stream URL; defaults to Twelve Data's with TWELVE_DATA_API_KEY (a ws_standin.py URL for offline runs)
+TD_WS_URL = os.getenv('TD_WS_URL', getattr(myconfig, 'TD_WS_URL', ''))
+# Seconds to wait for other series closing at the same boundary before evaluating
+STREAM_COALESCE = float(os.getenv('STREAM_COALESCE', getattr(myconfig, 'STREAM_COALESCE', 0.05)))
+# Serve Prometheus /metrics from the engine on this port (0 disables it)
+METRICS_PORT = int(os.getenv('METRICS_PORT', getattr(myconfig, 'METRICS_PORT', 0)))
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
 
+_td_client = None
+_td_client_lock = threading.Lock()
+_provider = None
+_provider_lock = threading.Lock()
+# Stream mode: per-series ring buffers the tick ingestor appends to and the evaluation reads from
+_live_series = series_store.SeriesStore()
+# Set by _analyze_timed: detect_signals times go into this dict instead of the (per-process) metrics
+_detect_timings = threading.local()
+
+FETCHES = metrics.counter('ohlc_fetch_total', 'OHLC series served, by source (cache, api, fallback, failed)', ['source'])
+FETCH_LATENCY = metrics.histogram('ohlc_fetch_seconds', 'fetch_ohlc latency by source', ['source'])
+BATCH_FETCH_LATENCY = metrics.histogram('ohlc_batch_fetch_seconds', 'fetch_ohlc_batch latency for all pairs')
+DETECT_LATENCY = metrics.histogram('detect_signals_seconds', 'detect_signals computation time (memo misses)', ['interval'])
+DETECT_MEMO = metrics.counter('detect_signals_memo_total', 'detect_signals memo lookups by result (hit, miss)',
+                              ['interval', 'result'])
+SIGNALS = metrics.counter('webhook_signals_total', 'Signals by outcome (sent, queued, failed, duplicate, dry_run)',
+                          ['outcome'])
+
+def _bars_missing(last_time, interval, now=None):
+    """Estimate how many bars have opened since the bar starting at `last_time`.
+
+    Naive timestamps are taken as UTC. This is only used to size the request,
+    the `start_date` sent to the API uses the cached timestamp as-is.
+    """
+    ts = pd.Timestamp(last_time)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize('UTC')
+    now = now if now is not None else pd.Timestamp.now(tz='UTC')
+    elapsed = (now - ts).total_seconds()
+    return max(0, int(elapsed // interval_seconds(interval)))
+
+def _delta_params(cached, interval, limit, now=None):
+    """Twelve Data parameters fetching only the bars newer than the cache.
+
+    The last cached bar is always included since it may still be forming; when
+    nothing new has closed that is the only bar returned. Gaps too large for one
+    request fall back to a plain `outputsize=limit` fetch.
+    """
+    last_time = cached['datetime'].iloc[-1]
+    missing = _bars_missing(last_time, interval, now=now)
+    if missing + 1 > TD_MAX_OUTPUTSIZE:
+        return {'outputsize': limit}, missing
+    # The twelvedata client sends outputsize=30 unless told otherwise, which would
+    # truncate a start_date range, so ask for the maximum explicitly.
+    return {'start_date': pd.Timestamp(last_time).strftime('%Y-%m-%d %H:%M:%S'), 'outputsize': TD_MAX_OUTPUTSIZE}, missing
+
+def _get_td_client():
+    """Process-wide TDClient, so every request reuses one HTTP session."""
+    global _td_client
+    with _td_client_lock:
+        if _td_client is None:
+            _td_client = TDClient(apikey=TD_API_KEY, base_url=TD_BASE_URL or None)
+            # route Twelve Data through the shared pooled session (keep-alive + stats)
+            _td_client.ctx.http_client.session = http_client.get_session(_td_client.ctx.base_url)
+        return _td_client
+
+def _use_offline_cache():
+    """Keep replayed bars out of the production cache (and its archive) on replay and stand-in runs."""
+    if REPLAY_CACHE_DIR:
+        path = os.path.abspath(REPLAY_CACHE_DIR)
+        if path == os.path.abspath(data_cache.DEFAULT_CACHE_DIR):
+            raise ValueError(f"REPLAY_CACHE_DIR must not be the production cache ({path})")
+    elif os.path.abspath(data_cache.CACHE_DIR) == os.path.abspath(data_cache.DEFAULT_CACHE_DIR):
+        path = tempfile.mkdtemp(prefix='replay-cache-')
+        atexit.register(shutil.rmtree, path, ignore_errors=True)
+    else:
+        # DATA_CACHE_DIR was pointed somewhere else on purpose
+        return
+    data_cache.use_cache_dir(path)
+    logging.info(f"Offline data source: caching bars in {path}")
+
+def get_provider():
+    """Process-wide market data provider selected by DATA_PROVIDER.
+
+    Replay runs and runs against a TD_BASE_URL stand-in cache their bars
+    outside the production data_cache (see _use_offline_cache).
+    """
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            if DATA_PROVIDER == 'replay' or TD_BASE_URL:
+                _use_offline_cache()
+            if DATA_PROVIDER == 'twelvedata':
+                # resolved per request, so the pooled client and key stay in this module
+                _provider = market_data.TwelveDataProvider(lambda: _get_td_client(), lambda: TD_API_KEY)
+            elif DATA_PROVIDER == 'replay':
+                _provider = market_data.ReplayProvider(base_interval=BASE_INTERVAL)
+            else:
+                raise ValueError(f"Unknown DATA_PROVIDER: {DATA_PROVIDER!r}")
+        return _provider
+
+def _provider_now(provider):
+    return pd.Timestamp(provider.now(), unit='s', tz='UTC')
+
+def _store_bars(symbol, interval, cached, bars, limit):
+    # If cache exists, append and return combined tail
+    if cached is not None:
+        combined = append_to_cache(symbol, interval, bars, max_rows=max(CACHE_MAX_ROWS, limit))
+        return combined.tail(limit).reset_index(drop=True)
+    # No cache existed: save the bars as cache and return
+    append_to_cache(symbol, interval, bars, max_rows=max(CACHE_MAX_ROWS, limit))
+    return bars
+
 def fetch_ohlc(symbol=SYMBOL, interval="5min", limit=FETCH_LIMIT):
-    if not TD_API_KEY:
-        logging.error("Twelve Data API key is missing. Set TWELVE_DATA_API_KEY in environment or myconfig.")
-        return None
-    # Use cache to assemble history; fetch only newest bars from API and append
-    from data_cache import load_cache, append_to_cache
-    td = TDClient(apikey=TD_API_KEY)
+    start = time.perf_counter()
+    with tracing.span('fetch_ohlc'):
+        df, source = _fetch_ohlc(symbol, interval, limit)
+    FETCHES.labels(source).inc()
+    FETCH_LATENCY.labels(source).observe(time.perf_counter() - start)
+    return df
+
+def _fetch_ohlc(symbol, interval, limit):
+    """fetch_ohlc returning (frame or None, source) for metrics."""
+    provider = get_provider()
+    problem = provider.problem()
+    if problem:
+        logging.error(problem)
+        return None, 'failed'
+    # Use cache to assemble history; fetch only newest bars from the provider and append
 
     # Load existing cache
     cached = load_cache(symbol, interval)
-    # If cache exists and has enough rows, return last `limit` rows immediately
-    if cached is not None and len(cached) >= limit:
-        return cached.tail(limit).reset_index(drop=True)
+    have_history = cached is not None and len(cached) >= limit
+    # Without delta fetching, a full cache is returned as-is (may be stale)
+    if have_history and not DELTA_FETCH:
+        return cached.tail(limit).reset_index(drop=True), 'cache'
 
-    # Otherwise, fetch available bars from Twelve Data (smallest possible chunk) and append
     try:
-        bars = td.time_series(symbol=symbol, interval=interval, outputsize=limit, order='ASC').as_pandas()
-        bars = bars.reset_index()
-        if 'datetime' not in bars.columns:
-            bars = bars.rename(columns={bars.columns[0]: 'datetime'})
-        bars['datetime'] = pd.to_datetime(bars['datetime'])
-        bars[['open', 'high', 'low', 'close']] = bars[['open', 'high', 'low', 'close']].astype(float)
-        bars['volume'] = 1
+        if have_history:
+            params, missing = _delta_params(cached, interval, limit, now=_provider_now(provider))
+            logging.info(f"Delta fetch {symbol} {interval}: ~{missing} new bar(s) since {cached['datetime'].iloc[-1]}")
+        else:
+            # Not enough history: fetch a full window and append
+            params = {'outputsize': limit}
+        bars = provider.time_series(symbol, interval, **params)
         bars = bars.tail(limit).reset_index(drop=True)
     except Exception as e:
-        logging.warning(f"Failed to fetch from Twelve Data: {e}")
+        logging.warning(f"Failed to fetch from {provider.name}: {e}")
         # Fall back to cache if available
         if cached is not None:
-            return cached.tail(limit).reset_index(drop=True)
-        return None
+            return cached.tail(limit).reset_index(drop=True), 'fallback'
+        return None, 'failed'
 
-    # If cache exists, append and return combined tail
-    if cached is not None:
-        combined = append_to_cache(symbol, interval, bars)
-        return combined.tail(limit).reset_index(drop=True)
+    return _store_bars(symbol, interval, cached, bars, limit), 'api'
 
-    # No cache existed: save the bars as cache and return
-    append_to_cache(symbol, interval, bars)
-    return bars
+def fetch_ohlc_batch(pairs, limit=FETCH_LIMIT):
+    """Fetch many (symbol, interval) pairs with one provider request per interval and batch.
+
+    Pairs are grouped by interval and by whether the cache already holds `limit`
+    bars. Cached series share one delta request starting at the oldest last
+    cached bar of the group (rows a symbol already has are deduped on append);
+    the others share one full `outputsize=limit` request. Each group is split
+    into comma-separated symbol lists of at most TD_BATCH_SIZE. Returns
+    {(symbol, interval): DataFrame or None}, like calling fetch_ohlc per pair.
+    """
+    provider = get_provider()
+    problem = provider.problem()
+    if problem:
+        logging.error(problem)
+        FETCHES.labels('failed').inc(len(pairs))
+        return {pair: None for pair in pairs}
+    with metrics.timer(BATCH_FETCH_LATENCY), tracing.span('fetch_ohlc_batch'):
+        return _fetch_ohlc_batch(provider, pairs, limit)
+
+def _fetch_ohlc_batch(provider, pairs, limit):
+    now = _provider_now(provider)
+    cached = {}
+    out = {}
+    groups = {}
+    for symbol, interval in dict.fromkeys(pairs):
+        df = load_cache(symbol, interval)
+        cached[(symbol, interval)] = df
+        have_history = df is not None and len(df) >= limit
+        if have_history and not DELTA_FETCH:
+            out[(symbol, interval)] = df.tail(limit).reset_index(drop=True)
+            FETCHES.labels('cache').inc()
+            continue
+        kind = 'full'
+        if have_history:
+            params, missing = _delta_params(df, interval, limit, now=now)
+            kind = 'delta' if 'start_date' in params else 'full'
+        groups.setdefault((interval, kind), []).append(symbol)
+
+    for (interval, kind), symbols in groups.items():
+        if kind == 'delta':
+            start = min(pd.Timestamp(cached[(sym, interval)]['datetime'].iloc[-1]) for sym in symbols)
+            params = {'start_date': start.strftime('%Y-%m-%d %H:%M:%S'), 'outputsize': TD_MAX_OUTPUTSIZE}
+        else:
+            params = {'outputsize': limit}
+        for i in range(0, len(symbols), TD_BATCH_SIZE):
+            chunk = symbols[i:i + TD_BATCH_SIZE]
+            try:
+                per_symbol = provider.time_series_batch(chunk, interval, **params)
+            except Exception as e:
+                logging.warning(f"Batch fetch of {len(chunk)} symbol(s) at {interval} failed: {e}")
+                per_symbol = {}
+            logging.info(f"Batch fetch {interval} ({kind}): {len(chunk)} symbol(s) in one request")
+            for sym in chunk:
+                key = (sym, interval)
+                bars = per_symbol.get(sym)
+                if bars is None or len(bars) == 0:
+                    logging.warning(f"No bars returned for {sym} {interval}")
+                    df = cached[key]
+                    out[key] = None if df is None else df.tail(limit).reset_index(drop=True)
+                    FETCHES.labels('failed' if df is None else 'fallback').inc()
+                    continue
+                bars = bars.tail(limit).reset_index(drop=True)
+                out[key] = _store_bars(sym, interval, cached[key], bars, limit)
+                FETCHES.labels('api').inc()
+    return {pair: out.get(pair) for pair in pairs}
+
+def _base_limit(intervals, limit):
+    """Base bars needed to build `limit` bars of the largest interval."""
+    base_step = interval_seconds(BASE_INTERVAL)
+    ratio = max(interval_seconds(i) // base_step for i in intervals)
+    # +1 bucket so a partial first bucket does not cost a bar
+    return (limit + 1) * ratio
+
+def _timeframes_from_base(symbol, intervals, limit, base, direct=None):
+    """Build each interval from the base frame; `direct` holds provider frames for 'verify'."""
+    from resample import resample_from_base, compare_bars
+    out = {}
+    for interval in intervals:
+        if interval == BASE_INTERVAL:
+            out[interval] = None if base is None else base.tail(limit).reset_index(drop=True)
+            continue
+        local = resample_from_base(symbol, interval, base, max_rows=limit + 1) if base is not None else None
+        if HTF_SOURCE == 'verify':
+            provider = direct.get(interval) if direct else fetch_ohlc(symbol=symbol, interval=interval, limit=limit)
+            mismatched, compared = compare_bars(local, provider)
+            logging.info(f"Resample check {symbol} {interval}: {mismatched}/{compared} closed bars differ")
+            out[interval] = provider
+        elif local is None or len(local) < limit:
+            logging.info(f"Not enough {BASE_INTERVAL} history to build {interval}; fetching it directly")
+            out[interval] = fetch_ohlc(symbol=symbol, interval=interval, limit=limit)
+        else:
+            out[interval] = local.tail(limit).reset_index(drop=True)
+    return out
+
+def fetch_timeframes(symbol=SYMBOL, intervals=("5min", "15min", "1h"), limit=FETCH_LIMIT):
+    """Return {interval: last `limit` bars} for each interval.
+
+    With HTF_SOURCE='resample' only BASE_INTERVAL is fetched and the higher
+    timeframes are built from it locally (see resample.py), so all timeframes
+    come from the same data. A timeframe falls back to a direct fetch when the
+    base history is too short for `limit` bars. HTF_SOURCE='fetch' requests
+    every timeframe from the API; 'verify' does both, logs any differences and
+    uses the provider's bars.
+    """
+    if HTF_SOURCE == 'fetch':
+        return {interval: fetch_ohlc(symbol=symbol, interval=interval, limit=limit) for interval in intervals}
+    base = fetch_ohlc(symbol=symbol, interval=BASE_INTERVAL, limit=_base_limit(intervals, limit))
+    return _timeframes_from_base(symbol, intervals, limit, base)
+
+def fetch_universe(symbols, intervals=("5min", "15min", "1h"), limit=FETCH_LIMIT):
+    """fetch_timeframes for many symbols using batched requests: {symbol: {interval: frame}}."""
+    if HTF_SOURCE == 'fetch':
+        got = fetch_ohlc_batch([(sym, i) for sym in symbols for i in intervals], limit)
+        return {sym: {i: got[(sym, i)] for i in intervals} for sym in symbols}
+    bases = fetch_ohlc_batch([(sym, BASE_INTERVAL) for sym in symbols], _base_limit(intervals, limit))
+    direct = {}
+    if HTF_SOURCE == 'verify':
+        direct = fetch_ohlc_batch([(sym, i) for sym in symbols for i in intervals if i != BASE_INTERVAL], limit)
+    return {
+        sym: _timeframes_from_base(sym, intervals, limit, bases[(sym, BASE_INTERVAL)],
+                                   {i: direct.get((sym, i)) for i in intervals} if direct else None)
+        for sym in symbols
+    }
 
 def detect_signals(df, ema_length=70, rsi_length=14, band_mult=1.2):
     # Minimum bars required: ATR rolling(window=ema_length*3) needs ema_length*3 bars
@@ -80,42 +366,48 @@ def detect_signals(df, ema_length=70, rsi_length=14, band_mult=1.2):
 
     lag = int((ema_length - 1) / 2)
     src = df['close']
-    zlema = EMAIndicator(src + (src - src.shift(lag)), window=ema_length).ema_indicator()
-    atr = AverageTrueRange(df['high'], df['low'], df['close'], window=ema_length).average_true_range()
-    volatility = atr.rolling(window=ema_length*3).max() * band_mult
-
-    # Compute crossover / crossunder against the deviation bands (stateful like Pine Script)
-    upper_band = zlema + volatility
-    lower_band = zlema - volatility
-
-    # Boolean crossovers (requires previous bar comparison)
-    cross_up = (df['close'] > upper_band) & (df['close'].shift(1) <= upper_band.shift(1))
-    cross_down = (df['close'] < lower_band) & (df['close'].shift(1) >= lower_band.shift(1))
+    with tracing.span('zlema'):
+        zlema = EMAIndicator(src + (src - src.shift(lag)), window=ema_length).ema_indicator()
+    with tracing.span('atr'):
+        atr = AverageTrueRange(df['high'], df['low'], df['close'], window=ema_length).average_true_range()
+    with tracing.span('volatility'):
+        volatility = atr.rolling(window=ema_length*3).max() * band_mult
+
+    with tracing.span('bands'):
+        # Compute crossover / crossunder against the deviation bands (stateful like Pine Script)
+        upper_band = zlema + volatility
+        lower_band = zlema - volatility
+
+        # Boolean crossovers (requires previous bar comparison)
+        cross_up = (df['close'] > upper_band) & (df['close'].shift(1) <= upper_band.shift(1))
+        cross_down = (df['close'] < lower_band) & (df['close'].shift(1) >= lower_band.shift(1))
 
     # Initialize trend series and fill it iteratively so trend persists until a flip occurs
-    trend = pd.Series(0, index=df.index, dtype=int)
-    prev = 0
-    for i in range(len(df)):
-        if i == 0:
-            # first bar: set based on crossover if present, otherwise 0
-            if cross_up.iloc[i] and zlema.notna().iloc[i]:
-                prev = 1
-            elif cross_down.iloc[i] and zlema.notna().iloc[i]:
-                prev = -1
-            else:
-                prev = 0
+    with tracing.span('trend_loop'):
+        trend = pd.Series(0, index=df.index, dtype=int)
+        prev = 0
+        for i in range(len(df)):
+            if i == 0:
+                # first bar: set based on crossover if present, otherwise 0
+                if cross_up.iloc[i] and zlema.notna().iloc[i]:
+                    prev = 1
+                elif cross_down.iloc[i] and zlema.notna().iloc[i]:
+                    prev = -1
+                else:
+                    prev = 0
+                trend.iloc[i] = prev
+                continue
+            if zlema.notna().iloc[i]:
+                if cross_up.iloc[i]:
+                    prev = 1
+                elif cross_down.iloc[i]:
+                    prev = -1
+                # else keep previous prev
+            # if zlema is nan keep prev as-is (can't determine yet)
             trend.iloc[i] = prev
-            continue
-        if zlema.notna().iloc[i]:
-            if cross_up.iloc[i]:
-                prev = 1
-            elif cross_down.iloc[i]:
-                prev = -1
-            # else keep previous prev
-        # if zlema is nan keep prev as-is (can't determine yet)
-        trend.iloc[i] = prev
 
-    rsi = RSIIndicator(df['close'], window=rsi_length).rsi()
+    with tracing.span('rsi'):
+        rsi = RSIIndicator(df['close'], window=rsi_length).rsi()
 
     # Entry signals: require crossover of price and ZLEMA, and require trend==1 (and was 1 previous)
     zlema_cross_up = (df['close'] > zlema) & (df['close'].shift(1) <= zlema.shift(1))
@@ -126,33 +418,33 @@ def detect_signals(df, ema_length=70, rsi_length=14, band_mult=1.2):
 
     return long_entry, short_entry, zlema, trend, rsi
 
-def send_signal_to_webhook(signal_type, price, ema_trend, rsi, webhook_url):
+def send_signal_to_webhook(signal_type, price, ema_trend, rsi, webhook_url, *, queue=False):
+    """POST a signal to the webhook; with queue=True hand it to the durable outbox instead."""
     data = {
         "signal_type": signal_type,
         "price": price,
         "ema_trend": ema_trend,
         "rsi": rsi
     }
+    if queue:
+        row_id = outbox.enqueue(webhook_url, data)
+        SIGNALS.labels('queued').inc()
+        logging.info(f"Queued {signal_type} signal for delivery (outbox #{row_id})")
+        return True
     # Additional metadata may be added via kwargs (keeps compatibility)
-    max_attempts = 3
-    backoff = 2
-    for attempt in range(1, max_attempts + 1):
-        try:
-            response = requests.post(webhook_url, json=data, timeout=10)
-            logging.info(f"Attempt {attempt}: Sent {signal_type} signal -> {response.status_code}")
-            if response.status_code in (200, 201, 202):
-                return True
-            else:
-                logging.warning(f"Webhook responded with status {response.status_code}: {response.text}")
-        except requests.exceptions.RequestException as e:
-            logging.warning(f"Attempt {attempt} failed to send webhook: {e}")
-        time.sleep(backoff ** attempt)
-    logging.error(f"Failed to send {signal_type} after {max_attempts} attempts.")
+    response = http_client.post(webhook_url, json=data, policy=http_client.WEBHOOK_RETRY)
+    if response is not None:
+        SIGNALS.labels('sent').inc()
+        logging.info(f"Sent {signal_type} signal -> {response.status_code}")
+        return True
+    SIGNALS.labels('failed').inc()
+    logging.error(f"Failed to send {signal_type} after {http_client.WEBHOOK_RETRY.attempts} attempts.")
     return False
 
 
 # Persistent dedupe store using SQLite so idempotency survives restarts.
-from dedupe_store import get as dedupe_get, set as dedupe_set, cleanup as dedupe_cleanup
+import dedupe_store
+from dedupe_store import get as dedupe_get, set as dedupe_set
 _DEDUP_TTL = int(os.getenv('DEDUP_TTL', '120'))  # seconds
 
 def _make_signal_id(symbol, timeframe, signal_type, bar_time):
@@ -168,19 +460,21 @@ def _make_signal_id(symbol, timeframe, signal_type, bar_time):
     return hashlib.sha256(key.encode('utf-8')).hexdigest()
 
 
-def send_signal_to_webhook_with_metadata(signal_type, price, ema_trend, rsi, webhook_url, *, symbol=None, timeframe=None, bar_time=None, dry_run=False):
+def send_signal_to_webhook_with_metadata(signal_type, price, ema_trend, rsi, webhook_url, *, symbol=None, timeframe=None, bar_time=None, dry_run=False, queue=False):
     """Send a webhook with extra metadata and idempotency.
 
     - Avoids sending the same (symbol,timeframe,signal,bar_time) more than once within TTL.
     - Adds an Idempotency-Key header and expanded JSON payload.
     - dry_run=True will only log the payload without POSTing.
+    - queue=True commits the request to the outbox and returns without waiting;
+      the signal counts as sent for dedupe once it is durably queued.
     """
     signal_id = _make_signal_id(symbol or SYMBOL, timeframe or '', signal_type, bar_time)
     now_ts = int(datetime.now(timezone.utc).timestamp())
-    # cleanup old entries from DB
-    dedupe_cleanup(now_ts - _DEDUP_TTL)
-    existing = dedupe_get(signal_id)
+    # entries older than the TTL count as absent; dedupe_store expires them in the background
+    existing = dedupe_get(signal_id, min_ts=now_ts - _DEDUP_TTL)
     if existing is not None:
+        SIGNALS.labels('duplicate').inc()
         logging.info(f"Skipping duplicate signal (recently sent): {signal_type} {symbol} {timeframe} {bar_time}")
         return False
 
@@ -199,86 +493,334 @@ def send_signal_to_webhook_with_metadata(signal_type, price, ema_trend, rsi, web
     logging.info(f"Prepared signal payload: {payload}")
     if dry_run:
         logging.info("Dry-run enabled: not POSTing to webhook")
+        SIGNALS.labels('dry_run').inc()
         dedupe_set(signal_id, now_ts)
         return True
 
     headers = {"Idempotency-Key": signal_id}
-    max_attempts = 3
-    backoff = 2
-    for attempt in range(1, max_attempts + 1):
-        try:
-            resp = requests.post(webhook_url, json=payload, headers=headers, timeout=10)
-            logging.info(f"Attempt {attempt}: POST {webhook_url} -> {resp.status_code}")
-            if resp.status_code in (200, 201, 202):
-                dedupe_set(signal_id, now_ts)
-                return True
-            else:
-                logging.warning(f"Webhook returned {resp.status_code}: {resp.text}")
-        except requests.exceptions.RequestException as e:
-            logging.warning(f"Attempt {attempt} failed: {e}")
-        time.sleep(backoff ** attempt)
+    if queue:
+        row_id = outbox.enqueue(webhook_url, payload, headers=headers, signal_id=signal_id)
+        SIGNALS.labels('queued').inc()
+        dedupe_set(signal_id, now_ts)
+        logging.info(f"Queued {signal_type} signal for delivery (outbox #{row_id})")
+        return True
+    resp = http_client.post(webhook_url, json=payload, headers=headers, policy=http_client.WEBHOOK_RETRY)
+    if resp is not None:
+        SIGNALS.labels('sent').inc()
+        dedupe_set(signal_id, now_ts)
+        return True
+    SIGNALS.labels('failed').inc()
     logging.error("All attempts to send webhook failed")
     return False
 
-def main():
-    webhook_url = os.getenv('WEBHOOK_URL', getattr(myconfig, 'WEBHOOK_URL', 'http://localhost:5000/webhook'))
-    fail_count = 0
+def evaluate_signals(df, symbol=SYMBOL, interval="5min"):
+    """Run the entry logic for one series, incrementally when STREAMING_SIGNALS is enabled.
+
+    Otherwise results are memoized per series and last bar (see signal_memo).
+    """
+    if STREAMING_SIGNALS:
+        from incremental_signals import get_stream
+        return get_stream(symbol, interval).sync(df)
+    return signal_memo.detect(symbol, interval, df, lambda *a, **kw: _timed_detect(interval, *a, **kw))
+
+def _timed_detect(interval, df, **params):
+    timings = getattr(_detect_timings, 'timings', None)
+    if timings is None:
+        with metrics.timer(DETECT_LATENCY.labels(interval)), tracing.span('detect_signals'):
+            return detect_signals(df, **params)
+    start = time.perf_counter()
+    with tracing.span('detect_signals'):
+        result = detect_signals(df, **params)
+    timings[interval] = time.perf_counter() - start
+    return result
+
+def _analyze_timed(frames, symbol, previous=None):
+    """analyze_timeframes plus {interval: detect_signals seconds, or None on a memo hit}.
+
+    Eval workers run this: their own metrics are never scraped, so the parent
+    observes the returned timings (_observe_detect).
+    """
+    _detect_timings.timings = timings = {}
+    try:
+        result = analyze_timeframes(frames, symbol=symbol, previous=previous)
+    finally:
+        _detect_timings.timings = None
+    if STREAMING_SIGNALS:
+        return result, {}
+    return result, {i: timings.get(i) for i in TIMEFRAMES if i in frames}
+
+def _observe_detect(timings):
+    for interval, seconds in timings.items():
+        if seconds is None:
+            DETECT_MEMO.labels(interval, 'hit').inc()
+        else:
+            DETECT_MEMO.labels(interval, 'miss').inc()
+            DETECT_LATENCY.labels(interval).observe(seconds)
+
+def analyze_timeframes(frames, symbol=SYMBOL, previous=None):
+    """Run the entry logic on every timeframe and count agreement over the last 3 bars.
+
+    Timeframes missing from `frames` reuse their flags from `previous` (the
+    last result for this symbol); the first timeframe must always be present.
+    Returns a plain dict so it can be computed in a worker process.
+    """
+    long_flags = {}
+    short_flags = {}
+    for interval in TIMEFRAMES:
+        if interval not in frames and previous is not None:
+            long_flags[interval] = previous["long"][interval]
+            short_flags[interval] = previous["short"][interval]
+            continue
+        long_entry, short_entry, zlema, trend, rsi = evaluate_signals(frames[interval], symbol=symbol, interval=interval)
+        # Check last 3 bars for entry conditions
+        long_flags[interval] = bool(long_entry.iloc[-3:].any())
+        short_flags[interval] = bool(short_entry.iloc[-3:].any())
+        if interval == TIMEFRAMES[0]:
+            trend_ltf, rsi_ltf = trend, rsi
+    df = frames[TIMEFRAMES[0]]
+    return {
+        "symbol": symbol,
+        "long": long_flags,
+        "short": short_flags,
+        # Count how many timeframes have a long/short entry in last 3 bars
+        "long_agree": sum(long_flags.values()),
+        "short_agree": sum(short_flags.values()),
+        "price": df['close'].iloc[-1],
+        "trend": trend_ltf.iloc[-1],
+        "rsi": rsi_ltf.iloc[-1],
+        "bar_time": df['datetime'].iloc[-1] if 'datetime' in df.columns else None,
+    }
+
+def _fetch_symbol(symbol, limit, intervals=TIMEFRAMES):
+    try:
+        return fetch_timeframes(symbol=symbol, intervals=intervals, limit=limit)
+    except Exception as e:
+        logging.error(f"Fetch failed for {symbol}: {e}", exc_info=True)
+        return None
+
+def scan_universe(symbols, limit, fetch_pool=None, eval_pool=None, intervals=TIMEFRAMES, previous=None, fetch=None):
+    """Fetch and analyze every symbol, returning {symbol: analysis, or None if data was insufficient}.
+
+    Several symbols are fetched with batched requests (BATCH_FETCH), otherwise
+    fetches run on `fetch_pool` (threads, I/O bound). Indicator evaluation runs on
+    `eval_pool` (processes, CPU bound) when given. Streaming evaluation keeps
+    per-series state in this process, so it is never sent to `eval_pool`.
+
+    Only `intervals` are fetched and evaluated; the other timeframes reuse the
+    flags of `previous` ({symbol: last analysis}). Every timeframe is refreshed
+    when a symbol has no previous analysis.
+
+    `fetch(symbol, limit, intervals)` replaces the provider fetch (e.g. reading
+    the cache kept current by the tick stream).
+    """
+    previous = previous or {}
+    if any(previous.get(sym) is None for sym in symbols):
+        intervals = TIMEFRAMES
+    intervals = tuple(i for i in TIMEFRAMES if i in intervals or i == TIMEFRAMES[0])
+    with tracing.span('fetch'):
+        if fetch is not None:
+            fetched = {sym: fetch(sym, limit, intervals) for sym in symbols}
+        elif BATCH_FETCH and len(symbols) > 1:
+            try:
+                fetched = fetch_universe(symbols, intervals=intervals, limit=limit)
+            except Exception as e:
+                logging.error(f"Batch fetch failed: {e}", exc_info=True)
+                fetched = {sym: None for sym in symbols}
+        elif fetch_pool is not None:
+            fetched = dict(zip(symbols, fetch_pool.map(lambda sym: _fetch_symbol(sym, limit, intervals), symbols)))
+        else:
+            fetched = {sym: _fetch_symbol(sym, limit, intervals) for sym in symbols}
+    results = {}
+    pending = {}
+    with tracing.span('evaluate'):
+        for sym, frames in fetched.items():
+            if frames is None or any(frames.get(i) is None or len(frames[i]) < 5 for i in intervals):
+                logging.warning(f"Insufficient data fetched for one or more timeframes of {sym}.")
+                results[sym] = None
+            elif eval_pool is not None and not STREAMING_SIGNALS:
+                pending[sym] = eval_pool.submit(_analyze_timed, frames, sym, previous.get(sym))
+            else:
+                results[sym], timings = _analyze_timed(frames, sym, previous.get(sym))
+                _observe_detect(timings)
+        for sym, future in pending.items():
+            try:
+                results[sym], timings = future.result()
+                _observe_detect(timings)
+            except Exception as e:
+                logging.error(f"Signal evaluation failed for {sym}: {e}", exc_info=True)
+                results[sym] = None
+    return {sym: results[sym] for sym in symbols}
+
+def _cached_timeframes(symbol, limit, intervals=TIMEFRAMES):
+    """Stream mode: zero-copy windows of the live series the tick ingestor keeps current; REST only when one is short."""
+    out = {}
+    for interval in intervals:
+        window = _live_series.window(symbol, interval, limit)
+        if window is None or len(window) < limit:
+            df = fetch_ohlc(symbol=symbol, interval=interval, limit=limit)
+            if df is not None:
+                _live_series.load(symbol, interval, df, limit)
+            window = _live_series.window(symbol, interval, limit)
+        out[interval] = window
+    return out
+
+def _stream_url():
+    return TD_WS_URL or f"wss://ws.twelvedata.com/v1/quotes/price?apikey={TD_API_KEY}"
+
+def _start_ingestor(symbols, limit, closed):
+    """Start the tick stream; closed bars go to the live series and the cache, and (symbol, intervals) onto `closed`."""
+    def store(symbol, interval, bar):
+        # the ring buffer is the in-memory copy, so the cache only has to write the new row
+        if not _live_series.update(symbol, interval, bar):
+            _live_series.discard(symbol, interval)
+            logging.info(f"Live series {symbol} {interval} could not take the bar; reloading it on the next cycle")
+        persist_bars(symbol, interval, bar, max_rows=max(CACHE_MAX_ROWS, limit))
+
+    def backfill(symbol, interval):
+        df = fetch_ohlc(symbol=symbol, interval=interval, limit=limit)
+        if df is not None:
+            _live_series.load(symbol, interval, df, limit)
+
+    ingestor = TickIngestor(_stream_url(), symbols, TIMEFRAMES, store, backfill,
+                            on_bars=lambda symbol, intervals: closed.put((symbol, intervals)))
+    return ingestor.start()
+
+def _wait_closed(closed):
+    """Block for the next closed bar, then collect what closes with it: ({symbol: intervals}, all intervals)."""
+    symbol, intervals = closed.get()
+    rolled = {symbol: set(intervals)}
+    deadline = time.monotonic() + STREAM_COALESCE
     while True:
         try:
-            # Ensure we fetch enough bars for indicators (ATR rolling uses ema_length*3)
-            required = int(EMA_LENGTH * 3)
-            effective_limit = max(FETCH_LIMIT, required)
-            logging.info(f"Using fetch limit={effective_limit} (configured {FETCH_LIMIT}, required {required})")
-            # Fetch LTF (5min), MTF (15min), and HTF (1h) data
-            df = fetch_ohlc(interval="5min", limit=effective_limit)
-            df_mtf = fetch_ohlc(interval="15min", limit=effective_limit)
-            df_htf = fetch_ohlc(interval="1h", limit=effective_limit)
-            if any(x is None or len(x) < 5 for x in [df, df_mtf, df_htf]):
-                logging.warning("Insufficient data fetched for one or more timeframes. Skipping this cycle.")
-                fail_count += 1
-                if fail_count >= 5:
-                    logging.error("Too many consecutive data fetch failures. Exiting.")
-                    break
-                time.sleep(60)
-                continue
-            fail_count = 0
-            # Run full entry logic on all three timeframes
-            long_entry_5m, short_entry_5m, zlema_5m, trend_5m, rsi_5m = detect_signals(df)
-            long_entry_15m, short_entry_15m, zlema_15m, trend_15m, rsi_15m = detect_signals(df_mtf)
-            long_entry_1h, short_entry_1h, zlema_1h, trend_1h, rsi_1h = detect_signals(df_htf)
-
-            # Check last 3 bars for entry conditions
-            long_5m = long_entry_5m.iloc[-3:]
-            long_15m = long_entry_15m.iloc[-3:]
-            long_1h = long_entry_1h.iloc[-3:]
-            short_5m = short_entry_5m.iloc[-3:]
-            short_15m = short_entry_15m.iloc[-3:]
-            short_1h = short_entry_1h.iloc[-3:]
-
-            # Count how many timeframes have a long/short entry in last 3 bars
-            long_agree = sum([long_5m.any(), long_15m.any(), long_1h.any()])
-            short_agree = sum([short_5m.any(), short_15m.any(), short_1h.any()])
-
-            logging.info(f"Last 3 bars - Long: 5m={long_5m.any()}, 15m={long_15m.any()}, 1h={long_1h.any()} | Agree={long_agree}")
-            logging.info(f"Last 3 bars - Short: 5m={short_5m.any()}, 15m={short_15m.any()}, 1h={short_1h.any()} | Agree={short_agree}")
-
-            # Send signal if any two timeframes agree
-            if long_agree >= 2:
-                logging.info("At least two timeframes agree on LONG. Sending signal...")
-                send_signal_to_webhook("longSignal", df['close'].iloc[-1], trend_5m.iloc[-1], rsi_5m.iloc[-1], webhook_url)
-            elif short_agree >= 2:
-                logging.info("At least two timeframes agree on SHORT. Sending signal...")
-                send_signal_to_webhook("shortSignal", df['close'].iloc[-1], trend_5m.iloc[-1], rsi_5m.iloc[-1], webhook_url)
-        except NotImplementedError:
-            logging.error("fetch_ohlc is not implemented. Please connect to your data source.")
+            symbol, intervals = closed.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
             break
-        except Exception as e:
-            logging.error(f"Error: {e}", exc_info=True)
-            fail_count += 1
-            if fail_count >= 5:
-                logging.error("Too many consecutive errors. Exiting.")
-                break
-        time.sleep(60)
+        rolled.setdefault(symbol, set()).update(intervals)
+    every = set().union(*rolled.values())
+    return rolled, tuple(i for i in TIMEFRAMES if i in every)
+
+def _act_on_analysis(result, webhook_url, with_metadata=False):
+    """Log the agreement summary and send a signal if at least two timeframes agree."""
+    long_summary = ", ".join(f"{i}={v}" for i, v in result["long"].items())
+    short_summary = ", ".join(f"{i}={v}" for i, v in result["short"].items())
+    logging.info(f"[{result['symbol']}] Last 3 bars - Long: {long_summary} | Agree={result['long_agree']}")
+    logging.info(f"[{result['symbol']}] Last 3 bars - Short: {short_summary} | Agree={result['short_agree']}")
+    if result["long_agree"] >= 2:
+        signal_type = "longSignal"
+        logging.info("At least two timeframes agree on LONG. Sending signal...")
+    elif result["short_agree"] >= 2:
+        signal_type = "shortSignal"
+        logging.info("At least two timeframes agree on SHORT. Sending signal...")
+    else:
+        return
+    with tracing.span('webhook_send'):
+        if with_metadata:
+            # Several symbols share the webhook: identify the symbol and dedupe per bar
+            send_signal_to_webhook_with_metadata(signal_type, result["price"], result["trend"], result["rsi"], webhook_url,
+                                                 symbol=result["symbol"], timeframe=TIMEFRAMES[0], bar_time=result["bar_time"],
+                                                 queue=USE_OUTBOX)
+        else:
+            send_signal_to_webhook(signal_type, result["price"], result["trend"], result["rsi"], webhook_url, queue=USE_OUTBOX)
+
+def main(symbols=None):
+    webhook_url = os.getenv('WEBHOOK_URL', getattr(myconfig, 'WEBHOOK_URL', 'http://localhost:5000/webhook'))
+    symbols = symbols or SYMBOLS
+    universe = len(symbols) > 1
+    fetch_pool = ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(symbols))) if universe else None
+    # spawned, not forked: workers start lazily, after the outbox, expiry, metrics and ingestor threads,
+    # and a fork would copy any lock one of those holds at that moment into the worker for good
+    eval_pool = (ProcessPoolExecutor(max_workers=EVAL_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+                 if universe and EVAL_WORKERS > 1 else None)
+    if universe:
+        logging.info(f"Universe mode: {len(symbols)} symbols, {FETCH_WORKERS} fetch threads, {EVAL_WORKERS} eval processes")
+    if USE_OUTBOX:
+        outbox.start()
+    dedupe_store.start_expiry(_DEDUP_TTL)
+    if METRICS_PORT:
+        metrics.serve(METRICS_PORT)
+        logging.info(f"Serving metrics on :{METRICS_PORT}/metrics")
+    provider = get_provider()
+    if provider.name != 'twelvedata':
+        logging.info(f"Market data provider: {provider.name}")
+    # bar closes and polling follow the provider's clock (replay time when replaying)
+    scheduler = BarScheduler(TIMEFRAMES, delay=BAR_CLOSE_DELAY, clock=provider.now, sleep=provider.sleep) if BAR_SCHEDULE else None
+    closed_bars = queue.Queue()
+    ingestor = None
+    if STREAM_TICKS:
+        scheduler = None
+        ingestor = _start_ingestor(symbols, max(FETCH_LIMIT, int(EMA_LENGTH * 3)), closed_bars)
+        logging.info(f"Streaming ticks for {len(symbols)} symbol(s); evaluating on every bar close")
+    last_results = {}
+    fail_count = 0
+    try:
+        while True:
+            cycle_symbols = symbols
+            if ingestor is not None:
+                closed, rolled = _wait_closed(closed_bars)
+                cycle_symbols = [sym for sym in symbols if sym in closed]
+            elif scheduler is not None:
+                rolled = scheduler.wait()
+            else:
+                rolled = TIMEFRAMES
+            # per-cycle span breakdown goes to tracing.TRACE_FILE
+            with tracing.cycle('engine', log=True):
+                try:
+                    # Ensure we fetch enough bars for indicators (ATR rolling uses ema_length*3)
+                    required = int(EMA_LENGTH * 3)
+                    effective_limit = max(FETCH_LIMIT, required)
+                    logging.info(f"Using fetch limit={effective_limit} (configured {FETCH_LIMIT}, required {required})")
+                    # Fetch LTF (5min), MTF (15min), and HTF (1h) data and run the entry logic per symbol
+                    if scheduler is not None or ingestor is not None:
+                        logging.info(f"Bar close: refreshing {', '.join(rolled)}")
+                    results = scan_universe(cycle_symbols, effective_limit, fetch_pool=fetch_pool, eval_pool=eval_pool,
+                                            intervals=rolled, previous=last_results,
+                                            fetch=_cached_timeframes if ingestor is not None else None)
+                    for sym, result in results.items():
+                        # a symbol without a result is fully refreshed next time
+                        if result is None:
+                            last_results.pop(sym, None)
+                        else:
+                            last_results[sym] = result
+                    if all(r is None for r in results.values()):
+                        logging.warning("Insufficient data fetched for one or more timeframes. Skipping this cycle.")
+                        fail_count += 1
+                        if fail_count >= 5:
+                            logging.error("Too many consecutive data fetch failures. Exiting.")
+                            break
+                    else:
+                        fail_count = 0
+                        for result in results.values():
+                            if result is not None:
+                                _act_on_analysis(result, webhook_url, with_metadata=universe)
+                        if USE_OUTBOX:
+                            logging.info(f"Outbox: {outbox.stats()}")
+                        if ingestor is not None:
+                            logging.info(f"Live series: {_live_series.stats()}")
+                        if not STREAMING_SIGNALS:
+                            # eval worker processes keep their own memo (shared through SIGNAL_MEMO_DIR if set)
+                            logging.info(f"Signal memo: {signal_memo.stats()}")
+                except NotImplementedError:
+                    logging.error("fetch_ohlc is not implemented. Please connect to your data source.")
+                    break
+                except Exception as e:
+                    logging.error(f"Error: {e}", exc_info=True)
+                    last_results.clear()
+                    fail_count += 1
+                    if fail_count >= 5:
+                        logging.error("Too many consecutive errors. Exiting.")
+                        break
+            # outside the cycle, so the trace only times the work
+            if scheduler is None and ingestor is None:
+                provider.sleep(60)
+    finally:
+        if ingestor is not None:
+            ingestor.stop()
+        if USE_OUTBOX:
+            outbox.stop()
+        dedupe_store.stop_expiry()
+        for pool in (fetch_pool, eval_pool):
+            if pool is not None:
+                pool.shutdown(wait=False)
 
 if __name__ == "__main__":
     main()
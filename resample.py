@@ -0,0 +1,135 @@
+"""Build higher-timeframe OHLC bars locally from a base (5-minute) series.
+
+Bars are bucketed by flooring each timestamp to the interval grid: intraday
+buckets are aligned to the epoch (so 15min starts at :00/:15/:30/:45 and 1h on
+the hour, as Twelve Data does), weeks start on Monday and months on the 1st.
+Timestamps are bucketed on their wall-clock value, i.e. in the provider's
+exchange timezone. Use `offset` for providers that shift session boundaries
+(e.g. 4h bars starting at 01:00).
+
+`Resampler` keeps the resampled frame for one series and, on update, only
+re-aggregates the base bars from the start of its last (partial) bucket.
+"""
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+from intervals import interval_seconds
+
+# Monday 1970-01-05, the first week boundary after the epoch
+_WEEK_ORIGIN_NS = 4 * 86400 * 10**9
+
+
+def _wall_clock_ns(times):
+    times = pd.to_datetime(times)
+    if getattr(times.dt, 'tz', None) is not None:
+        times = times.dt.tz_localize(None)
+    return times.to_numpy(dtype='datetime64[ns]').view('int64')
+
+
+def bucket_starts(times, interval, offset=None):
+    """Return the bucket start (int64 ns, wall clock) for each timestamp."""
+    ns = _wall_clock_ns(times)
+    offset_ns = 0 if offset is None else int(pd.Timedelta(offset).value)
+    if interval.endswith('month'):
+        n = int(interval[:-len('month')])
+        months = (ns - offset_ns).view('datetime64[ns]').astype('datetime64[M]').astype('int64')
+        months = (months // n) * n
+        return months.astype('datetime64[M]').astype('datetime64[ns]').view('int64') + offset_ns
+    step = interval_seconds(interval) * 10**9
+    origin = offset_ns + (_WEEK_ORIGIN_NS if interval.endswith('week') else 0)
+    return (ns - origin) // step * step + origin
+
+
+def resample_ohlc(df, interval, offset=None):
+    """Aggregate a time-sorted OHLC frame into `interval` bars (last bar may be partial)."""
+    if df is None or len(df) == 0:
+        return pd.DataFrame(columns=['datetime', 'open', 'high', 'low', 'close', 'volume'])
+    keys = bucket_starts(df['datetime'], interval, offset)
+    n = len(keys)
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    ends = np.concatenate((starts[1:], [n])) - 1
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    volume = df['volume'].to_numpy(dtype=float) if 'volume' in df.columns else np.ones(n)
+    times = pd.to_datetime(keys[starts].view('datetime64[ns]'))
+    tz = getattr(pd.to_datetime(df['datetime']).dt, 'tz', None)
+    if tz is not None:
+        times = times.tz_localize(tz)
+    return pd.DataFrame({
+        'datetime': times,
+        'open': df['open'].to_numpy(dtype=float)[starts],
+        'high': np.maximum.reduceat(high, starts),
+        'low': np.minimum.reduceat(low, starts),
+        'close': df['close'].to_numpy(dtype=float)[ends],
+        'volume': np.add.reduceat(volume, starts),
+    })
+
+
+class Resampler:
+    """Incrementally maintained higher-timeframe series built from base bars."""
+
+    def __init__(self, interval, offset=None, max_rows=None):
+        self.interval = interval
+        self.offset = offset
+        self.max_rows = max_rows
+        self.bars = None
+        self._base_last = None
+
+    def update(self, base_df):
+        """Fold `base_df` into the resampled series and return it.
+
+        Only base bars at or after the start of the last resampled bucket are
+        aggregated again. If the base history no longer lines up (rewritten or
+        truncated past that bucket) the whole series is rebuilt.
+        """
+        if base_df is None or len(base_df) == 0:
+            return self.bars
+        base_times = pd.to_datetime(base_df['datetime'])
+        if self.bars is None or len(self.bars) == 0 or base_times.iloc[0] > self.bars['datetime'].iloc[-1] \
+                or (self._base_last is not None and base_times.iloc[-1] < self._base_last):
+            self.bars = resample_ohlc(base_df, self.interval, self.offset)
+        else:
+            last_start = self.bars['datetime'].iloc[-1]
+            pos = base_times.searchsorted(last_start, side='left')
+            tail = resample_ohlc(base_df.iloc[pos:], self.interval, self.offset)
+            self.bars = pd.concat([self.bars.iloc[:-1], tail], ignore_index=True)
+        if self.max_rows is not None and len(self.bars) > self.max_rows:
+            self.bars = self.bars.tail(self.max_rows).reset_index(drop=True)
+        self._base_last = base_times.iloc[-1]
+        return self.bars
+
+
+_resamplers = {}
+_resamplers_lock = threading.Lock()
+
+
+def resample_from_base(symbol, interval, base_df, offset=None, max_rows=None):
+    """Return `interval` bars for `symbol` built from `base_df`, reusing earlier work."""
+    key = (symbol, interval, offset)
+    with _resamplers_lock:
+        resampler = _resamplers.get(key)
+        if resampler is None:
+            resampler = Resampler(interval, offset=offset, max_rows=max_rows)
+            _resamplers[key] = resampler
+    return resampler.update(base_df)
+
+
+def compare_bars(local, direct, rtol=1e-6):
+    """Count closed bars whose OHLC differs between a local and a directly fetched frame.
+
+    The last bar of each frame is ignored since it may still be forming.
+    """
+    if local is None or direct is None or len(local) < 2 or len(direct) < 2:
+        return 0, 0
+    merged = local.iloc[:-1].merge(direct.iloc[:-1], on='datetime', suffixes=('_local', '_direct'))
+    if merged.empty:
+        return 0, 0
+    bad = np.zeros(len(merged), dtype=bool)
+    for c in ('open', 'high', 'low', 'close'):
+        bad |= ~np.isclose(merged[f'{c}_local'], merged[f'{c}_direct'], rtol=rtol)
+    if bad.any():
+        logging.warning(f"Resampled bars differ from provider bars at {merged.loc[bad, 'datetime'].tolist()[:5]}")
+    return int(bad.sum()), len(merged)
@@ -0,0 +1,193 @@
+"""Fixed-capacity in-memory OHLC series for the live evaluation path.
+
+Each (symbol, interval) is an `OHLCRing`: preallocated NumPy columns (int64
+epoch-ns times, float64 open/high/low/close/volume) used as a ring buffer.
+Every bar is written twice, at `pos` and `pos + capacity`, so the newest `n`
+bars are always one contiguous slice. Appending and replacing the last bar are
+O(1), and `window(n)` returns a `BarWindow` of views into the buffer (no copy)
+that detect_signals, signal_memo and incremental_signals read like a frame:
+`w['close']`, `w.index`, `w.columns`, `len(w)`.
+
+Memory per series is fixed at capacity * 96 bytes (about 26 KB for the
+engine's 210-bar windows plus HEADROOM), so thousands of series fit in one
+process.
+
+A window shares memory with its ring: it stays valid for `capacity - n`
+further appends (HEADROOM when the store sizes the ring), and `replace_last`
+changes its last row in place. `SeriesStore.load` swaps in a new ring, so
+windows taken before a reload keep the old data.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ('datetime', 'open', 'high', 'low', 'close', 'volume')
+# Bars a SeriesStore ring holds beyond the window size it is loaded for
+HEADROOM = 64
+_VALUES = COLUMNS[1:]
+
+
+def _times_ns(values):
+    """int64 epoch ns of a datetime column; naive timestamps are taken as UTC."""
+    times = pd.to_datetime(pd.Series(values))
+    if getattr(times.dt, 'tz', None) is not None:
+        times = times.dt.tz_convert('UTC').dt.tz_localize(None)
+    return times.to_numpy(dtype='datetime64[ns]').view('int64')
+
+
+class BarWindow:
+    """Read-only, zero-copy view of consecutive bars, indexable by column name like a DataFrame."""
+
+    __slots__ = ('times', 'values')
+    columns = COLUMNS
+
+    def __init__(self, times, values):
+        self.times = times
+        self.values = values  # (5, n) rows in _VALUES order
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def index(self):
+        return pd.RangeIndex(len(self.times))
+
+    def column(self, name):
+        """The raw NumPy view of one column."""
+        if name == 'datetime':
+            return self.times.view('datetime64[ns]')
+        return self.values[_VALUES.index(name)]
+
+    def __getitem__(self, name):
+        return pd.Series(self.column(name), copy=False, name=name)
+
+    def tail(self, n):
+        n = max(0, min(int(n), len(self)))
+        return BarWindow(self.times[len(self) - n:], self.values[:, len(self) - n:])
+
+    def to_frame(self):
+        """A DataFrame copy in the cache layout."""
+        return pd.DataFrame({name: self.column(name).copy() for name in COLUMNS})
+
+
+class OHLCRing:
+    """The newest `capacity` bars of one series, oldest first."""
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError(f"Ring capacity must be positive, got {capacity}")
+        self.capacity = int(capacity)
+        self._times = np.zeros(2 * self.capacity, dtype=np.int64)
+        self._values = np.zeros((len(_VALUES), 2 * self.capacity), dtype=np.float64)
+        self._pos = -1  # slot of the newest bar
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        return self._times.nbytes + self._values.nbytes
+
+    def last_time(self):
+        """Epoch ns of the newest bar, or None when empty."""
+        return int(self._times[self._pos]) if self._size else None
+
+    def _write(self, slot, ts, row):
+        for s in (slot, slot + self.capacity):
+            self._times[s] = ts
+            self._values[:, s] = row
+
+    def append(self, ts, open_, high, low, close, volume=1.0):
+        """Add a bar newer than the last one, dropping the oldest when full."""
+        if self._size and ts <= self._times[self._pos]:
+            raise ValueError(f"Bar at {ts} is not newer than the last bar at {self._times[self._pos]}")
+        self._pos = (self._pos + 1) % self.capacity
+        self._write(self._pos, ts, (open_, high, low, close, volume))
+        self._size = min(self._size + 1, self.capacity)
+
+    def replace_last(self, open_, high, low, close, volume=1.0):
+        """Overwrite the newest bar (e.g. a still-forming bar that moved)."""
+        if not self._size:
+            raise IndexError("replace_last on an empty ring")
+        self._write(self._pos, self._times[self._pos], (open_, high, low, close, volume))
+
+    def upsert(self, ts, open_, high, low, close, volume=1.0):
+        """Append a newer bar or replace a bar with the same time; False if `ts` is older and not held."""
+        if not self._size or ts > self._times[self._pos]:
+            self.append(ts, open_, high, low, close, volume)
+            return True
+        end = self._pos + self.capacity + 1
+        begin = end - self._size
+        i = begin + int(np.searchsorted(self._times[begin:end], ts))
+        if i == end or self._times[i] != ts:
+            return False
+        self._write(i % self.capacity, ts, (open_, high, low, close, volume))
+        return True
+
+    def load(self, frame):
+        """Replace the contents with the last `capacity` rows of a cache-layout frame."""
+        frame = frame.tail(self.capacity)
+        n = len(frame)
+        times = _times_ns(frame['datetime'])
+        # newest bar in the last slot, so the mirror halves are filled by two block copies
+        self._times[self.capacity - n:self.capacity] = times
+        self._times[2 * self.capacity - n:] = times
+        for row, name in enumerate(_VALUES):
+            col = frame[name].to_numpy(dtype=np.float64)
+            self._values[row, self.capacity - n:self.capacity] = col
+            self._values[row, 2 * self.capacity - n:] = col
+        self._pos = self.capacity - 1
+        self._size = n
+
+    def update(self, frame):
+        """Merge cache-layout rows (ascending); False if one falls before the ring's history and cannot be placed."""
+        times = _times_ns(frame['datetime'])
+        cols = [frame[name].to_numpy(dtype=np.float64) for name in _VALUES]
+        for i, ts in enumerate(times):
+            if not self.upsert(int(ts), *(c[i] for c in cols)):
+                return False
+        return True
+
+    def window(self, n=None):
+        """The newest `n` bars (all held bars by default) as a zero-copy BarWindow."""
+        n = self._size if n is None else max(0, min(int(n), self._size))
+        end = self._pos + self.capacity + 1
+        return BarWindow(self._times[end - n:end], self._values[:, end - n:end])
+
+
+class SeriesStore:
+    """OHLCRings by (symbol, interval); updates and window reads may come from different threads."""
+
+    def __init__(self):
+        self._rings = {}
+        self._lock = threading.Lock()
+
+    def load(self, symbol, interval, frame, window):
+        """Replace a series with the tail of `frame` in a ring sized for `window`-bar views plus HEADROOM."""
+        ring = OHLCRing(int(window) + HEADROOM)
+        ring.load(frame)
+        with self._lock:
+            self._rings[(symbol, interval)] = ring
+
+    def update(self, symbol, interval, frame):
+        """Merge new or revised bars into a series; returns False if the series should be reloaded instead."""
+        with self._lock:
+            ring = self._rings.get((symbol, interval))
+            return ring is not None and len(ring) > 0 and ring.update(frame)
+
+    def discard(self, symbol, interval):
+        with self._lock:
+            self._rings.pop((symbol, interval), None)
+
+    def window(self, symbol, interval, n=None):
+        """Zero-copy view of the newest `n` bars, or None for an unknown series."""
+        with self._lock:
+            ring = self._rings.get((symbol, interval))
+            return None if ring is None or not len(ring) else ring.window(n)
+
+    def stats(self):
+        with self._lock:
+            return {'series': len(self._rings), 'bars': sum(len(r) for r in self._rings.values()),
+                    'bytes': sum(r.nbytes for r in self._rings.values())}
@@ -0,0 +1,199 @@
+"""Vectorized parameter-grid evaluation of `detect_signals`.
+
+`detect_signals_grid` evaluates many (ema_length, rsi_length, band_mult) sets
+over one OHLC series and returns 2-D (params x bars) arrays. Indicators are
+computed once per distinct ema_length / rsi_length (band_mult only scales the
+volatility band), and the trend state machine is solved without a per-bar loop
+by forward-filling the band cross events.
+
+Usage:
+    grid = param_grid([50, 70, 90], [14, 21], [1.0, 1.2, 1.5])
+    result = detect_signals_grid(df, grid)
+    result.long_entry.shape  # (len(grid), len(df))
+"""
+import itertools
+
+import numpy as np
+import pandas as pd
+
+
+def param_grid(ema_lengths, rsi_lengths=(14,), band_mults=(1.2,)):
+    """Return the cartesian product of the given values as (ema_length, rsi_length, band_mult) tuples."""
+    return [(int(e), int(r), float(b)) for e, r, b in itertools.product(ema_lengths, rsi_lengths, band_mults)]
+
+
+def _normalize_params(params):
+    out = []
+    for p in params:
+        if isinstance(p, dict):
+            out.append((int(p.get('ema_length', 70)), int(p.get('rsi_length', 14)), float(p.get('band_mult', 1.2))))
+        else:
+            e, r, b = p
+            out.append((int(e), int(r), float(b)))
+    return out
+
+
+def _ohlc_columns(ohlc):
+    """Return (high, low, close) float64 arrays from a DataFrame or an (N, 4) OHLC array."""
+    if isinstance(ohlc, pd.DataFrame):
+        return (ohlc['high'].to_numpy(dtype=float), ohlc['low'].to_numpy(dtype=float),
+                ohlc['close'].to_numpy(dtype=float))
+    arr = np.asarray(ohlc, dtype=float)
+    if arr.ndim != 2 or arr.shape[1] < 4:
+        raise ValueError('ohlc array must have shape (bars, 4) in open, high, low, close order')
+    return arr[:, 1], arr[:, 2], arr[:, 3]
+
+
+def _zlema(close, ema_length):
+    # Same as EMAIndicator(src + (src - src.shift(lag)), window=ema_length)
+    lag = int((ema_length - 1) / 2)
+    src = pd.Series(close)
+    zsrc = src + (src - src.shift(lag))
+    return zsrc.ewm(span=ema_length, min_periods=ema_length, adjust=False).mean().to_numpy()
+
+
+def _true_range(high, low, close):
+    prev_close = np.empty_like(close)
+    prev_close[0] = np.nan
+    prev_close[1:] = close[:-1]
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return tr
+
+
+def _atr(tr, window):
+    # ta's AverageTrueRange: zeros until window-1, seeded with the mean TR of the
+    # first window, then Wilder smoothing, which is an adjust=False ewm with alpha=1/window.
+    atr = np.zeros(len(tr))
+    if len(tr) < window:
+        return atr
+    seeded = np.concatenate(([tr[:window].mean()], tr[window:]))
+    atr[window - 1:] = pd.Series(seeded).ewm(alpha=1.0 / window, adjust=False).mean().to_numpy()
+    return atr
+
+
+def _rsi(close, window):
+    # Same as ta.momentum.RSIIndicator(close, window).rsi()
+    diff = pd.Series(close).diff(1)
+    up = diff.where(diff > 0, 0.0)
+    down = -diff.where(diff < 0, 0.0)
+    emaup = up.ewm(alpha=1 / window, min_periods=window, adjust=False).mean().to_numpy()
+    emadn = down.ewm(alpha=1 / window, min_periods=window, adjust=False).mean().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(emadn == 0, 100, 100 - (100 / (1 + emaup / emadn)))
+
+
+def _shift1(a):
+    out = np.empty_like(a)
+    out[:, 0] = np.nan if a.dtype.kind == 'f' else 0
+    out[:, 1:] = a[:, :-1]
+    return out
+
+
+def _ffill_events(events):
+    """Forward-fill the last non-zero event along axis 1 (0 before the first event)."""
+    n = events.shape[1]
+    pos = np.where(events != 0, np.arange(n), 0)
+    np.maximum.accumulate(pos, axis=1, out=pos)
+    return np.take_along_axis(events, pos, axis=1)
+
+
+class GridResult:
+    """2-D (params x bars) outputs of detect_signals_grid.
+
+    `long_entry`, `short_entry` and `trend` are materialized; `zlema` and `rsi`
+    are expanded from per-length tables on access since they only depend on
+    ema_length / rsi_length.
+    """
+
+    def __init__(self, params, long_entry, short_entry, trend, zlema_table, zlema_rows, rsi_table, rsi_rows, valid):
+        self.params = params
+        self.long_entry = long_entry
+        self.short_entry = short_entry
+        self.trend = trend
+        self._zlema_table = zlema_table
+        self._zlema_rows = zlema_rows
+        self._rsi_table = rsi_table
+        self._rsi_rows = rsi_rows
+        self._valid = valid
+
+    @property
+    def zlema(self):
+        out = self._zlema_table[self._zlema_rows]
+        out[~self._valid] = np.nan
+        return out
+
+    @property
+    def rsi(self):
+        out = self._rsi_table[self._rsi_rows]
+        out[~self._valid] = np.nan
+        return out
+
+    def row(self, i):
+        """Return the detect_signals-style tuple for parameter set `i` as NumPy arrays."""
+        z = self._zlema_table[self._zlema_rows[i]] if self._valid[i] else np.full(self.trend.shape[1], np.nan)
+        r = self._rsi_table[self._rsi_rows[i]] if self._valid[i] else np.full(self.trend.shape[1], np.nan)
+        return self.long_entry[i], self.short_entry[i], z, self.trend[i], r
+
+
+def detect_signals_grid(ohlc, params, chunk_size=64):
+    """Evaluate detect_signals for every parameter set in `params` in one pass.
+
+    `ohlc` is a DataFrame with high/low/close columns or an (N, 4) OHLC array.
+    `params` is an iterable of (ema_length, rsi_length, band_mult) tuples or
+    dicts with those keys. Parameter rows are processed `chunk_size` at a time
+    to bound the size of the 2-D temporaries.
+    """
+    params = _normalize_params(params)
+    high, low, close = _ohlc_columns(ohlc)
+    n = len(close)
+    p = len(params)
+
+    ema_lengths = sorted({e for e, _, _ in params})
+    rsi_lengths = sorted({r for _, r, _ in params})
+    ema_index = {e: i for i, e in enumerate(ema_lengths)}
+    rsi_index = {r: i for i, r in enumerate(rsi_lengths)}
+
+    tr = _true_range(high, low, close)
+    zlema_table = np.empty((len(ema_lengths), n))
+    vol_table = np.empty((len(ema_lengths), n))
+    for i, e in enumerate(ema_lengths):
+        zlema_table[i] = _zlema(close, e)
+        vol_table[i] = pd.Series(_atr(tr, e)).rolling(window=e * 3).max().to_numpy()
+    rsi_table = np.empty((len(rsi_lengths), n))
+    for i, r in enumerate(rsi_lengths):
+        rsi_table[i] = _rsi(close, r)
+
+    zlema_rows = np.array([ema_index[e] for e, _, _ in params], dtype=np.intp)
+    rsi_rows = np.array([rsi_index[r] for _, r, _ in params], dtype=np.intp)
+    mults = np.array([b for _, _, b in params], dtype=float)
+    # detect_signals returns safe empties when there are fewer than ema_length*3 bars
+    valid = np.array([n >= e * 3 for e, _, _ in params], dtype=bool)
+
+    long_entry = np.zeros((p, n), dtype=bool)
+    short_entry = np.zeros((p, n), dtype=bool)
+    trend = np.zeros((p, n), dtype=np.int8)
+    if n == 0:
+        return GridResult(params, long_entry, short_entry, trend, zlema_table, zlema_rows, rsi_table, rsi_rows, valid)
+
+    close_now = close[None, :]
+    close_prev = np.concatenate(([np.nan], close[:-1]))[None, :]
+    for start in range(0, p, chunk_size):
+        sl = slice(start, min(start + chunk_size, p))
+        z = zlema_table[zlema_rows[sl]]
+        vol = vol_table[zlema_rows[sl]] * mults[sl, None]
+        upper = z + vol
+        lower = z - vol
+        cross_up = (close_now > upper) & (close_prev <= _shift1(upper))
+        cross_down = (close_now < lower) & (close_prev >= _shift1(lower))
+        z_ok = ~np.isnan(z)
+        events = np.where(cross_up & z_ok, 1, np.where(cross_down & z_ok, -1, 0)).astype(np.int8)
+        t = _ffill_events(events)
+        t_prev = _shift1(t)
+        z_prev = _shift1(z)
+        zlema_cross_up = (close_now > z) & (close_prev <= z_prev)
+        zlema_cross_down = (close_now < z) & (close_prev >= z_prev)
+        ok = valid[sl, None]
+        long_entry[sl] = zlema_cross_up & (t == 1) & (t_prev == 1) & ok
+        short_entry[sl] = zlema_cross_down & (t == -1) & (t_prev == -1) & ok
+        trend[sl] = np.where(ok, t, 0)
+    return GridResult(params, long_entry, short_entry, trend, zlema_table, zlema_rows, rsi_table, rsi_rows, valid)
@@ -0,0 +1,125 @@
+"""Memoize detect_signals results per series, last bar and parameters.
+
+While no new bar has arrived, the engine evaluates the same frame again and
+again. Results are kept in a bounded in-process LRU keyed by (symbol, interval,
+last bar timestamp, row count, ema_length, rsi_length, band_mult). The last
+bar's high/low/close are part of the key too, since a still-forming bar keeps
+its timestamp while its prices move.
+
+With SIGNAL_MEMO_DIR set, results are also pickled there so other processes
+(eval workers, debug_signal_run.py) reuse them. Files are written atomically
+and the oldest are pruned beyond SIGNAL_MEMO_DISK_FILES.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+MEMO_SIZE = int(os.getenv('SIGNAL_MEMO_SIZE', '256'))
+MEMO_DIR = os.getenv('SIGNAL_MEMO_DIR', '')
+DISK_FILES = int(os.getenv('SIGNAL_MEMO_DISK_FILES', '1024'))
+
+_memo = OrderedDict()
+_lock = threading.Lock()
+_stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def memo_key(symbol, interval, df, ema_length, rsi_length, band_mult):
+    """Key for one detect_signals call, or None if `df` is empty."""
+    if df is None or len(df) == 0:
+        return None
+    # column-wise access, so series_store windows are keyed without building a frame
+    last_time = str(df['datetime'].iloc[-1]) if 'datetime' in df.columns else str(df.index[-1])
+    return (symbol, interval, last_time, len(df), int(ema_length), int(rsi_length), float(band_mult),
+            float(df['high'].iloc[-1]), float(df['low'].iloc[-1]), float(df['close'].iloc[-1]))
+
+
+def _disk_path(key):
+    return os.path.join(MEMO_DIR, hashlib.sha1(repr(key).encode('utf-8')).hexdigest() + '.pkl')
+
+
+def _disk_get(key):
+    try:
+        with open(_disk_path(key), 'rb') as f:
+            stored_key, value = pickle.load(f)
+    except (OSError, pickle.PickleError, EOFError, ValueError):
+        return None
+    return value if stored_key == key else None
+
+
+def _disk_put(key, value):
+    os.makedirs(MEMO_DIR, exist_ok=True)
+    path = _disk_path(key)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, 'wb') as f:
+            pickle.dump((key, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        _prune_disk()
+    except OSError as e:
+        logging.warning(f"Could not persist signal memo entry: {e}")
+
+
+def _prune_disk():
+    entries = [e for e in os.scandir(MEMO_DIR) if e.name.endswith('.pkl')]
+    if len(entries) <= DISK_FILES:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    for e in entries[:len(entries) - DISK_FILES]:
+        try:
+            os.remove(e.path)
+        except OSError:
+            pass
+
+
+def _put(key, value):
+    with _lock:
+        _memo[key] = value
+        _memo.move_to_end(key)
+        while len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+            _stats['evictions'] += 1
+
+
+def detect(symbol, interval, df, compute, ema_length=70, rsi_length=14, band_mult=1.2):
+    """Return compute(df, ema_length, rsi_length, band_mult), reusing an earlier result for the same key.
+
+    The returned Series are shared with the memo; treat them as read-only.
+    """
+    key = memo_key(symbol, interval, df, ema_length, rsi_length, band_mult)
+    if key is None or MEMO_SIZE <= 0:
+        return compute(df, ema_length=ema_length, rsi_length=rsi_length, band_mult=band_mult)
+    with _lock:
+        value = _memo.get(key)
+        if value is not None:
+            _memo.move_to_end(key)
+            _stats['hits'] += 1
+            return value
+    value = _disk_get(key) if MEMO_DIR else None
+    if value is not None:
+        with _lock:
+            _stats['disk_hits'] += 1
+        _put(key, value)
+        return value
+    with _lock:
+        _stats['misses'] += 1
+    value = compute(df, ema_length=ema_length, rsi_length=rsi_length, band_mult=band_mult)
+    _put(key, value)
+    if MEMO_DIR:
+        _disk_put(key, value)
+    return value
+
+
+def stats():
+    """Hit (memory and disk), miss and eviction counts plus current size of this process's memo."""
+    with _lock:
+        return dict(_stats, entries=len(_memo))
+
+
+def clear():
+    with _lock:
+        _memo.clear()
+        for k in _stats:
+            _stats[k] = 0
@@ -0,0 +1,120 @@
+"""Local stand-in for the Twelve Data `time_series` endpoint, backed by a replay.
+
+Usage:
+  python td_standin.py [--port 8081] [--source synthetic|CACHE_DIR] [--speed 60] [--latency-ms 0]
+
+Then run the engine against it with the regular Twelve Data code path:
+  TD_BASE_URL=http://127.0.0.1:8081 TWELVE_DATA_API_KEY=demo python python_signal_engine.py
+
+Supports `symbol` (comma-separated for batch requests), `interval`, `outputsize`,
+`start_date` and `order`, and answers in Twelve Data's JSON shapes, including
+per-symbol errors in batches and a 401 body when `apikey` is missing. Bars come
+from a market_data.ReplayProvider, so they appear as replay time passes.
+`--latency-ms` delays every response to approximate a remote API.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import market_data
+
+
+def _error(code, message):
+    return {'code': code, 'message': message, 'status': 'error'}
+
+
+def _series_body(provider, symbol, interval, outputsize, start_date, order):
+    try:
+        bars = provider.time_series(symbol, interval, outputsize=outputsize, start_date=start_date)
+    except KeyError:
+        return _error(400, f"**symbol** {symbol} not found for interval {interval}")
+    except LookupError as e:
+        return _error(400, f"No data is available on the specified dates. {e}")
+    times = bars['datetime'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    values = [{'datetime': t, 'open': repr(o), 'high': repr(h), 'low': repr(lo), 'close': repr(c), 'volume': str(int(v))}
+              for t, o, h, lo, c, v in zip(times, bars['open'], bars['high'], bars['low'], bars['close'], bars['volume'])]
+    if order.upper() != 'ASC':
+        values.reverse()
+    meta = {'symbol': symbol, 'interval': interval, 'exchange_timezone': 'UTC', 'type': 'Replay'}
+    return {'meta': meta, 'values': values, 'status': 'ok'}
+
+
+def time_series_response(provider, query):
+    """(HTTP status, body) for a /time_series query dict (single values per key)."""
+    if not query.get('apikey'):
+        return 401, _error(401, "**apikey** parameter is incorrect or not specified.")
+    symbols = [s for s in query.get('symbol', '').split(',') if s]
+    interval = query.get('interval')
+    if not symbols or not interval:
+        return 400, _error(400, "**symbol** and **interval** parameters are required.")
+    try:
+        outputsize = int(query.get('outputsize', market_data.DEFAULT_OUTPUTSIZE))
+    except ValueError:
+        return 400, _error(400, "**outputsize** must be an integer.")
+    args = (interval, outputsize, query.get('start_date'), query.get('order', 'DESC'))
+    if len(symbols) == 1:
+        body = _series_body(provider, symbols[0], *args)
+        return (400 if body['status'] == 'error' else 200), body
+    return 200, {sym: _series_body(provider, sym, *args) for sym in symbols}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    provider = None
+    latency = 0.0
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        path = parts.path.rstrip('/')
+        if path == '/technical_indicators':
+            # TDClient loads indicator metadata once before its first as_pandas(); none are served
+            status, body = 200, {'data': {}, 'status': 'ok'}
+        elif path != '/time_series':
+            status, body = 404, _error(404, f"Endpoint {parts.path} is not available in the stand-in.")
+        else:
+            query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+            status, body = time_series_response(self.provider, query)
+        if self.latency:
+            time.sleep(self.latency)
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(provider, port=8081, host='127.0.0.1', latency=0.0):
+    """Serve /time_series from `provider` on a daemon thread; returns the server (port 0 picks a free one)."""
+    handler = type('Handler', (_Handler,), {'provider': provider, 'latency': float(latency)})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name='td-standin', daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--source', default=market_data.REPLAY_SOURCE, help="cache directory or 'synthetic'")
+    parser.add_argument('--speed', type=float, default=market_data.REPLAY_SPEED, help='replay seconds per second')
+    parser.add_argument('--start', default=market_data.REPLAY_START or None, help='replay start timestamp')
+    parser.add_argument('--base-interval', default='5min', help='interval the others are resampled from')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='delay added to every response')
+    args = parser.parse_args()
+    replay = market_data.ReplayProvider(source=args.source, speed=args.speed, start=args.start,
+                                        base_interval=args.base_interval)
+    if replay.problem():
+        parser.error(replay.problem())
+    server = serve(replay, args.port, args.host, latency=args.latency_ms / 1000)
+    print(f"Twelve Data stand-in on http://{args.host}:{server.server_address[1]} (source={args.source}, speed={args.speed}x)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,136 @@
+"""In-process queue that relays messages to Telegram from background threads.
+
+`submit()` only puts the message on a bounded queue, so a Flask request never
+waits for Telegram. Sender threads drain the queue and respect Telegram's rate
+limits with token buckets: one global bucket (about 30 messages/s per bot) and
+one bucket per chat (about 1 message/s). `stats()` reports queue depth and how
+long messages waited before being sent.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+
+import metrics
+
+RELAY_WORKERS = int(os.getenv('RELAY_WORKERS', '2'))
+RELAY_QUEUE_MAX = int(os.getenv('RELAY_QUEUE_MAX', '1000'))
+GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', '30'))  # messages per second per bot
+CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', '1'))  # messages per second per chat
+
+QUEUE_WAIT = metrics.histogram('telegram_relay_queue_wait_seconds', 'Time from submit until the send started')
+
+
+class TokenBucket:
+    """Classic token bucket; `acquire()` blocks until a token is available."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Take a token, returning how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class TelegramRelay:
+    """Bounded message queue drained by rate-limited sender threads."""
+
+    def __init__(self, send, workers=RELAY_WORKERS, maxsize=RELAY_QUEUE_MAX,
+                 global_rate=GLOBAL_RATE, chat_rate=CHAT_RATE):
+        self._send = send
+        self._workers = workers
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._global = TokenBucket(global_rate)
+        self._chat_rate = chat_rate
+        self._chats = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stats = {'submitted': 0, 'sent': 0, 'failed': 0, 'dropped': 0,
+                       'wait_total': 0.0, 'wait_max': 0.0}
+
+    def _chat_bucket(self, chat_id):
+        with self._lock:
+            bucket = self._chats.get(chat_id)
+            if bucket is None:
+                bucket = TokenBucket(self._chat_rate)
+                self._chats[chat_id] = bucket
+            return bucket
+
+    def start(self):
+        with self._lock:
+            if any(t.is_alive() for t in self._threads):
+                return
+            self._threads = [threading.Thread(target=self._run, name=f"telegram-relay-{i}", daemon=True)
+                             for i in range(self._workers)]
+            for t in self._threads:
+                t.start()
+
+    def submit(self, text, chat_id=None):
+        """Queue `text` for delivery; returns False if the queue is full."""
+        self.start()
+        try:
+            self._queue.put_nowait((chat_id, text, time.monotonic()))
+        except queue.Full:
+            with self._lock:
+                self._stats['dropped'] += 1
+            logging.warning("Telegram relay queue is full; dropping message")
+            return False
+        with self._lock:
+            self._stats['submitted'] += 1
+        return True
+
+    def _run(self):
+        while True:
+            chat_id, text, enqueued_at = self._queue.get()
+            try:
+                self._global.acquire()
+                self._chat_bucket(chat_id).acquire()
+                waited = time.monotonic() - enqueued_at
+                QUEUE_WAIT.observe(waited)
+                ok = self._send(text) is not False
+            except Exception as e:
+                logging.error(f"Telegram relay send failed: {e}")
+                waited = time.monotonic() - enqueued_at
+                ok = False
+            finally:
+                self._queue.task_done()
+            with self._lock:
+                self._stats['sent' if ok else 'failed'] += 1
+                self._stats['wait_total'] += waited
+                self._stats['wait_max'] = max(self._stats['wait_max'], waited)
+
+    def join(self):
+        """Block until every queued message was handled (used by tests and shutdown)."""
+        self._queue.join()
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+        handled = s['sent'] + s['failed']
+        return {
+            'queue_depth': self._queue.qsize(),
+            'submitted': s['submitted'],
+            'sent': s['sent'],
+            'failed': s['failed'],
+            'dropped': s['dropped'],
+            'avg_queue_wait': s['wait_total'] / handled if handled else 0.0,
+            'max_queue_wait': s['wait_max'],
+        }
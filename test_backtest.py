@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest
+from resample import resample_ohlc
+
+
+def _bars(close, start='2024-01-01', freq='5min'):
+    close = np.asarray(close, dtype=float)
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    return pd.DataFrame({
+        'datetime': pd.date_range(start, periods=len(close), freq=freq),
+        'open': open_,
+        'high': np.maximum(open_, close) + 0.5,
+        'low': np.minimum(open_, close) - 0.5,
+        'close': close,
+        'volume': 1.0,
+    })
+
+
+def test_higher_timeframe_counts_only_after_close():
+    base = _bars(np.arange(24))
+    frames = {'5min': base, '15min': resample_ohlc(base, '15min')}
+    index = backtest.base_index(frames)
+    # the 15min bar of 00:00 closes at 00:15, i.e. with the 5min bar of 00:10
+    assert index['15min'][:6].tolist() == [-1, -1, 0, 0, 0, 1]
+    signals = {'5min': (np.zeros((1, 24), bool), np.zeros((1, 24), bool)),
+               '15min': (np.zeros((1, 8), bool), np.zeros((1, 8), bool))}
+    signals['5min'][0][0, 3] = True
+    signals['15min'][0][0, 0] = True
+    long_agree, short_agree = backtest.agreement(signals, index, lookback=2)
+    assert long_agree[0, :8].tolist() == [0, 0, 1, 2, 2, 1, 1, 1]
+    assert not short_agree.any()
+    assert backtest.entry_sides(long_agree[0], short_agree[0], agree=2)[3] == 1
+
+
+def test_simulate_stop_target_and_costs():
+    close = np.full(40, 100.0)
+    close[31:] = 110.0  # jump through the target after the entry
+    base = _bars(close)
+    base.loc[31, ['open', 'low']] = [110.0, 109.5]
+    sides = np.zeros(40, dtype=np.int8)
+    sides[29] = 1
+    stops = backtest.Stops(stop_atr=2.0, target_atr=3.0, atr_length=14, max_hold=None)
+    trades = backtest.simulate(base, sides, stops, backtest.Costs(spread=0.2, slippage=0.1))
+    assert len(trades) == 1
+    trade = trades.iloc[0]
+    assert trade['reason'] == 'target' and trade['side'] == 1
+    assert trade['entry'] == pytest.approx(100.0 + 0.2)
+    # bar 31 gaps over the target (100.2 + 3 * ATR of 1.0), so the exit fills at its open
+    assert trade['exit'] == pytest.approx(110.0 - 0.2)
+
+    sides[29] = -1
+    trades = backtest.simulate(base, sides, stops)
+    assert trades.iloc[0]['reason'] == 'stop'
+    assert trades.iloc[0]['exit'] == pytest.approx(110.0)  # gap above the stop fills at the open
+    summary = backtest.summarize(trades)
+    assert summary['trades'] == 1 and summary['hit_rate'] == 0.0
+    assert summary['max_drawdown'] == pytest.approx(10.0)
+
+
+def test_run_backtest_on_synthetic_history():
+    rng = np.random.default_rng(3)
+    base = _bars(1800 + np.cumsum(rng.normal(0, 1, 6000)))
+    frames = {'5min': base, '15min': resample_ohlc(base, '15min'), '1h': resample_ohlc(base, '1h')}
+    trades, summary = backtest.run_backtest(frames, ema_length=20, costs=backtest.Costs(0.3, 0.0))
+    assert summary['trades'] == len(trades) > 0
+    assert (trades['exit_time'] >= trades['entry_time']).all()
+    # positions never overlap
+    assert (trades['entry_time'].iloc[1:].to_numpy() >= trades['exit_time'].iloc[:-1].to_numpy()).all()
+    assert summary['total_pnl'] == pytest.approx(trades['pnl'].sum())
@@ -0,0 +1,111 @@
+import multiprocessing
+import time
+
+import numpy as np
+import pandas as pd
+
+import bar_archive
+import data_cache
+from synthetic_ohlc import generate_ohlc
+
+
+def test_merge_append_update_insert_and_range(tmp_path):
+    df = generate_ohlc(1000, seed=2)
+    archive = bar_archive.BarArchive(str(tmp_path / 'X__5min.bars'))
+    assert archive.merge(df.iloc[300:600]) == {'appended': 300, 'updated': 0, 'inserted': 0}
+    # delta overlap: the re-sent last bars are updated in place
+    assert archive.merge(df.iloc[590:700]) == {'appended': 100, 'updated': 10, 'inserted': 0}
+    # older history goes in front
+    assert archive.merge(df.iloc[:310]) == {'appended': 0, 'updated': 10, 'inserted': 300}
+    revised = df.iloc[[100, 400]].copy()
+    revised['close'] += 1
+    assert archive.merge(pd.concat([revised, df.iloc[700:]]))['updated'] == 2
+    expected = df.copy()
+    expected.loc[[100, 400], 'close'] += 1
+    pd.testing.assert_frame_equal(bar_archive.to_frame(archive.records()), expected, check_dtype=False)
+
+    window = archive.range(df['datetime'][10], df['datetime'][20])
+    assert len(window) == 10 and np.shares_memory(window, archive.records())
+    assert archive.search(df['datetime'][999], 'right') == len(archive) == 1000
+    assert len(archive.range(start=df['datetime'][995])) == 5
+
+
+def test_header_count_hides_partial_tail(tmp_path):
+    df = generate_ohlc(20, seed=4)
+    path = str(tmp_path / 'Y__1h.bars')
+    archive = bar_archive.BarArchive(path)
+    archive.append(df.iloc[:10])
+    # a crash after writing records but before the header update leaves junk past the count
+    with open(path, 'ab') as f:
+        f.write(b'\x01' * (bar_archive.RECORD.itemsize + 7))
+    assert len(archive) == 10
+    assert archive.append(df.iloc[10:]) == 10
+    assert list(bar_archive.to_frame(archive.records())['close']) == list(df['close'])
+
+
+def _append_one_by_one(path, recs):
+    archive = bar_archive.BarArchive(path)
+    for i in range(len(recs)):
+        archive.append(recs[i:i + 1])
+
+
+def test_appends_from_another_process_survive_merges(tmp_path):
+    path = str(tmp_path / 'X.bars')
+    recs = bar_archive.to_records(generate_ohlc(1600, seed=9))
+    archive = bar_archive.BarArchive(path)
+    archive.append(recs[:1000:2])
+    writer = multiprocessing.get_context('spawn').Process(target=_append_one_by_one, args=(path, recs[1000:]))
+    writer.start()
+    while len(archive) == 500 and writer.is_alive():
+        time.sleep(0.001)
+    # merge_from rewrites the file and replaces it while the other process keeps appending
+    merges = 0
+    while writer.is_alive() or not merges:
+        archive.merge_from(recs[1:1000:2])
+        merges += 1
+    writer.join(60)
+    assert writer.exitcode == 0
+    assert len(archive) == 1600
+    assert np.array_equal(archive.records()['datetime'], recs['datetime'])
+
+
+def test_cache_keeps_full_history_in_archive(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_cache, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(data_cache, 'CACHE_BACKEND', 'columnar')
+    data_cache.clear_memo()
+    df = generate_ohlc(3000, seed=6)
+    data_cache.save_cache('ARC/USD', '5min', df.iloc[:2500], max_rows=500)
+    data_cache.append_to_cache('ARC/USD', '5min', df.iloc[2490:], max_rows=500)
+    assert len(data_cache.load_cache('ARC/USD', '5min')) <= 500 + 510
+    history = data_cache.load_history('ARC/USD', '5min')
+    assert len(history) == 3000 and history['datetime'].equals(df['datetime'])
+    part = data_cache.load_history('ARC/USD', '5min', start=df['datetime'][100], end=df['datetime'][200])
+    assert len(part) == 100
+
+    # a lost cache is rebuilt from the archive; bootstrapping older bars keeps the newer ones
+    import shutil
+    shutil.rmtree(data_cache._series_dir('ARC/USD', '5min'))
+    data_cache.clear_memo()
+    assert data_cache.load_cache('ARC/USD', '5min')['datetime'].iloc[-1] == df['datetime'].iloc[-1]
+    older = generate_ohlc(100, seed=7, start='2014-12-31 15:40')
+    older.to_csv(tmp_path / 'older.csv', index=False)
+    data_cache.bootstrap_from_csv('ARC/USD', '5min', str(tmp_path / 'older.csv'))
+    assert len(data_cache.load_history('ARC/USD', '5min')) == 3100
+    assert data_cache.load_cache('ARC/USD', '5min')['datetime'].iloc[-1] == df['datetime'].iloc[-1]
+
+
+def test_persist_bars_archives_once_per_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_cache, 'CACHE_DIR', str(tmp_path))
+    merges = []
+    original = bar_archive.BarArchive.merge
+    monkeypatch.setattr(bar_archive.BarArchive, 'merge', lambda self, df: merges.append(len(df)) or original(self, df))
+    df = generate_ohlc(10, seed=8)
+    for backend in ('csv', 'columnar'):
+        monkeypatch.setattr(data_cache, 'CACHE_BACKEND', backend)
+        data_cache.clear_memo()
+        merges.clear()
+        data_cache.persist_bars(f'ONCE/{backend}', '5min', df.iloc[:5])
+        data_cache.persist_bars(f'ONCE/{backend}', '5min', df.iloc[5:])
+        assert merges == [5, 5]
+        assert len(data_cache.load_history(f'ONCE/{backend}', '5min')) == 10
+    data_cache.clear_memo()
@@ -0,0 +1,51 @@
+import pytest
+
+from bar_scheduler import BarScheduler, last_close, next_close
+
+HOUR = 3600
+
+
+def test_close_grid():
+    t = 10 * HOUR + 7 * 60 + 30  # 10:07:30
+    assert last_close('5min', t) == 10 * HOUR + 5 * 60
+    assert next_close('15min', t) == 10 * HOUR + 15 * 60
+    assert next_close('1h', 10 * HOUR) == 11 * HOUR
+    # weekly bars close on Monday 00:00 (1970-01-05 is a Monday)
+    assert next_close('1week', 0) == 4 * 86400
+    with pytest.raises(ValueError):
+        next_close('1month', t)
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_wait_wakes_after_each_close_with_rolled_intervals():
+    clock = FakeClock(10 * HOUR + 40 * 60 + 10)  # 10:40:10
+    sched = BarScheduler(('5min', '15min', '1h'), delay=3, clock=clock.time, sleep=clock.sleep)
+    assert sched.wait() == ('5min', '15min', '1h')
+    assert clock.sleeps == []
+    assert sched.wait() == ('5min', '15min')  # 10:45:03
+    assert clock.now == 10 * HOUR + 45 * 60 + 3
+    assert sched.wait() == ('5min',)  # 10:50:03
+    assert sched.wait() == ('5min',)
+    assert sched.wait() == ('5min', '15min', '1h')  # 11:00:03
+    assert clock.now == 11 * HOUR + 3
+
+
+def test_missed_close_is_reported_without_sleeping():
+    clock = FakeClock(10 * HOUR + 50 * 60 + 10)
+    sched = BarScheduler(('5min', '1h'), delay=3, clock=clock.time, sleep=clock.sleep)
+    sched.wait()
+    clock.now = 11 * HOUR + 7 * 60  # a slow cycle ran past the 11:00 and 11:05 closes
+    assert sched.wait() == ('5min', '1h')
+    assert clock.sleeps == []
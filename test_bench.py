@@ -0,0 +1,44 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tools'))
+import bench
+from synthetic_ohlc import generate_ohlc
+
+
+def test_generate_ohlc_is_seeded_and_consistent():
+    df = generate_ohlc(5000, seed=3, interval='15min')
+    assert df.equals(generate_ohlc(5000, seed=3, interval='15min'))
+    assert not df.equals(generate_ohlc(5000, seed=4, interval='15min'))
+    assert list(df.columns) == ['datetime', 'open', 'high', 'low', 'close', 'volume']
+    assert (df['datetime'].diff().dropna() == np.timedelta64(15, 'm')).all()
+    assert (df['high'] >= df[['open', 'close']].max(axis=1)).all()
+    assert (df['low'] <= df[['open', 'close']].min(axis=1)).all()
+    # volatility regimes: rolling stdev of returns varies well beyond sampling noise
+    vol = np.log(df['close']).diff().rolling(200).std().dropna()
+    assert vol.max() > 3 * vol.min()
+
+
+def test_run_and_compare(tmp_path, capsys):
+    report = bench.run_suite(detect_sizes=(300,), cache_sizes=(500,), repeat=2, ops=50)
+    assert {'detect_signals[bars=300]', '_make_signal_id', 'dedupe_store.set',
+            'dedupe_store.get[sent]'} <= set(report['results'])
+    assert all(r['best'] > 0 and r['best'] <= r['median'] for r in report['results'].values())
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps(report))
+
+    slower = json.loads(json.dumps(report))
+    slower['results']['_make_signal_id']['best'] *= 2
+    del slower['results']['dedupe_store.set']
+    current = tmp_path / 'current.json'
+    current.write_text(json.dumps(slower))
+    status = {row[0]: row[4] for row in bench.compare(report, slower)}
+    assert status['_make_signal_id'] == 'regression'
+    assert status['dedupe_store.set'] == 'missing'
+    assert status['detect_signals[bars=300]'] == 'ok'
+    assert bench.main(['compare', str(baseline), str(current)]) == 1
+    assert bench.main(['compare', str(baseline), str(baseline)]) == 0
+    assert 'regression' in capsys.readouterr().out
@@ -0,0 +1,64 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tools'))
+import bootstrap_all
+import data_cache
+from synthetic_ohlc import generate_ohlc
+
+
+def test_infer_and_utc_normalization():
+    assert bootstrap_all.infer_from_filename('/x/XAU_USD__1min.2019.csv') == ('XAU/USD', '1min')
+    # offsets change across DST; rows that do not parse become NaT
+    raw = pd.Series(['2024-03-31T00:30:00+00:00', '2024-03-31T02:30:00+01:00', 'garbage'])
+    assert list(bootstrap_all.to_utc(raw).dropna()) == [pd.Timestamp('2024-03-31 00:30'), pd.Timestamp('2024-03-31 01:30')]
+    assert bootstrap_all.to_utc(pd.Series(['2024-01-01 23:30:00'])).iloc[0] == pd.Timestamp('2024-01-01 23:30')
+    local = bootstrap_all.to_utc(pd.Series(['2024-07-01 12:00']), tz='Europe/London')
+    assert local.iloc[0] == pd.Timestamp('2024-07-01 11:00')
+    # a London chart exported with offsets (GMT, then BST) and --tz given; non-ISO text still parses
+    london = pd.Series(['2024-03-30T10:00:00+00:00', '2024-04-02T10:00:00+01:00', '2024-04-02 10:00', '01/02/2024 10:00'])
+    assert list(bootstrap_all.to_utc(london, tz='Europe/London')) == [
+        pd.Timestamp('2024-03-30 10:00'), pd.Timestamp('2024-04-02 09:00'), pd.Timestamp('2024-04-02 09:00'),
+        pd.Timestamp('2024-01-02 10:00')]
+    assert bootstrap_all.to_utc(pd.Series([1704067200, 1704067260])).iloc[1] == pd.Timestamp('2024-01-01 00:01')
+
+
+def test_parallel_import_merges_into_existing_cache(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(data_cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(data_cache, 'CACHE_BACKEND', 'columnar')
+    os.makedirs(data_cache.CACHE_DIR)
+    data_cache.clear_memo()
+    df = generate_ohlc(3000, seed=9, interval='1min', start='2024-01-01')
+    # the cache already holds the newest bars; the exports hold older history
+    data_cache.save_cache('XAU/USD', '1min', df.iloc[2500:])
+
+    exports = tmp_path / 'exports'
+    exports.mkdir()
+    first = df.iloc[:1500].copy()
+    first['datetime'] = first['datetime'].dt.tz_localize('UTC').dt.tz_convert('Asia/Tokyo').map(lambda t: t.isoformat())
+    first = pd.concat([first, first.iloc[[10, 11]]])  # duplicate rows
+    first.rename(columns={'datetime': 'time'}).to_csv(exports / 'XAU_USD__1min.a.csv', index=False)
+    second = df.iloc[1400:2600].drop(index=range(2000, 2010)).copy()  # a 10-minute hole
+    second['datetime'] = second['datetime'].astype('int64') // 10**9
+    second.drop(columns=['volume']).to_csv(exports / 'XAU_USD__1min.b.csv', index=False)
+    (exports / 'notes.csv').write_text('x\n1\n')
+
+    summaries = bootstrap_all.main(str(exports), workers=2, chunk_rows=400)
+    by_file = {os.path.basename(s['file']): s for s in summaries}
+    assert by_file['XAU_USD__1min.a.csv']['duplicates'] == 2
+    assert by_file['XAU_USD__1min.a.csv']['bars'] == 1500
+    assert by_file['XAU_USD__1min.b.csv']['gaps'] == 1
+    assert by_file['XAU_USD__1min.b.csv']['largest_gap'] == 11 * 60 * 10**9
+    out = capsys.readouterr().out
+    assert 'Skipping' in out and 'gaps=1' in out
+
+    history = data_cache.load_history('XAU/USD', '1min')
+    expected = df.drop(index=range(2000, 2010)).reset_index(drop=True)  # the hole stays a hole
+    assert len(history) == len(expected)
+    assert history['datetime'].equals(expected['datetime'])
+    assert np.allclose(history['close'], expected['close'])
+    assert data_cache.load_cache('XAU/USD', '1min')['datetime'].iloc[-1] == df['datetime'].iloc[-1]
+    assert not [f for f in os.listdir(os.path.join(data_cache.CACHE_DIR, 'archive')) if f.startswith('import-')]
@@ -4,6 +4,7 @@ import pandas as pd
 import shutil
 
 from data_cache import _cache_path, save_cache, load_cache, append_to_cache, bootstrap_from_csv
+import data_cache
 
 
 def make_sample_df(start_ts=0, n=5, freq='5T'):
@@ -22,7 +23,9 @@ def make_sample_df(start_ts=0, n=5, freq='5T'):
 def test_append_and_dedupe(tmp_path, monkeypatch):
     # Prepare temp cache dir
     tmp_cache = tmp_path / 'cache'
-    monkeypatch.setenv('DATA_CACHE_DIR', str(tmp_cache))
+    # CACHE_DIR is read at import, so patch the module rather than the environment
+    monkeypatch.setattr(data_cache, 'CACHE_DIR', str(tmp_cache))
+    data_cache.clear_memo()
     tmp_cache.mkdir()
 
     symbol = 'TEST/FOO'
@@ -44,7 +47,9 @@ def test_append_and_dedupe(tmp_path, monkeypatch):
 
 def test_bootstrap_from_csv(tmp_path, monkeypatch):
     tmp_cache = tmp_path / 'cache'
-    monkeypatch.setenv('DATA_CACHE_DIR', str(tmp_cache))
+    # CACHE_DIR is read at import, so patch the module rather than the environment
+    monkeypatch.setattr(data_cache, 'CACHE_DIR', str(tmp_cache))
+    data_cache.clear_memo()
     tmp_cache.mkdir()
     symbol = 'BOOT/ME'
     interval = '15min'
@@ -57,3 +62,108 @@ def test_bootstrap_from_csv(tmp_path, monkeypatch):
     assert len(booted) == 6
     loaded = load_cache(symbol, interval)
     assert len(loaded) == 6
+
+
+def test_columnar_append_writes_segments_and_compacts(tmp_path, monkeypatch):
+    import data_cache
+    import columnar_store
+    monkeypatch.setattr(data_cache, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(data_cache, 'CACHE_BACKEND', 'columnar')
+    monkeypatch.setattr(data_cache, 'COMPACT_SEGMENTS', 3)
+    symbol = 'COL/FOO'
+    interval = '5min'
+    df = make_sample_df(n=6, freq='5min')
+    save_cache(symbol, interval, df.iloc[:3])
+    # overlapping append: the revised row wins
+    revised = df.iloc[2:4].copy()
+    revised['close'] = 99.0
+    append_to_cache(symbol, interval, revised)
+    series = data_cache._series_dir(symbol, interval)
+    assert columnar_store.segment_count(series) == 2
+    loaded = load_cache(symbol, interval)
+    assert loaded['datetime'].is_unique
+    assert loaded['datetime'].is_monotonic_increasing
+    assert list(loaded['close']) == [0.5, 1.5, 99.0, 99.0]
+    append_to_cache(symbol, interval, df.iloc[4:5])
+    append_to_cache(symbol, interval, df.iloc[5:6])
+    assert columnar_store.segment_count(series) == 1
+    assert len(load_cache(symbol, interval)) == 6
+
+
+def test_columnar_migrates_existing_csv(tmp_path, monkeypatch):
+    import data_cache
+    monkeypatch.setattr(data_cache, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(data_cache, 'CACHE_BACKEND', 'csv')
+    symbol = 'MIG/FOO'
+    interval = '1h'
+    save_cache(symbol, interval, make_sample_df(n=4, freq='1h'))
+    monkeypatch.setattr(data_cache, 'CACHE_BACKEND', 'columnar')
+    loaded = load_cache(symbol, interval)
+    assert len(loaded) == 4
+    assert os.path.isdir(data_cache._series_dir(symbol, interval))
+    assert str(loaded['datetime'].dtype).startswith('datetime64')
+
+
+def test_load_cache_memo_hits_and_invalidation(tmp_path, monkeypatch):
+    import data_cache
+    monkeypatch.setattr(data_cache, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(data_cache, 'CACHE_BACKEND', 'columnar')
+    data_cache.clear_memo()
+    symbol = 'MEMO/FOO'
+    df = make_sample_df(n=5, freq='5min')
+    save_cache(symbol, '5min', df)
+    load_cache(symbol, '5min')
+    load_cache(symbol, '5min')
+    assert data_cache.memo_stats()['hits'] == 1
+    # append updates the memo entry in place: the next load is a hit with the new rows
+    extra = make_sample_df(n=6, freq='5min').iloc[5:]
+    append_to_cache(symbol, '5min', extra)
+    hits = data_cache.memo_stats()['hits']
+    loaded = load_cache(symbol, '5min')
+    assert data_cache.memo_stats()['hits'] == hits + 1
+    assert loaded.equals(data_cache.columnar_store.load(data_cache._series_dir(symbol, '5min')))
+    # a write from outside the memo (save_cache) is picked up
+    save_cache(symbol, '5min', df.iloc[:2])
+    assert len(load_cache(symbol, '5min')) == 2
+
+
+def test_load_cache_memo_evicts_lru(tmp_path, monkeypatch):
+    import data_cache
+    monkeypatch.setattr(data_cache, 'CACHE_DIR', str(tmp_path))
+    data_cache.clear_memo()
+    df = make_sample_df(n=50, freq='5min')
+    nbytes = int(df.memory_usage(index=True, deep=False).sum())
+    monkeypatch.setattr(data_cache, 'MEMO_MAX_BYTES', nbytes * 2)
+    for sym in ('A/A', 'B/B', 'C/C'):
+        save_cache(sym, '5min', df)
+        load_cache(sym, '5min')
+    stats = data_cache.memo_stats()
+    assert stats['evictions'] == 1
+    assert stats['entries'] == 2
+
+
+def _append_rows_one_by_one(path, df):
+    import columnar_store
+    for i in range(len(df)):
+        columnar_store.append(path, df.iloc[i:i + 1])
+
+
+def test_columnar_appends_from_another_process_survive_compaction(tmp_path):
+    import multiprocessing
+    import time
+    import columnar_store
+    path = str(tmp_path / 'X__5min')
+    df = make_sample_df(n=400, freq='5min')
+    columnar_store.write(path, df.iloc[:100])
+    writer = multiprocessing.get_context('spawn').Process(target=_append_rows_one_by_one, args=(path, df.iloc[100:]))
+    writer.start()
+    while columnar_store.segment_count(path) == 1 and writer.is_alive():
+        time.sleep(0.001)
+    # compaction lists the segments, writes a merged one and deletes the listed ones
+    compactions = 0
+    while writer.is_alive() or not compactions:
+        columnar_store.compact(path)
+        compactions += 1
+    writer.join(60)
+    assert writer.exitcode == 0
+    assert list(columnar_store.load(path)['close']) == list(df['close'])
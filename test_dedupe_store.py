@@ -0,0 +1,55 @@
+import multiprocessing
+import sqlite3
+import time
+
+import dedupe_store
+
+
+def _use_db(monkeypatch, tmp_path):
+    monkeypatch.setattr(dedupe_store, 'DB_PATH', str(tmp_path / 'dedupe.db'))
+
+
+def test_get_set_and_ttl_filter(tmp_path, monkeypatch):
+    _use_db(monkeypatch, tmp_path)
+    assert dedupe_store.get('a') is None
+    dedupe_store.set('a', 1000)
+    assert dedupe_store.get('a') == 1000
+    assert dedupe_store.get('a', min_ts=1000) == 1000
+    assert dedupe_store.get('a', min_ts=1001) is None
+    mode = sqlite3.connect(dedupe_store.DB_PATH).execute('PRAGMA journal_mode').fetchone()[0]
+    assert mode == 'wal'
+
+
+def test_front_cache_serves_repeat_lookups(tmp_path, monkeypatch):
+    _use_db(monkeypatch, tmp_path)
+    dedupe_store.set('a', time.time())
+    before = dedupe_store.stats()
+    dedupe_store.get('a')
+    dedupe_store.get('missing')
+    after = dedupe_store.stats()
+    assert after['hits'] == before['hits'] + 1
+    assert after['misses'] == before['misses'] + 1
+
+
+def test_cleanup_deletes_in_batches(tmp_path, monkeypatch):
+    _use_db(monkeypatch, tmp_path)
+    for i in range(25):
+        dedupe_store.set(f"s{i}", i)
+    assert dedupe_store.cleanup(20, batch=4) == 20
+    assert dedupe_store.get('s3') is None
+    assert dedupe_store.get('s21') == 21
+
+
+def _record(path, signal_id):
+    dedupe_store.DB_PATH = path
+    dedupe_store.set(signal_id, 500)
+
+
+def test_sees_ids_recorded_by_another_process(tmp_path, monkeypatch):
+    _use_db(monkeypatch, tmp_path)
+    assert dedupe_store.get('shared') is None  # a miss must not be cached
+    proc = multiprocessing.get_context('spawn').Process(target=_record, args=(dedupe_store.DB_PATH, 'shared'))
+    proc.start()
+    proc.join(30)
+    assert proc.exitcode == 0
+    assert dedupe_store.get('shared') == 500
@@ -0,0 +1,55 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import http_client
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    statuses = []
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        status = self.statuses.pop(0) if self.statuses else 200
+        body = b'{}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_keep_alive_reuses_connection():
+    server, url = _serve()
+    try:
+        for _ in range(5):
+            assert http_client.post(url + '/hook', json={'x': 1}) is not None
+        stats = http_client.stats()[url]
+        assert stats['requests'] == 5
+        assert stats['connections_opened'] == 1
+        assert stats['connections_reused'] == 4
+    finally:
+        server.shutdown()
+
+
+def test_retry_policy_until_accepted(monkeypatch):
+    monkeypatch.setattr(http_client.time, 'sleep', lambda s: None)
+    server, url = _serve()
+    try:
+        _Handler.statuses = [500, 503]
+        policy = http_client.RetryPolicy(attempts=3, backoff=2, exponential=True)
+        assert http_client.post(url, json={}, policy=policy) is not None
+        _Handler.statuses = [500, 500, 500]
+        assert http_client.post(url, json={}, policy=policy) is None
+    finally:
+        server.shutdown()
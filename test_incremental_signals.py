@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from python_signal_engine import detect_signals
+from incremental_signals import SignalStream
+
+
+def make_random_walk(n=600, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 1800 + np.cumsum(rng.normal(0, 2, n))
+    return pd.DataFrame({
+        'datetime': pd.date_range('2024-01-01', periods=n, freq='5min'),
+        'open': close,
+        'high': close + rng.random(n) * 3,
+        'low': close - rng.random(n) * 3,
+        'close': close,
+        'volume': [1] * n,
+    })
+
+
+def test_stream_matches_batch():
+    df = make_random_walk()
+    le, se, z, t, r = detect_signals(df, ema_length=10, rsi_length=7, band_mult=0.5)
+    stream = SignalStream(ema_length=10, rsi_length=7, band_mult=0.5, history=len(df))
+    stream.seed(df)
+    s_le, s_se, s_z, s_t, s_r = stream.recent(index=df.index)
+    assert (s_le == le).all()
+    assert (s_se == se).all()
+    assert (s_t == t).all()
+    assert np.allclose(s_z, z, equal_nan=True)
+    assert np.allclose(s_r, r, equal_nan=True)
+
+
+def test_sync_appends_and_replaces_last_bar():
+    df = make_random_walk(n=300)
+    stream = SignalStream(ema_length=10, rsi_length=7, band_mult=0.5, history=len(df))
+    stream.sync(df.iloc[:200])
+    # revise the forming bar, then sync the full frame
+    revised = df.iloc[:200].copy()
+    revised.loc[199, 'close'] += 25
+    stream.sync(revised)
+    stream.sync(df)
+    assert stream.count == len(df)
+    le, se, z, t, r = detect_signals(df, ema_length=10, rsi_length=7, band_mult=0.5)
+    s_le, s_se, s_z, s_t, s_r = stream.recent(index=df.index)
+    assert (s_t == t).all()
+    assert (s_le == le).all()
+    assert np.allclose(s_z, z, equal_nan=True)
+
+
+def test_short_history_returns_safe_values():
+    df = make_random_walk(n=20)
+    stream = SignalStream(ema_length=10)
+    long_entry, short_entry, zlema, trend, rsi = stream.sync(df)
+    assert not stream.ready
+    assert not long_entry.any()
+    assert (trend == 0).all()
+    assert zlema.isna().all()
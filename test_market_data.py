@@ -0,0 +1,100 @@
+import os
+from unittest import mock
+
+import pandas as pd
+import pytest
+from twelvedata import TDClient
+
+import data_cache
+import market_data
+import python_signal_engine
+import td_standin
+from synthetic_ohlc import generate_ohlc
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_replay_releases_closed_bars_as_time_passes(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_cache, 'CACHE_DIR', str(tmp_path))
+    data_cache.save_cache('XAU/USD', '5min', generate_ohlc(1000, seed=1), max_rows=1000)
+    clock = FakeClock()
+    replay = market_data.ReplayProvider(source=str(tmp_path), speed=60, warmup=500, clock=clock)
+    assert replay.problem() is None
+
+    bars = replay.time_series('XAU/USD', '5min', outputsize=100)
+    assert len(bars) == 100
+    first_last = bars['datetime'].iloc[-1]
+    # 5 wall seconds at 60x are 5 replay minutes: exactly one more bar closes
+    clock.t = 5.0
+    later = replay.time_series('XAU/USD', '5min', start_date=str(first_last), outputsize=5000)
+    assert list(later['datetime']) == [first_last, first_last + pd.Timedelta(minutes=5)]
+    # 1h is resampled from the 5min file and only closed hours are served
+    hours = replay.time_series('XAU/USD', '1h', outputsize=10)
+    assert (hours['datetime'] + pd.Timedelta(hours=1) <= pd.Timestamp(replay.now(), unit='s')).all()
+    with pytest.raises(KeyError):
+        replay.time_series('EUR/USD', '5min')
+
+
+def test_standin_serves_twelvedata_client():
+    replay = market_data.ReplayProvider(source='synthetic', speed=1, warmup=400, synthetic_bars=2000)
+    server = td_standin.serve(replay, port=0)
+    try:
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        client = TDClient(apikey='demo', base_url=base_url)
+        provider = market_data.TwelveDataProvider(lambda: client, lambda: 'demo')
+        one = provider.time_series('XAU/USD', '5min', outputsize=50)
+        assert len(one) == 50
+        expected = replay.time_series('XAU/USD', '5min', outputsize=50)
+        assert list(one['close']) == pytest.approx(list(expected['close']))
+        assert list(one['datetime']) == list(expected['datetime'])
+        both = provider.time_series_batch(['XAU/USD', 'EUR/USD'], '15min', outputsize=20)
+        assert sorted(both) == ['EUR/USD', 'XAU/USD']
+        assert len(both['EUR/USD']) == 20
+        status, body = td_standin.time_series_response(replay, {'symbol': 'XAU/USD', 'interval': '5min'})
+        assert status == 401 and body['status'] == 'error'
+    finally:
+        server.shutdown()
+
+
+def test_engine_fetches_through_replay_provider(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_cache, 'CACHE_DIR', str(tmp_path))
+    data_cache.clear_memo()
+    replay = market_data.ReplayProvider(source='synthetic', speed=1, warmup=600, synthetic_bars=3000)
+    with mock.patch.object(python_signal_engine, '_provider', replay):
+        df = python_signal_engine.fetch_ohlc(symbol='XAU/USD', interval='5min', limit=210)
+        assert len(df) == 210
+        # the second call is a delta fetch against the cache
+        again = python_signal_engine.fetch_ohlc(symbol='XAU/USD', interval='5min', limit=210)
+    assert again['datetime'].iloc[-1] == df['datetime'].iloc[-1]
+    assert len(data_cache.load_cache('XAU/USD', '5min')) == 210
+    data_cache.clear_memo()
+
+
+def test_replay_run_leaves_default_cache_untouched(tmp_path, monkeypatch):
+    production = tmp_path / 'data_cache'
+    production.mkdir()
+    monkeypatch.setattr(data_cache, 'DEFAULT_CACHE_DIR', str(production))
+    monkeypatch.setattr(data_cache, 'CACHE_DIR', str(production))
+    monkeypatch.setattr(data_cache, 'ARCHIVE_DIR', '')
+    monkeypatch.setattr(python_signal_engine, 'DATA_PROVIDER', 'replay')
+    monkeypatch.setattr(python_signal_engine, '_provider', None)
+    df = python_signal_engine.fetch_ohlc(symbol='XAU/USD', interval='5min', limit=300)
+    assert len(df) == 300
+    assert list(production.iterdir()) == []
+    offline = data_cache.CACHE_DIR
+    assert offline != str(production)
+    assert os.path.exists(data_cache.archive_path('XAU/USD', '5min'))
+    assert data_cache.archive_path('XAU/USD', '5min').startswith(offline)
+    # an explicit replay cache may not be the production one
+    monkeypatch.setattr(data_cache, 'CACHE_DIR', str(production))
+    monkeypatch.setattr(python_signal_engine, 'REPLAY_CACHE_DIR', str(production))
+    monkeypatch.setattr(python_signal_engine, '_provider', None)
+    with pytest.raises(ValueError):
+        python_signal_engine.get_provider()
+    data_cache.clear_memo()
@@ -0,0 +1,58 @@
+import urllib.request
+
+import pytest
+
+import metrics
+import tradingview_webhook
+
+
+def test_counter_gauge_histogram_render():
+    c = metrics.counter('test_events_total', 'Events', ['kind'])
+    c.labels('a').inc()
+    c.labels('a').inc(2)
+    c.labels('b').inc()
+    g = metrics.gauge('test_depth', 'Depth')
+    g.set_function(lambda: 7)
+    h = metrics.histogram('test_latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    for v in (0.05, 0.1, 0.5, 3.0):
+        h.observe(v)
+    text = metrics.render()
+    assert 'test_events_total{kind="a"} 3.0' in text
+    assert 'test_events_total{kind="b"} 1.0' in text
+    assert 'test_depth 7.0' in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 2' in text
+    assert 'test_latency_seconds_bucket{le="1.0"} 3' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 4' in text
+    assert 'test_latency_seconds_count 4' in text
+    assert '# TYPE test_latency_seconds histogram' in text
+    # re-registering returns the same metric, a conflicting definition is an error
+    assert metrics.counter('test_events_total', 'Events', ['kind']) is c
+    with pytest.raises(ValueError):
+        metrics.gauge('test_events_total', 'Events')
+    with pytest.raises(ValueError):
+        c.labels('a', 'extra')
+
+
+def test_engine_style_http_server():
+    metrics.counter('test_served_total', 'Served').inc()
+    server = metrics.serve(0, host='127.0.0.1')
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as resp:
+            body = resp.read().decode()
+        assert resp.headers['Content-Type'].startswith('text/plain')
+        assert 'test_served_total 1.0' in body
+    finally:
+        server.shutdown()
+
+
+def test_flask_metrics_endpoint_records_webhook_latency(monkeypatch):
+    monkeypatch.setattr(tradingview_webhook, 'WEBHOOK_SECRET', None)
+    monkeypatch.setattr(tradingview_webhook.relay, 'submit', lambda msg, chat_id=None: True)
+    client = tradingview_webhook.app.test_client()
+    assert client.post('/webhook', json={'signal_type': 'buy', 'price': 1}).status_code == 202
+    assert client.post('/webhook', data='not json').status_code == 400
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'webhook_request_seconds_count{status="202"}' in text
+    assert 'webhook_request_seconds_count{status="400"}' in text
+    assert 'telegram_relay_queue_depth' in text
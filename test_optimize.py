@@ -0,0 +1,45 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tools'))
+import data_cache
+import optimize
+
+
+def test_walk_forward_folds_cover_the_tail():
+    folds = optimize.walk_forward_folds(700, folds=4)
+    assert folds[0] == (0, 300, 400)
+    assert folds[-1][2] == 700
+    assert all(b[0] - a[0] == 100 for a, b in zip(folds, folds[1:]))
+    with pytest.raises(ValueError):
+        optimize.walk_forward_folds(10, folds=4, train_bars=100)
+
+
+def test_sweep_writes_and_resumes_checkpoint(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(data_cache, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(data_cache, 'CACHE_BACKEND', 'columnar')
+    data_cache.clear_memo()
+    rng = np.random.default_rng(5)
+    close = 1800 + np.cumsum(rng.normal(0, 1, 4000))
+    df = pd.DataFrame({'datetime': pd.date_range('2024-01-01', periods=len(close), freq='5min'),
+                       'open': close, 'high': close + 1, 'low': close - 1, 'close': close, 'volume': 1.0})
+    data_cache.save_cache('TEST/USD', '5min', df, max_rows=len(df))
+
+    checkpoint = str(tmp_path / 'ckpt.jsonl')
+    argv = ['--symbol', 'TEST/USD', '--ema-lengths', '10', '20', '--rsi-lengths', '7', '14', '--band-mults', '1.0',
+            '--agree', '1', '2', '--lookbacks', '3', '--folds', '2', '--workers', '1', '--checkpoint', checkpoint]
+    optimize.main(optimize.parse_args(argv))
+    with open(checkpoint) as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 1 + 2 * 2 * 2  # header + ema x rsi x agree cells
+    assert json.loads(lines[1])['folds'][0].keys() == {'train', 'test'}
+    out = capsys.readouterr().out
+    assert 'out-of-sample pnl' in out
+
+    optimize.main(optimize.parse_args(argv))
+    assert '8 from checkpoint), 0 tasks' in capsys.readouterr().out
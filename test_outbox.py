@@ -0,0 +1,80 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import outbox
+
+
+class _Hook(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    status = 200
+    received = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        _Hook.received.append((json.loads(body), self.headers.get('Idempotency-Key')))
+        self.send_response(_Hook.status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Hook)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/webhook"
+
+
+def test_enqueue_and_deliver_in_background(tmp_path, monkeypatch):
+    monkeypatch.setattr(outbox, 'DB_PATH', str(tmp_path / 'outbox.db'))
+    server, url = _serve()
+    _Hook.status = 200
+    _Hook.received = []
+    outbox.start(workers=1)
+    try:
+        outbox.enqueue(url, {'signal_type': 'longSignal', 'price': 1.5}, headers={'Idempotency-Key': 'abc'})
+        deadline = time.time() + 5
+        while not _Hook.received and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        outbox.stop()
+        server.shutdown()
+    assert _Hook.received == [({'signal_type': 'longSignal', 'price': 1.5}, 'abc')]
+    assert outbox.stats()['pending'] == 0
+
+
+def test_failed_delivery_backs_off_then_dead_letters(tmp_path, monkeypatch):
+    monkeypatch.setattr(outbox, 'DB_PATH', str(tmp_path / 'outbox.db'))
+    monkeypatch.setattr(outbox, 'MAX_ATTEMPTS', 2)
+    server, url = _serve()
+    _Hook.status = 500
+    try:
+        outbox.enqueue(url, {'signal_type': 'shortSignal'})
+        assert outbox.process_due() == 1
+        stats = outbox.stats()
+        assert stats['pending'] == 1
+        # the retry is scheduled in the future, so nothing is due yet
+        assert outbox.process_due() == 0
+        outbox._connect().execute('UPDATE outbox SET next_attempt_at = 0')
+        assert outbox.process_due() == 1
+        assert outbox.stats()['dead'] == 1
+        assert outbox.requeue_dead() == 1
+    finally:
+        server.shutdown()
+
+
+def test_expired_lease_is_reclaimed_after_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(outbox, 'DB_PATH', str(tmp_path / 'outbox.db'))
+    server, url = _serve()
+    _Hook.status = 200
+    try:
+        outbox.enqueue(url, {'signal_type': 'longSignal'})
+        # simulate a worker that claimed the row and died
+        outbox._connect().execute("UPDATE outbox SET status = 'inflight', lease_until = 0")
+        assert outbox.process_due() == 1
+        assert outbox.stats()['inflight'] == 0
+    finally:
+        server.shutdown()
@@ -0,0 +1,65 @@
+import random
+import time
+
+import pytest
+
+from price_moves import PriceMoveDetector, parse_windows
+
+
+def test_parse_windows():
+    assert parse_windows('5min:0.5, 1h:1,90:0.2') == [('5min', 300, 0.5), ('1h', 3600, 1.0), ('90', 90.0, 0.2)]
+    with pytest.raises(ValueError):
+        parse_windows('5min')
+
+
+def test_slow_move_is_caught_once_per_threshold():
+    det = PriceMoveDetector(parse_windows('5min:0.5,1h:1'))
+    alerts = []
+    price = 2000.0
+    # +0.02% per minute: never 0.5% within 5 minutes, but 1% within the hour
+    for minute in range(130):
+        alerts += det.add(minute * 60, price)
+        price *= 1.0002
+    assert [m.window for m in alerts] == ['1h', '1h']
+    first = alerts[0]
+    assert first.direction == 'up' and first.percent >= 1 and first.ref_price == 2000.0
+    # re-armed: the second alert measures from the first one's price
+    assert alerts[1].ref_price == first.price and alerts[1].ref_time == first.time
+
+
+def test_matches_brute_force_window_extremes():
+    rng = random.Random(7)
+    det = PriceMoveDetector([('w', 30, 1e9)])
+    window = det.windows[0]
+    history = []
+    ts, price = 0.0, 100.0
+    for _ in range(2000):
+        ts += rng.uniform(0.1, 3)
+        price += rng.gauss(0, 0.5)
+        det.add(ts, price)
+        history.append((ts, price))
+        inside = [p for t, p in history if t >= ts - 30]
+        assert window._min[0][1] == min(inside) and window._max[0][1] == max(inside)
+    assert det.samples[0][0] >= ts - 30
+
+
+def test_snapshot_is_periodic_and_restores(tmp_path):
+    path = tmp_path / 'prices.json'
+    det = PriceMoveDetector(parse_windows('5min:0.5'), snapshot_file=str(path), snapshot_interval=60)
+    now = time.time() - 100
+    det.add(now, 2000.0)
+    assert path.exists()
+    first = path.read_text()
+    det.add(now + 1, 2001.0)
+    assert path.read_text() == first
+    det.add(now + 61, 2002.0)
+    assert path.read_text() != first
+
+    restored = PriceMoveDetector(parse_windows('5min:0.5'), snapshot_file=str(path))
+    assert restored.load(now + 62) == 3
+    # the restored low of 2000 makes +0.5% at 2010 an alert
+    assert [m.direction for m in restored.add(now + 63, 2010.0)] == ['up']
+    restored.save(now + 63)
+    again = PriceMoveDetector(parse_windows('5min:0.5'), snapshot_file=str(path))
+    again.load(now + 64)
+    assert again.add(now + 65, 2010.5) == []
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from resample import Resampler, resample_ohlc, compare_bars
+
+
+def make_5min(n=500, start='2024-01-01 00:05'):
+    rng = np.random.default_rng(11)
+    close = 1800 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        'datetime': pd.date_range(start, periods=n, freq='5min'),
+        'open': close - 0.5,
+        'high': close + rng.random(n),
+        'low': close - 1 - rng.random(n),
+        'close': close,
+        'volume': np.ones(n),
+    })
+
+
+def test_resample_matches_pandas():
+    df = make_5min()
+    for interval, rule in (('15min', '15min'), ('1h', '1h'), ('1day', '1D')):
+        local = resample_ohlc(df, interval)
+        expected = df.set_index('datetime').resample(rule).agg(
+            {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+        ).dropna().reset_index()
+        assert local['datetime'].tolist() == expected['datetime'].tolist()
+        for c in ('open', 'high', 'low', 'close', 'volume'):
+            assert np.allclose(local[c], expected[c])
+
+
+def test_resample_week_starts_monday():
+    df = make_5min(n=5000)
+    weeks = resample_ohlc(df, '1week')
+    assert (weeks['datetime'].iloc[1:].dt.weekday == 0).all()
+
+
+def test_resampler_incremental_matches_full():
+    df = make_5min(n=400)
+    resampler = Resampler('1h')
+    for end in range(50, 401, 7):
+        bars = resampler.update(df.iloc[:end])
+    bars = resampler.update(df)
+    full = resample_ohlc(df, '1h')
+    pd.testing.assert_frame_equal(bars, full)
+
+
+def test_compare_bars_ignores_forming_bar():
+    local = resample_ohlc(make_5min(), '1h')
+    direct = local.copy()
+    direct.loc[len(direct) - 1, 'close'] += 5
+    assert compare_bars(local, direct) == (0, len(local) - 1)
+    direct.loc[0, 'high'] += 5
+    assert compare_bars(local, direct)[0] == 1
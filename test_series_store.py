@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import series_store
+from python_signal_engine import detect_signals
+from synthetic_ohlc import generate_ohlc
+
+
+def test_ring_wraps_into_contiguous_zero_copy_windows():
+    ring = series_store.OHLCRing(4)
+    for i in range(10):
+        ring.append(i, i, i + 1, i - 1, i + 0.5)
+    window = ring.window()
+    assert len(window) == 4
+    assert list(window.times) == [6, 7, 8, 9]
+    assert window.times.flags['C_CONTIGUOUS'] and window.values[3].flags['C_CONTIGUOUS']
+    assert np.shares_memory(window['close'].to_numpy(), ring._values)
+    assert list(ring.window(2)['close']) == [8.5, 9.5]
+
+    ring.replace_last(9, 12, 8, 11)
+    assert window['close'].iloc[-1] == 11
+    assert ring.upsert(7, 7, 9, 6, 8.0) and window['close'].iloc[1] == 8.0
+    assert not ring.upsert(3, 3, 4, 2, 3.5)
+    with pytest.raises(ValueError):
+        ring.append(9, 1, 1, 1, 1)
+
+
+def test_store_load_update_and_headroom():
+    df = generate_ohlc(300, seed=3)
+    store = series_store.SeriesStore()
+    store.load('XAU/USD', '5min', df.iloc[:250], 210)
+    window = store.window('XAU/USD', '5min', 210)
+    assert window.to_frame()['datetime'].equals(df['datetime'].iloc[40:250].reset_index(drop=True))
+    before = window['close'].copy()
+    # new bars (one bar overlapping) arrive while the window is still being read
+    assert store.update('XAU/USD', '5min', df.iloc[249:300])
+    assert window['close'].equals(before)
+    latest = store.window('XAU/USD', '5min', 210).to_frame()
+    pd.testing.assert_frame_equal(latest, df.iloc[90:].reset_index(drop=True), check_dtype=False)
+    assert not store.update('EUR/USD', '5min', df)
+    assert store.stats()['bytes'] == (210 + series_store.HEADROOM) * 96
+
+
+def test_detect_signals_reads_windows_like_frames():
+    df = generate_ohlc(600, seed=11)
+    ring = series_store.OHLCRing(512)
+    ring.load(df)
+    window = ring.window(420)
+    frame = df.tail(420).reset_index(drop=True)
+    for got, want in zip(detect_signals(window), detect_signals(frame)):
+        assert np.array_equal(got.to_numpy(), want.to_numpy(), equal_nan=True)
@@ -1,6 +1,10 @@
+import multiprocessing
 import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
 import pandas as pd
-from python_signal_engine import detect_signals, fetch_ohlc
+import python_signal_engine
+from python_signal_engine import detect_signals, fetch_ohlc, _delta_params
 
 class TestSignalEngine(unittest.TestCase):
     def test_detect_signals_with_mock_data(self):
@@ -40,5 +44,138 @@ class TestSignalEngine(unittest.TestCase):
         # After the upward crossover (bar index 2), trend should be 1 for subsequent bars
         self.assertTrue((trend.iloc[2:] == 1).any())
 
+    def test_delta_params_request_only_new_bars(self):
+        cached = pd.DataFrame({'datetime': pd.date_range('2024-01-01 00:00', periods=5, freq='5min')})
+        last = cached['datetime'].iloc[-1]
+        # nothing new closed: only the forming bar is requested
+        params, missing = _delta_params(cached, '5min', 210, now=pd.Timestamp(last, tz='UTC') + pd.Timedelta(minutes=2))
+        self.assertEqual(missing, 0)
+        self.assertEqual(params, {'start_date': '2024-01-01 00:20:00', 'outputsize': 5000})
+        params, missing = _delta_params(cached, '5min', 210, now=pd.Timestamp(last, tz='UTC') + pd.Timedelta(minutes=16))
+        self.assertEqual(missing, 3)
+        # gap larger than one request: plain full window
+        params, missing = _delta_params(cached, '5min', 210, now=pd.Timestamp(last, tz='UTC') + pd.Timedelta(days=30))
+        self.assertEqual(params, {'outputsize': 210})
+
+    def test_fetch_ohlc_merges_delta_into_cache(self):
+        cached = pd.DataFrame({
+            'datetime': pd.date_range('2024-01-01 00:00', periods=5, freq='5min'),
+            'open': [1.0] * 5, 'high': [1.0] * 5, 'low': [1.0] * 5, 'close': [1.0] * 5, 'volume': [1] * 5,
+        })
+        fresh = pd.DataFrame({
+            'open': [2.0, 3.0], 'high': [2.0, 3.0], 'low': [2.0, 3.0], 'close': [2.0, 3.0],
+        }, index=pd.Index(pd.date_range('2024-01-01 00:20', periods=2, freq='5min'), name='datetime'))
+        client = mock.MagicMock()
+        client.time_series.return_value.as_pandas.return_value = fresh
+        appended = {}
+
+        def fake_append(symbol, interval, bars, **kwargs):
+            appended['bars'] = bars
+            combined = pd.concat([cached, bars]).drop_duplicates('datetime', keep='last')
+            return combined.sort_values('datetime').reset_index(drop=True)
+
+        with mock.patch.object(python_signal_engine, 'TD_API_KEY', 'key'), \
+                mock.patch.object(python_signal_engine, '_get_td_client', return_value=client), \
+                mock.patch.object(python_signal_engine, '_bars_missing', return_value=1), \
+                mock.patch.object(python_signal_engine, 'load_cache', return_value=cached), \
+                mock.patch.object(python_signal_engine, 'append_to_cache', side_effect=fake_append):
+            df = fetch_ohlc(symbol='XAU/USD', interval='5min', limit=5)
+        kwargs = client.time_series.call_args.kwargs
+        self.assertEqual(kwargs['start_date'], '2024-01-01 00:20:00')
+        self.assertEqual(kwargs['outputsize'], 5000)
+        self.assertEqual(len(appended['bars']), 2)
+        self.assertEqual(list(df['close']), [1.0, 1.0, 1.0, 2.0, 3.0])
+
+    def test_scan_universe_runs_each_symbol(self):
+        from concurrent.futures import ThreadPoolExecutor
+        n = 260
+        close = [1800 + (i % 40) - 20 * ((i // 40) % 2) for i in range(n)]
+        df = pd.DataFrame({
+            'datetime': pd.date_range('2024-01-01', periods=n, freq='5min'),
+            'open': close, 'high': [c + 1 for c in close], 'low': [c - 1 for c in close], 'close': close, 'volume': [1] * n,
+        })
+
+        def fake_fetch(symbol, intervals, limit):
+            if symbol == 'BAD/USD':
+                return {i: None for i in intervals}
+            return {i: df for i in intervals}
+
+        with mock.patch.object(python_signal_engine, 'fetch_timeframes', side_effect=fake_fetch), \
+                mock.patch.object(python_signal_engine, 'BATCH_FETCH', False), \
+                ThreadPoolExecutor(4) as fetch_pool, ThreadPoolExecutor(2) as eval_pool:
+            results = python_signal_engine.scan_universe(['XAU/USD', 'BAD/USD', 'XAG/USD'], 210, fetch_pool, eval_pool)
+        self.assertEqual(list(results), ['XAU/USD', 'BAD/USD', 'XAG/USD'])
+        self.assertIsNone(results['BAD/USD'])
+        expected = python_signal_engine.analyze_timeframes({i: df for i in python_signal_engine.TIMEFRAMES}, 'XAU/USD')
+        self.assertEqual(results['XAU/USD'], expected)
+        self.assertEqual(results['XAG/USD']['symbol'], 'XAG/USD')
+
+    def test_scan_universe_refreshes_only_rolled_timeframes(self):
+        n = 260
+        close = [1800 + (i % 40) - 20 * ((i // 40) % 2) for i in range(n)]
+        df = pd.DataFrame({
+            'datetime': pd.date_range('2024-01-01', periods=n, freq='5min'),
+            'open': close, 'high': [c + 1 for c in close], 'low': [c - 1 for c in close], 'close': close, 'volume': [1] * n,
+        })
+        requested = []
+
+        def fake_fetch(symbol, intervals, limit):
+            requested.append(tuple(intervals))
+            return {i: df for i in intervals}
+
+        previous = {'XAU/USD': {'long': {'5min': False, '15min': True, '1h': True},
+                                'short': {'5min': False, '15min': False, '1h': False}}}
+        with mock.patch.object(python_signal_engine, 'fetch_timeframes', side_effect=fake_fetch), \
+                mock.patch.object(python_signal_engine, 'BATCH_FETCH', False):
+            result = python_signal_engine.scan_universe(['XAU/USD'], 210, intervals=('5min',), previous=previous)['XAU/USD']
+            self.assertEqual(requested, [('5min',)])
+            self.assertTrue(result['long']['1h'] and result['long']['15min'])
+            self.assertGreaterEqual(result['long_agree'], 2)
+            # without a previous analysis every timeframe is fetched
+            python_signal_engine.scan_universe(['XAU/USD'], 210, intervals=('5min',))
+            self.assertEqual(requested[-1], python_signal_engine.TIMEFRAMES)
+
+    def test_worker_detect_times_reach_parent_metrics(self):
+        n = 260
+        close = [1800 + (i % 40) - 20 * ((i // 40) % 2) for i in range(n)]
+        df = pd.DataFrame({
+            'datetime': pd.date_range('2024-02-01', periods=n, freq='5min'),
+            'open': close, 'high': [c + 1 for c in close], 'low': [c - 1 for c in close], 'close': close, 'volume': [1] * n,
+        })
+        latency = python_signal_engine.DETECT_LATENCY.labels('1h')
+        hits = python_signal_engine.DETECT_MEMO.labels('1h', 'hit')
+        before, hits_before = sum(latency.counts), hits.value
+        frames = {i: df for i in python_signal_engine.TIMEFRAMES}
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as eval_pool:
+            for _ in range(2):
+                python_signal_engine.scan_universe(['XAU/USD'], 210, eval_pool=eval_pool, fetch=lambda *a: frames)
+        # computed once in the worker, then served from the worker's memo
+        self.assertEqual(sum(latency.counts), before + 1)
+        self.assertEqual(hits.value, hits_before + 1)
+
+    def test_fetch_ohlc_batch_one_request_per_interval(self):
+        def rows(base):
+            times = pd.date_range('2024-01-01 00:00', periods=3, freq='5min')
+            return tuple({'datetime': str(t), 'open': str(base), 'high': str(base + 1), 'low': str(base - 1),
+                          'close': str(base)} for t in times)
+
+        client = mock.MagicMock()
+        client.time_series.return_value.as_json.return_value = {'XAU/USD': rows(1800.0), 'EUR/USD': rows(1.1)}
+        stored = {}
+
+        def fake_append(symbol, interval, bars, **kwargs):
+            stored[(symbol, interval)] = bars
+            return bars
+
+        with mock.patch.object(python_signal_engine, 'TD_API_KEY', 'key'), \
+                mock.patch.object(python_signal_engine, '_get_td_client', return_value=client), \
+                mock.patch.object(python_signal_engine, 'load_cache', return_value=None), \
+                mock.patch.object(python_signal_engine, 'append_to_cache', side_effect=fake_append):
+            got = python_signal_engine.fetch_ohlc_batch([('XAU/USD', '5min'), ('EUR/USD', '5min')], limit=3)
+        self.assertEqual(client.time_series.call_count, 1)
+        self.assertEqual(client.time_series.call_args.kwargs['symbol'], 'XAU/USD,EUR/USD')
+        self.assertEqual(list(got[('EUR/USD', '5min')]['close']), [1.1] * 3)
+        self.assertEqual(len(stored), 2)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from python_signal_engine import detect_signals
+from signal_grid import detect_signals_grid, param_grid
+
+
+def make_random_walk(n=800, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 1800 + np.cumsum(rng.normal(0, 2, n))
+    return pd.DataFrame({
+        'open': close,
+        'high': close + rng.random(n) * 3,
+        'low': close - rng.random(n) * 3,
+        'close': close,
+    })
+
+
+def test_grid_matches_detect_signals():
+    df = make_random_walk()
+    grid = param_grid([5, 10, 40], [7, 14], [0.5, 1.2])
+    result = detect_signals_grid(df, grid, chunk_size=5)
+    assert result.long_entry.shape == (len(grid), len(df))
+    zlema = result.zlema
+    rsi = result.rsi
+    for i, (ema_length, rsi_length, band_mult) in enumerate(grid):
+        le, se, z, t, r = detect_signals(df, ema_length=ema_length, rsi_length=rsi_length, band_mult=band_mult)
+        assert (result.long_entry[i] == le.to_numpy()).all()
+        assert (result.short_entry[i] == se.to_numpy()).all()
+        assert (result.trend[i] == t.to_numpy()).all()
+        assert np.allclose(zlema[i], z, equal_nan=True)
+        assert np.allclose(rsi[i], r, equal_nan=True)
+
+
+def test_grid_accepts_array_and_short_history():
+    df = make_random_walk(n=50)
+    arr = df[['open', 'high', 'low', 'close']].to_numpy()
+    result = detect_signals_grid(arr, [{'ema_length': 70}, {'ema_length': 5}])
+    # ema_length=70 needs 210 bars: safe empty row like detect_signals
+    assert not result.long_entry[0].any()
+    assert (result.trend[0] == 0).all()
+    assert np.isnan(result.zlema[0]).all()
+    assert not np.isnan(result.zlema[1]).all()
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+import signal_memo
+from python_signal_engine import detect_signals
+
+
+def _frame(n=300):
+    close = 1800 + np.cumsum(np.random.default_rng(2).normal(0, 1, n))
+    return pd.DataFrame({'datetime': pd.date_range('2024-01-01', periods=n, freq='5min'),
+                         'open': close, 'high': close + 1, 'low': close - 1, 'close': close})
+
+
+def _counting(calls):
+    def compute(df, **params):
+        calls.append(params)
+        return detect_signals(df, **params)
+    return compute
+
+
+def test_reuses_result_until_the_last_bar_changes(monkeypatch):
+    monkeypatch.setattr(signal_memo, 'MEMO_DIR', '')
+    signal_memo.clear()
+    calls = []
+    df = _frame()
+    first = signal_memo.detect('XAU/USD', '5min', df, _counting(calls))
+    again = signal_memo.detect('XAU/USD', '5min', df.copy(), _counting(calls))
+    assert again is first and len(calls) == 1
+    # other parameters, a forming bar that moved and a new bar are all misses
+    signal_memo.detect('XAU/USD', '5min', df, _counting(calls), band_mult=1.5)
+    moved = df.copy()
+    moved.loc[moved.index[-1], 'close'] += 1
+    signal_memo.detect('XAU/USD', '5min', moved, _counting(calls))
+    signal_memo.detect('XAU/USD', '5min', _frame(301), _counting(calls))
+    assert len(calls) == 4
+    assert signal_memo.stats()['hits'] == 1 and signal_memo.stats()['misses'] == 4
+    expected = detect_signals(df)
+    for got, want in zip(first, expected):
+        pd.testing.assert_series_equal(got, want)
+
+
+def test_lru_bound_and_disk_sharing(tmp_path, monkeypatch):
+    monkeypatch.setattr(signal_memo, 'MEMO_SIZE', 2)
+    monkeypatch.setattr(signal_memo, 'MEMO_DIR', str(tmp_path))
+    signal_memo.clear()
+    calls = []
+    frames = [_frame(300 + i) for i in range(3)]
+    for df in frames:
+        signal_memo.detect('XAU/USD', '5min', df, _counting(calls))
+    assert signal_memo.stats()['entries'] == 2 and signal_memo.stats()['evictions'] == 1
+    # a fresh process (empty memory) finds the result on disk
+    signal_memo.clear()
+    signal_memo.detect('XAU/USD', '5min', frames[0], _counting(calls))
+    assert len(calls) == 3
+    assert signal_memo.stats()['disk_hits'] == 1
@@ -0,0 +1,69 @@
+import threading
+import time
+
+import tradingview_webhook
+from telegram_relay import TelegramRelay, TokenBucket
+
+
+def test_token_bucket_spaces_out_burst():
+    bucket = TokenBucket(rate=20, capacity=1)
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    # first token is free, the other four wait 1/20s each
+    assert time.monotonic() - start >= 4 / 20 * 0.9
+
+
+def test_relay_delivers_and_reports_wait():
+    sent = []
+    relay = TelegramRelay(sent.append, workers=2, global_rate=1000, chat_rate=1000)
+    for i in range(10):
+        assert relay.submit(f"msg {i}", chat_id='c')
+    relay.join()
+    assert sorted(sent) == sorted(f"msg {i}" for i in range(10))
+    stats = relay.stats()
+    assert stats['sent'] == 10 and stats['failed'] == 0 and stats['queue_depth'] == 0
+    assert stats['max_queue_wait'] >= stats['avg_queue_wait'] >= 0
+
+
+def test_relay_counts_failures_and_full_queue():
+    release = threading.Event()
+
+    def send(text):
+        release.wait(5)
+        return text != 'bad'
+
+    relay = TelegramRelay(send, workers=1, maxsize=2, global_rate=1000, chat_rate=1000)
+    relay.submit('bad')
+    time.sleep(0.05)  # the worker is now blocked on 'bad'
+    assert relay.submit('a') and relay.submit('b')
+    assert not relay.submit('c')
+    release.set()
+    relay.join()
+    stats = relay.stats()
+    assert stats == {**stats, 'sent': 2, 'failed': 1, 'dropped': 1}
+
+
+def test_webhook_returns_202_without_waiting_for_telegram(monkeypatch):
+    release = threading.Event()
+    sent = []
+
+    def slow_send(text):
+        release.wait(5)
+        sent.append(text)
+
+    relay = TelegramRelay(slow_send, workers=1, global_rate=1000, chat_rate=1000)
+    monkeypatch.setattr(tradingview_webhook, 'relay', relay)
+    monkeypatch.setattr(tradingview_webhook, 'WEBHOOK_SECRET', None)
+    client = tradingview_webhook.app.test_client()
+
+    start = time.monotonic()
+    resp = client.post('/webhook', json={'signal_type': 'buy', 'price': '1900', 'rsi': '55'})
+    assert resp.status_code == 202
+    assert time.monotonic() - start < 1
+    assert client.post('/webhook', json={'signal_type': 'buy', 'price': 'n/a'}).status_code == 400
+
+    release.set()
+    relay.join()
+    assert len(sent) == 1 and 'Price: 1900.0' in sent[0]
+    assert client.get('/relay/stats').get_json()['sent'] == 1
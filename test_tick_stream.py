@@ -0,0 +1,106 @@
+import json
+import threading
+import time
+
+import pytest
+
+import websocket_lite
+from tick_stream import BarAggregator, TickIngestor
+from ws_standin import TickReplayServer
+
+T = 1704067200  # 2024-01-01 00:00 UTC, a 15min boundary
+
+
+def test_aggregator_builds_and_closes_bars():
+    agg = BarAggregator(('5min', '15min'), since=T)
+    for ts, price in ((T + 10, 100), (T + 100, 102), (T + 200, 99)):
+        assert agg.add(ts, price) == []
+    closed = agg.add(T + 310, 101)
+    assert [(b.interval, b.start, b.open, b.high, b.low, b.close, b.ticks, b.complete) for b in closed] == \
+        [('5min', T, 100, 102, 99, 99, 3, True)]
+    # a tick for a bucket that already closed is counted, not applied
+    assert agg.add(T + 50, 90) == [] and agg.late_ticks == 1
+    assert agg.next_deadline(grace=0.2) == T + 600.2
+    assert agg.flush(T + 600.1, grace=0.2) == []
+    assert [b.start for b in agg.flush(T + 600.2, grace=0.2)] == [T + 300]
+    (bar,) = agg.flush(T + 900.2, grace=0.2)
+    assert (bar.interval, bar.open, bar.high, bar.low, bar.close, bar.ticks) == ('15min', 100, 102, 99, 101, 4)
+    # after a reconnect the bucket already in progress is incomplete
+    agg.reset(since=T + 1000)
+    agg.add(T + 1001, 1.0)
+    assert not agg.flush(T + 1200.2, grace=0.2)[0].complete
+
+
+def test_websocket_roundtrip_fragment_safe():
+    server = TickReplayServer([{'symbol': 'XAU/USD', 'timestamp': T, 'price': 1.0}], speed=1)
+    try:
+        conn = websocket_lite.connect(f"ws://127.0.0.1:{server.port}/v1/quotes/price")
+        conn.send_text(json.dumps({'action': 'heartbeat'}))
+        assert json.loads(conn.recv(timeout=5)) == {'event': 'heartbeat', 'status': 'ok'}
+        conn.send_text(json.dumps({'action': 'subscribe', 'params': {'symbols': 'XAU/USD,NOPE'}}))
+        status = json.loads(conn.recv(timeout=5))
+        assert status['event'] == 'subscribe-status' and status['fails'] == [{'symbol': 'NOPE'}]
+        tick = json.loads(conn.recv(timeout=5))
+        assert tick['event'] == 'price' and tick['price'] == 1.0
+        conn.close()
+    finally:
+        server.close()
+
+
+def _ticks(n, step=30):
+    return [{'symbol': 'XAU/USD', 'timestamp': T + i * step, 'price': 1800.0 + (i * 7) % 11} for i in range(n)]
+
+
+def _expected_bars(ticks):
+    bars = {}
+    for t in ticks:
+        start = t['timestamp'] // 300 * 300
+        b = bars.setdefault(start, [t['price'], t['price'], t['price'], t['price']])
+        b[1], b[2], b[3] = max(b[1], t['price']), min(b[2], t['price']), t['price']
+    return bars
+
+
+@pytest.mark.parametrize('disconnect_after', [0, 15])
+def test_ingestor_stores_closed_bars_and_backfills_gaps(disconnect_after):
+    ticks = _ticks(41)
+    server = TickReplayServer(ticks, speed=600, rebase=False, disconnect_after=disconnect_after)
+    stored, backfills, changed = [], [], []
+    done = threading.Event()
+    ingestor = None
+
+    def feed_clock():
+        # time follows the feed, so replayed 2024 ticks are not closed by the wall clock
+        last = ingestor.stats()['last_tick'] if ingestor else None
+        return (last if last is not None else T - 60) + 1
+
+    def store(symbol, interval, frame):
+        stored.append(frame.iloc[0])
+
+    def on_bars(symbol, intervals):
+        changed.append(intervals)
+        if server.done():
+            done.set()
+
+    ingestor = TickIngestor(f"ws://127.0.0.1:{server.port}/v1/quotes/price", ['XAU/USD'], ('5min',), store,
+                            lambda s, i: backfills.append((s, i)), on_bars, clock=feed_clock,
+                            reconnect_min=0.01, record_file='')
+    try:
+        ingestor.start()
+        assert done.wait(15)
+        time.sleep(0.2)
+    finally:
+        ingestor.stop()
+        server.close()
+    stats = ingestor.stats()
+    expected = _expected_bars(ticks)
+    # every stored bar saw its whole bucket and matches the ticks exactly
+    for row in stored:
+        start = int(row['datetime'].timestamp())
+        assert [row['open'], row['high'], row['low'], row['close']] == expected[start]
+    if disconnect_after:
+        assert stats['connects'] >= 2
+        # one backfill per connect plus the bars cut by a disconnect
+        assert len(backfills) > stats['connects']
+    else:
+        assert stats['connects'] == 1 and backfills == [('XAU/USD', '5min')]
+        assert len(stored) == 4
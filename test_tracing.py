@@ -0,0 +1,71 @@
+import json
+import threading
+
+import tracing
+
+
+def test_spans_nest_and_are_noop_outside_cycle(monkeypatch):
+    monkeypatch.setattr(tracing, 'TRACE_FILE', '')
+    with tracing.span('ignored'):
+        pass
+    with tracing.cycle('test') as cyc:
+        with tracing.span('detect_signals'):
+            with tracing.span('zlema'):
+                pass
+            with tracing.span('zlema'):
+                pass
+        with tracing.span('webhook_send'):
+            pass
+    spans = cyc.breakdown()
+    assert set(spans) == {'detect_signals', 'detect_signals/zlema', 'webhook_send'}
+    assert spans['detect_signals/zlema']['count'] == 2
+    assert cyc.duration > 0
+    assert cyc.summary().startswith('test cycle ')
+    with tracing.span('after'):
+        pass
+    assert 'after' not in cyc.breakdown()
+
+
+def test_other_threads_record_top_level_spans(monkeypatch):
+    monkeypatch.setattr(tracing, 'TRACE_FILE', '')
+
+    def fetch():
+        with tracing.span('fetch_ohlc'):
+            pass
+
+    with tracing.cycle('test') as cyc:
+        with tracing.span('fetch'):
+            workers = [threading.Thread(target=fetch) for _ in range(3)]
+            for w in workers:
+                w.start()
+            for w in workers:
+                w.join()
+    assert cyc.breakdown()['fetch_ohlc']['count'] == 3
+
+
+def test_cycle_written_as_jsonl(tmp_path, monkeypatch):
+    path = tmp_path / 'traces.jsonl'
+    monkeypatch.setattr(tracing, 'TRACE_FILE', str(path))
+    for _ in range(2):
+        with tracing.cycle('engine'):
+            with tracing.span('fetch_ohlc'):
+                pass
+    lines = path.read_text().splitlines()
+    assert len(lines) == 2
+    record = json.loads(lines[0])
+    assert record['cycle'] == 'engine'
+    assert record['spans']['fetch_ohlc']['count'] == 1
+    assert set(record) == {'cycle', 'started_at', 'duration_ms', 'spans'}
+
+
+def test_changing_trace_file_closes_old_writer(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, 'TRACE_FILE', str(tmp_path / 'a.jsonl'))
+    with tracing.cycle('engine'):
+        pass
+    old = tracing._writer
+    monkeypatch.setattr(tracing, 'TRACE_FILE', str(tmp_path / 'b.jsonl'))
+    with tracing.cycle('engine'):
+        pass
+    assert tracing._writer is not old
+    assert old.stream is None
+    assert (tmp_path / 'b.jsonl').read_text().count('\n') == 1
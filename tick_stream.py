@@ -0,0 +1,289 @@
+"""Streaming ingestion: aggregate WebSocket price ticks into OHLC bars as they close.
+
+`TickIngestor` subscribes to a Twelve Data style price stream (see
+websocket_lite.py; ws_standin.py replays recorded ticks locally), feeds every
+tick into a per-symbol `BarAggregator` and, as soon as a bar closes, appends it
+to data_cache and calls `on_bars(symbol, intervals)` so the engine evaluates
+right away. A bar closes on the first tick of the next bucket or, when the feed
+is quiet, CLOSE_GRACE seconds after its end.
+
+Gaps are filled from REST through the `backfill(symbol, interval)` callable:
+for every series after each (re)connect, for bars whose bucket started before
+the connection (ticks may be missing) and when whole buckets passed without a
+tick. Reconnects back off exponentially up to RECONNECT_MAX seconds.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+import metrics
+import websocket_lite
+from bar_scheduler import last_close
+from intervals import interval_seconds
+
+# Seconds after a bar's end before a quiet feed closes it
+CLOSE_GRACE = float(os.getenv('STREAM_CLOSE_GRACE', '0.2'))
+# Twelve Data drops connections without a heartbeat for a while
+HEARTBEAT_INTERVAL = float(os.getenv('STREAM_HEARTBEAT', '10'))
+RECONNECT_MIN = float(os.getenv('STREAM_RECONNECT_MIN', '1'))
+RECONNECT_MAX = float(os.getenv('STREAM_RECONNECT_MAX', '60'))
+# Append every received price event to this JSONL file (replayable with ws_standin.py)
+RECORD_FILE = os.getenv('TICK_RECORD_FILE', '')
+
+TICKS = metrics.counter('stream_ticks_total', 'Price ticks received, by result (used, late, ignored)', ['result'])
+BARS = metrics.counter('stream_bars_total', 'Bars closed from ticks, by outcome (stored, backfilled)', ['interval', 'outcome'])
+RECONNECTS = metrics.counter('stream_reconnects_total', 'Price stream reconnects')
+CLOSE_LAG = metrics.histogram('stream_bar_close_lag_seconds', 'Time from bar end to the bar being stored')
+
+# `complete` is False when the bucket started before ticks were being received
+Bar = namedtuple('Bar', ['interval', 'start', 'open', 'high', 'low', 'close', 'ticks', 'complete'])
+
+
+class BarAggregator:
+    """Builds bars of several intervals from one symbol's ticks (epoch seconds, price)."""
+
+    def __init__(self, intervals, since=0.0):
+        self.intervals = tuple(intervals)
+        self._steps = {i: interval_seconds(i) for i in self.intervals}
+        self._forming = {}
+        self._closed_until = {}
+        self.since = since
+        self.late_ticks = 0
+
+    def reset(self, since):
+        """Drop forming bars (e.g. after a disconnect); buckets started before `since` are incomplete."""
+        self._forming.clear()
+        self._closed_until.clear()
+        self.since = since
+
+    def add(self, ts, price):
+        """Record a tick; returns the bars it closed (oldest first).
+
+        A tick older than a bar already closed or forming in any interval is
+        counted in `late_ticks` and dropped everywhere, so higher timeframes
+        stay consistent with the lower ones.
+        """
+        starts = [last_close(interval, ts) for interval in self.intervals]
+        for interval, start in zip(self.intervals, starts):
+            bar = self._forming.get(interval)
+            if start < self._closed_until.get(interval, float('-inf')) or (bar is not None and start < bar[0]):
+                self.late_ticks += 1
+                return []
+        closed = []
+        for interval, start in zip(self.intervals, starts):
+            bar = self._forming.get(interval)
+            if bar is not None and start > bar[0]:
+                closed.append(self._close(interval))
+                bar = None
+            if bar is None:
+                self._forming[interval] = [start, price, price, price, price, 1, start >= self.since]
+            else:
+                bar[2] = max(bar[2], price)
+                bar[3] = min(bar[3], price)
+                bar[4] = price
+                bar[5] += 1
+        return closed
+
+    def _close(self, interval):
+        start, o, h, lo, c, n, complete = self._forming.pop(interval)
+        self._closed_until[interval] = start + self._steps[interval]
+        return Bar(interval, start, o, h, lo, c, n, complete)
+
+    def flush(self, now, grace=CLOSE_GRACE):
+        """Close bars whose end plus `grace` is at or before `now`."""
+        due = [i for i, bar in self._forming.items() if bar[0] + self._steps[i] + grace <= now]
+        return [self._close(i) for i in due]
+
+    def next_deadline(self, grace=CLOSE_GRACE):
+        """When the earliest forming bar can be closed by `flush`, or None."""
+        ends = [bar[0] + self._steps[i] for i, bar in self._forming.items()]
+        return min(ends) + grace if ends else None
+
+
+def bar_frame(bar):
+    """One-row frame in the cache layout (volume = 1, like REST bars)."""
+    return pd.DataFrame({'datetime': [pd.Timestamp(bar.start, unit='s')], 'open': [float(bar.open)],
+                         'high': [float(bar.high)], 'low': [float(bar.low)], 'close': [float(bar.close)], 'volume': [1]})
+
+
+class TickIngestor:
+    """Keeps a price stream subscription alive and turns its ticks into stored bars.
+
+    `store(symbol, interval, frame)` persists a closed bar, `backfill(symbol,
+    interval)` fetches the series from REST, `on_bars(symbol, intervals)` is
+    told which series changed. All three run on the ingestor thread.
+    """
+
+    def __init__(self, url, symbols, intervals, store, backfill, on_bars, clock=time.time,
+                 close_grace=CLOSE_GRACE, heartbeat=HEARTBEAT_INTERVAL, reconnect_min=RECONNECT_MIN,
+                 reconnect_max=RECONNECT_MAX, record_file=RECORD_FILE):
+        self.url = url
+        self.symbols = list(symbols)
+        self.intervals = tuple(intervals)
+        self._store = store
+        self._backfill = backfill
+        self._on_bars = on_bars
+        self._clock = clock
+        self.close_grace = close_grace
+        self.heartbeat = heartbeat
+        self.reconnect_min = reconnect_min
+        self.reconnect_max = reconnect_max
+        self.record_file = record_file
+        self._aggregators = {s.upper(): BarAggregator(self.intervals) for s in self.symbols}
+        self._names = {s.upper(): s for s in self.symbols}
+        self._last_start = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._conn = None
+        self._record = None
+        self._stats = {'ticks': 0, 'bars': 0, 'backfills': 0, 'connects': 0, 'late_ticks': 0, 'last_tick': None}
+        self._stats_lock = threading.Lock()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='tick-ingestor', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        conn = self._conn
+        if conn is not None:
+            conn.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._record is not None:
+            self._record.close()
+            self._record = None
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self._stats[key] += n
+
+    def _run(self):
+        failures = 0
+        while not self._stop.is_set():
+            try:
+                self._conn = websocket_lite.connect(self.url)
+                failures = 0
+                self._session(self._conn)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                failures += 1
+                RECONNECTS.inc()
+                delay = min(self.reconnect_max, self.reconnect_min * 2 ** (failures - 1))
+                if isinstance(e, OSError):
+                    logging.warning(f"Price stream disconnected ({e}); reconnecting in {delay:.1f}s")
+                else:
+                    logging.error(f"Price stream session failed: {e}; reconnecting in {delay:.1f}s", exc_info=True)
+                self._stop.wait(delay)
+            finally:
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+
+    def _session(self, conn):
+        conn.send_text(json.dumps({'action': 'subscribe', 'params': {'symbols': ','.join(self.symbols)}}))
+        self._count('connects')
+        now = self._clock()
+        for agg in self._aggregators.values():
+            agg.reset(since=now)
+        self._last_start.clear()
+        logging.info(f"Price stream connected; backfilling {len(self.symbols)} symbol(s) from REST")
+        for symbol in self.symbols:
+            for interval in self.intervals:
+                self._run_backfill(symbol, interval)
+            self._on_bars(symbol, self.intervals)
+        next_heartbeat = self._clock() + self.heartbeat
+        while not self._stop.is_set():
+            now = self._clock()
+            deadlines = [d for d in (a.next_deadline(self.close_grace) for a in self._aggregators.values()) if d]
+            wait = min([next_heartbeat] + deadlines) - now
+            message = conn.recv(timeout=max(0.01, wait))
+            if message is not None:
+                self._handle(message)
+            now = self._clock()
+            for key, agg in self._aggregators.items():
+                closed = agg.flush(now, self.close_grace)
+                if closed:
+                    self._emit(self._names[key], closed)
+            if now >= next_heartbeat:
+                conn.send_text(json.dumps({'action': 'heartbeat'}))
+                next_heartbeat = now + self.heartbeat
+
+    def _handle(self, message):
+        try:
+            event = json.loads(message)
+        except ValueError:
+            logging.warning(f"Ignoring non-JSON stream message: {message[:200]!r}")
+            return
+        kind = event.get('event')
+        if kind == 'price':
+            self._on_tick(event)
+        elif kind == 'subscribe-status':
+            fails = event.get('fails') or []
+            if fails:
+                logging.warning(f"Price stream could not subscribe: {fails}")
+        elif kind not in ('heartbeat',):
+            logging.debug(f"Stream event: {event}")
+
+    def _on_tick(self, event):
+        key = str(event.get('symbol', '')).upper()
+        agg = self._aggregators.get(key)
+        try:
+            ts, price = float(event['timestamp']), float(event['price'])
+        except (KeyError, TypeError, ValueError):
+            agg = None
+        if agg is None:
+            TICKS.labels('ignored').inc()
+            return
+        if self.record_file:
+            self._write_record(event)
+        late = agg.late_ticks
+        closed = agg.add(ts, price)
+        TICKS.labels('late' if agg.late_ticks > late else 'used').inc()
+        with self._stats_lock:
+            self._stats['ticks'] += 1
+            self._stats['late_ticks'] += agg.late_ticks - late
+            self._stats['last_tick'] = ts
+        if closed:
+            self._emit(self._names[key], closed)
+
+    def _write_record(self, event):
+        if self._record is None:
+            self._record = open(self.record_file, 'a', encoding='utf-8')
+        self._record.write(json.dumps(event) + '\n')
+
+    def _emit(self, symbol, bars):
+        for bar in bars:
+            step = interval_seconds(bar.interval)
+            previous = self._last_start.get((symbol, bar.interval))
+            # a whole bucket without ticks, or a bucket we only saw part of: take REST's bars
+            gap = previous is not None and bar.start > previous + step
+            self._last_start[(symbol, bar.interval)] = bar.start
+            if bar.complete and not gap:
+                self._store(symbol, bar.interval, bar_frame(bar))
+                BARS.labels(bar.interval, 'stored').inc()
+            else:
+                self._run_backfill(symbol, bar.interval)
+                BARS.labels(bar.interval, 'backfilled').inc()
+            CLOSE_LAG.observe(max(0.0, self._clock() - (bar.start + step)))
+        self._count('bars', len(bars))
+        self._on_bars(symbol, tuple(dict.fromkeys(bar.interval for bar in bars)))
+
+    def _run_backfill(self, symbol, interval):
+        self._count('backfills')
+        try:
+            self._backfill(symbol, interval)
+        except Exception as e:
+            logging.warning(f"Backfill of {symbol} {interval} failed: {e}")
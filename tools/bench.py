@@ -0,0 +1,243 @@
+"""Benchmark the hot paths on synthetic data and compare runs against a baseline.
+
+Usage:
+  python tools/bench.py run [--out bench.json] [--quick] [--repeat 3] [--seed 0]
+  python tools/bench.py compare BASELINE.json CURRENT.json [--threshold 0.25]
+
+`run` times, on bars from synthetic_ohlc.generate_ohlc (seeded random walk with
+volatility regimes):
+  - detect_signals at 1k, 100k and 1M bars (the 1M case takes minutes)
+  - append_to_cache (one bar) and load_cache (cold from disk and from the memo)
+    at growing cache sizes, with the configured DATA_CACHE_BACKEND
+  - dedupe_store set, get of unknown ids and get of recently sent ids
+  - _make_signal_id
+Each case runs --repeat times; the best and median seconds per operation are
+written as JSON together with the Python/NumPy/pandas versions. --quick shrinks
+the sizes for a smoke run. Everything runs offline in a temporary directory.
+
+`compare` matches cases by name and flags a regression when the current best
+time exceeds the baseline's by more than --threshold (0.25 = 25% slower); it
+exits with status 1 if any case regressed.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+import data_cache
+import dedupe_store
+import python_signal_engine as engine
+from synthetic_ohlc import generate_ohlc
+
+DETECT_SIZES = (1000, 100000, 1000000)
+CACHE_SIZES = (2000, 100000, 1000000)
+QUICK_DETECT_SIZES = (1000, 5000)
+QUICK_CACHE_SIZES = (2000, 20000)
+
+
+def _result(times, ops):
+    per_op = [t / ops for t in times]
+    return {'best': min(per_op), 'median': statistics.median(per_op), 'repeat': len(times), 'ops': ops}
+
+
+def _timed(fn, repeat, ops=1, setup=None):
+    """Wall time of `fn(run)` per repeat; `setup(run)` runs untimed before each."""
+    times = []
+    for run in range(repeat):
+        if setup is not None:
+            setup(run)
+        t0 = time.perf_counter()
+        fn(run)
+        times.append(time.perf_counter() - t0)
+    return _result(times, ops)
+
+
+def bench_detect(sizes, repeat, seed):
+    results = {}
+    for n in sizes:
+        df = generate_ohlc(n, seed=seed)
+        # the 1M case runs once; a single pass is already minutes long
+        runs = repeat if n <= 100000 else 1
+        results[f"detect_signals[bars={n}]"] = _timed(lambda run: engine.detect_signals(df), runs)
+    return results
+
+
+def bench_cache(sizes, repeat, appends, seed, tmp):
+    results = {}
+    saved = data_cache.CACHE_DIR
+    data_cache.CACHE_DIR = os.path.join(tmp, 'cache')
+    try:
+        for n in sizes:
+            symbol, interval = 'BENCH/USD', f"5min_{n}"
+            df = generate_ohlc(n + repeat * appends, seed=seed)
+            max_rows = len(df)
+            data_cache.save_cache(symbol, interval, df.iloc[:n], max_rows=max_rows)
+
+            def append(run):
+                first = n + run * appends
+                for i in range(first, first + appends):
+                    data_cache.append_to_cache(symbol, interval, df.iloc[i:i + 1], max_rows=max_rows)
+
+            results[f"append_to_cache[{data_cache.CACHE_BACKEND},rows={n}]"] = _timed(append, repeat, ops=appends)
+            results[f"load_cache[{data_cache.CACHE_BACKEND},rows={n},cold]"] = _timed(
+                lambda run: data_cache.load_cache(symbol, interval), repeat,
+                setup=lambda run: data_cache.clear_memo())
+            results[f"load_cache[{data_cache.CACHE_BACKEND},rows={n},memo]"] = _timed(
+                lambda run: data_cache.load_cache(symbol, interval), repeat)
+    finally:
+        data_cache.CACHE_DIR = saved
+        data_cache.clear_memo()
+    return results
+
+
+def bench_dedupe(ops, repeat, tmp):
+    saved = dedupe_store.DB_PATH
+    dedupe_store.DB_PATH = os.path.join(tmp, 'dedupe.db')
+    now = int(time.time())
+    try:
+        def set_ids(run):
+            for i in range(ops):
+                dedupe_store.set(f"sig-{run}-{i}", now)
+
+        def get_unknown(run):
+            for i in range(ops):
+                dedupe_store.get(f"unknown-{run}-{i}", min_ts=now - 120)
+
+        def get_sent(run):
+            for i in range(ops):
+                dedupe_store.get(f"sig-{run}-{i}", min_ts=now - 120)
+
+        return {
+            'dedupe_store.set': _timed(set_ids, repeat, ops=ops),
+            'dedupe_store.get[unknown]': _timed(get_unknown, repeat, ops=ops),
+            'dedupe_store.get[sent]': _timed(get_sent, repeat, ops=ops),
+        }
+    finally:
+        dedupe_store.DB_PATH = saved
+
+
+def bench_signal_id(ops, repeat):
+    bar_time = pd.Timestamp('2024-01-02 03:05:00')
+
+    def make_ids(run):
+        for _ in range(ops):
+            engine._make_signal_id('XAU/USD', '5min', 'longSignal', bar_time)
+
+    return {'_make_signal_id': _timed(make_ids, repeat, ops=ops)}
+
+
+def run_suite(detect_sizes=DETECT_SIZES, cache_sizes=CACHE_SIZES, repeat=3, ops=2000, appends=5, seed=0):
+    """Run every case and return the JSON-ready report."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        results.update(bench_signal_id(ops * 10, repeat))
+        results.update(bench_dedupe(ops, repeat, tmp))
+        results.update(bench_cache(cache_sizes, repeat, appends, seed, tmp))
+        results.update(bench_detect(detect_sizes, repeat, seed))
+    return {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=0.25):
+    """Rows of (name, baseline_s, current_s, ratio, status) for the union of cases.
+
+    status is 'regression' above 1 + threshold, 'faster' below 1 - threshold,
+    'ok' in between, and 'new'/'missing' for cases only in one report.
+    """
+    base, cur = baseline['results'], current['results']
+    rows = []
+    for name in list(base) + [n for n in cur if n not in base]:
+        b = base.get(name, {}).get('best')
+        c = cur.get(name, {}).get('best')
+        if b is None or c is None:
+            rows.append((name, b, c, None, 'missing' if c is None else 'new'))
+            continue
+        ratio = c / b if b > 0 else float('inf')
+        status = 'regression' if ratio > 1 + threshold else 'faster' if ratio < 1 - threshold else 'ok'
+        rows.append((name, b, c, ratio, status))
+    return rows
+
+
+def _fmt_s(seconds):
+    if seconds is None:
+        return '-'
+    for unit, scale in (('s', 1), ('ms', 1e3), ('us', 1e6)):
+        if seconds * scale >= 1:
+            return f"{seconds * scale:.2f}{unit}"
+    return f"{seconds * 1e9:.0f}ns"
+
+
+def print_report(report):
+    print(f"{'case':52} {'best/op':>10} {'median/op':>10}")
+    for name, r in report['results'].items():
+        print(f"{name:52} {_fmt_s(r['best']):>10} {_fmt_s(r['median']):>10}")
+
+
+def print_comparison(rows):
+    print(f"{'case':52} {'baseline':>10} {'current':>10} {'ratio':>7}  status")
+    for name, b, c, ratio, status in rows:
+        shown = f"{ratio:.2f}x" if ratio is not None else '-'
+        print(f"{name:52} {_fmt_s(b):>10} {_fmt_s(c):>10} {shown:>7}  {status}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help='run the benchmarks and write JSON')
+    run.add_argument('--out', default='bench.json', help='JSON report path')
+    run.add_argument('--quick', action='store_true', help='small sizes for a smoke run')
+    run.add_argument('--detect-sizes', type=int, nargs='+', help='bar counts for detect_signals')
+    run.add_argument('--cache-sizes', type=int, nargs='+', help='rows already cached for append/load')
+    run.add_argument('--repeat', type=int, default=3)
+    run.add_argument('--ops', type=int, default=2000, help='operations per dedupe repeat (x10 for _make_signal_id)')
+    run.add_argument('--seed', type=int, default=0)
+    cmp_ = sub.add_parser('compare', help='compare a report against a baseline')
+    cmp_.add_argument('baseline')
+    cmp_.add_argument('current')
+    cmp_.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown before flagging (0.25 = 25%%)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        detect_sizes = args.detect_sizes or (QUICK_DETECT_SIZES if args.quick else DETECT_SIZES)
+        cache_sizes = args.cache_sizes or (QUICK_CACHE_SIZES if args.quick else CACHE_SIZES)
+        report = run_suite(detect_sizes, cache_sizes, repeat=args.repeat, ops=args.ops, seed=args.seed)
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print_report(report)
+        print(f"Wrote {args.out}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold)
+    print_comparison(rows)
+    regressions = [r[0] for r in rows if r[4] == 'regression']
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Benchmark the CSV and columnar data cache backends.
+
+Usage:
+  python tools/bench_cache.py [--sizes 2000 100000 1000000] [--appends 5]
+
+For each cache size, both backends are filled with synthetic 5-minute bars, then
+the script times appending one new bar (a typical fetch) and loading the series.
+Everything runs in a temporary directory.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+import data_cache
+
+
+def make_bars(n, start='2015-01-01'):
+    rng = np.random.default_rng(0)
+    close = 1800 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        'datetime': pd.date_range(start, periods=n, freq='5min'),
+        'open': close,
+        'high': close + 1,
+        'low': close - 1,
+        'close': close,
+        'volume': 1,
+    })
+
+
+def bench(backend, n, appends):
+    data_cache.CACHE_BACKEND = backend
+    symbol, interval = 'BENCH/USD', f"5min_{backend}"
+    df = make_bars(n + appends)
+    data_cache.save_cache(symbol, interval, df.iloc[:n], max_rows=n + appends)
+    t0 = time.perf_counter()
+    for i in range(appends):
+        data_cache.append_to_cache(symbol, interval, df.iloc[n + i:n + i + 1], max_rows=n + appends)
+    append_s = (time.perf_counter() - t0) / appends
+    t0 = time.perf_counter()
+    loaded = data_cache.load_cache(symbol, interval)
+    load_s = time.perf_counter() - t0
+    assert len(loaded) == n + appends
+    return append_s, load_s
+
+
+def main(sizes, appends):
+    with tempfile.TemporaryDirectory() as tmp:
+        data_cache.CACHE_DIR = tmp
+        print(f"{'rows':>9} | {'backend':>8} | {'append (ms)':>11} | {'load (ms)':>9}")
+        for n in sizes:
+            for backend in ('csv', 'columnar'):
+                append_s, load_s = bench(backend, n, appends)
+                print(f"{n:>9} | {backend:>8} | {append_s * 1000:>11.2f} | {load_s * 1000:>9.2f}")
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--sizes', type=int, nargs='+', default=[2000, 100000, 1000000])
+    p.add_argument('--appends', type=int, default=5)
+    args = p.parse_args()
+    main(args.sizes, args.appends)
@@ -0,0 +1,113 @@
+"""Benchmark dedupe_store against the previous connect-per-call implementation.
+
+Usage:
+  python tools/bench_dedupe.py [--ops 2000] [--existing 10000]
+
+Each "send" is what send_signal_to_webhook_with_metadata does per signal: the
+old store ran cleanup + get + set, each opening its own connection; the new one
+runs a TTL-filtered get + set on a persistent connection. Repeated lookups of
+already-sent ids are timed separately. Everything runs in a temporary directory.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dedupe_store
+
+TTL = 120
+
+
+class LegacyStore:
+    """The store as it was: schema check and a fresh connection for every call."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _ensure_db(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute('CREATE TABLE IF NOT EXISTS sent_signals (signal_id TEXT PRIMARY KEY, ts INTEGER)')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _run(self, sql, args, fetch=False):
+        self._ensure_db()
+        conn = sqlite3.connect(self.path)
+        try:
+            row = conn.execute(sql, args).fetchone() if fetch else conn.execute(sql, args)
+            conn.commit()
+            return row
+        finally:
+            conn.close()
+
+    def get(self, signal_id):
+        row = self._run('SELECT ts FROM sent_signals WHERE signal_id = ?', (signal_id,), fetch=True)
+        return row[0] if row else None
+
+    def set(self, signal_id, ts):
+        self._run('INSERT OR REPLACE INTO sent_signals(signal_id, ts) VALUES (?, ?)', (signal_id, int(ts)))
+
+    def cleanup(self, older_than_ts):
+        self._run('DELETE FROM sent_signals WHERE ts < ?', (int(older_than_ts),))
+
+
+def fill(path, n, now):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE IF NOT EXISTS sent_signals (signal_id TEXT PRIMARY KEY, ts INTEGER)')
+    conn.executemany('INSERT INTO sent_signals VALUES (?, ?)', ((f"old-{i}", now - i % 100) for i in range(n)))
+    conn.commit()
+    conn.close()
+
+
+def bench_legacy(path, ops, now):
+    store = LegacyStore(path)
+    t0 = time.perf_counter()
+    for i in range(ops):
+        store.cleanup(now - TTL)
+        if store.get(f"sig-{i}") is None:
+            store.set(f"sig-{i}", now)
+    send = ops / (time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    for i in range(ops):
+        store.cleanup(now - TTL)
+        store.get(f"sig-{i}")
+    lookup = ops / (time.perf_counter() - t0)
+    return send, lookup
+
+
+def bench_current(path, ops, now):
+    dedupe_store.DB_PATH = path
+    t0 = time.perf_counter()
+    for i in range(ops):
+        if dedupe_store.get(f"sig-{i}", min_ts=now - TTL) is None:
+            dedupe_store.set(f"sig-{i}", now)
+    send = ops / (time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    for i in range(ops):
+        dedupe_store.get(f"sig-{i}", min_ts=now - TTL)
+    lookup = ops / (time.perf_counter() - t0)
+    return send, lookup
+
+
+def main(ops, existing):
+    now = int(time.time())
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'store':>8} | {'send (ops/s)':>12} | {'duplicate lookup (ops/s)':>24}")
+        for name, bench in (('legacy', bench_legacy), ('current', bench_current)):
+            path = os.path.join(tmp, f"{name}.db")
+            fill(path, existing, now)
+            send, lookup = bench(path, ops, now)
+            print(f"{name:>8} | {send:>12.0f} | {lookup:>24.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ops', type=int, default=2000)
+    parser.add_argument('--existing', type=int, default=10000, help='rows already in the table')
+    args = parser.parse_args()
+    main(args.ops, args.existing)
@@ -1,14 +1,47 @@
 """Bootstrap all TradingView CSV exports in a folder into the data cache.
 
 Usage:
-  python tools/bootstrap_all.py --dir "C:\path\to\exports"
+  python tools/bootstrap_all.py --dir "C:\\path\\to\\exports" [--workers 8] [--chunk-rows 500000] [--tz Europe/London] [--dry-run]
 
-This script will attempt to infer symbol and interval from filename using a simple pattern:
-  SYMBOL__INTERVAL.csv  (e.g. XAU_USD__5min.csv) or you can pass --pattern to customize.
+Symbol and interval are inferred from the filename:
+  SYMBOL__INTERVAL.csv  (e.g. XAU_USD__5min.csv); several files may share a
+  series (e.g. XAU_USD__1min.2019.csv, XAU_USD__1min.2020.csv).
+
+Files are parsed in parallel on a process pool, each read in chunks of
+`--chunk-rows` rows so memory stays bounded however large the export is. The
+time column (`datetime`, `time`, `date` or `timestamp`; epoch seconds/ms or
+text) is normalized to UTC. Text with an offset is converted with it, text
+without one is taken as `--tz` (default UTC); dates that are not ISO 8601 go
+through pandas' slower mixed-format parser. Every worker writes its file's bars, sorted and deduped, to a
+temporary bar archive. The main process merges those into the series' archive
+(data_cache.import_records: streamed, at most two blocks in memory), so newer
+cached bars survive, and refreshes the live cache from it.
+
+A summary line per file reports the rows read, bars kept, rows dropped as
+invalid, duplicate timestamps within the file, bars that were new or already
+archived, the gaps (consecutive bars further apart than the interval) and the
+largest one.
 """
-import os
 import argparse
-from data_cache import bootstrap_from_csv
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bar_archive
+import data_cache
+from intervals import interval_seconds
+
+TIME_COLUMNS = ('datetime', 'time', 'date', 'timestamp')
+PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+# A time of day followed by a UTC offset (Z, +01:00, -0500, +09)
+OFFSET_PATTERN = r':\d{2}(?:\.\d+)?\s*(?:Z|[+-]\d{2}(?::?\d{2})?)$'
 
 
 def infer_from_filename(name: str):
@@ -16,28 +49,160 @@ def infer_from_filename(name: str):
     if '__' in base:
         sym, interval = base.split('__', 1)
         sym = sym.replace('_', '/').upper()
-        return sym, interval
+        # anything after a dot in the interval part tells files of one series apart
+        return sym, interval.split('.')[0]
     return None, None
 
 
-def main(folder, dry_run=False):
-    files = [os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith('.csv')]
+def to_utc(raw, tz=None):
+    """Parse a time column to naive UTC datetime64[ns]; epoch numbers are seconds (or ms when that large).
+
+    Text with an offset is converted with it (offsets may change across DST);
+    text without one is wall time in `tz` (default UTC).
+    """
+    if pd.api.types.is_numeric_dtype(raw):
+        unit = 'ms' if raw.abs().max() > 1e11 else 's'
+        return pd.to_datetime(raw, unit=unit, errors='coerce')
+    has_offset = raw.astype(str).str.contains(OFFSET_PATTERN, regex=True)
+    times = pd.Series(pd.NaT, index=raw.index, dtype='datetime64[ns]')
+    if has_offset.any():
+        times[has_offset] = _parse_text(raw[has_offset]).dt.tz_localize(None)
+    if not has_offset.all():
+        wall = _parse_text(raw[~has_offset]).dt.tz_localize(None)
+        if tz is not None:
+            wall = wall.dt.tz_localize(tz, ambiguous='NaT', nonexistent='NaT').dt.tz_convert('UTC').dt.tz_localize(None)
+        times[~has_offset] = wall
+    return times
+
+
+def _parse_text(values):
+    """UTC datetimes of text values (naive text as UTC): ISO 8601, then the slower mixed-format parser for the rest."""
+    times = pd.to_datetime(values, errors='coerce', utc=True, format='ISO8601')
+    retry = times.isna() & values.notna()
+    if retry.any():
+        # e.g. '01/02/2024 10:00' from a chart with a non-ISO date format (month first)
+        times[retry] = pd.to_datetime(values[retry], errors='coerce', utc=True, format='mixed')
+    return times
+
+
+def normalize_chunk(chunk, tz=None):
+    """(records, invalid rows) for one CSV chunk: UTC times, float prices, volume 1 when missing."""
+    columns = {c.strip().lower(): c for c in chunk.columns}
+    time_col = next((columns[c] for c in TIME_COLUMNS if c in columns), None)
+    if time_col is None or any(c not in columns for c in PRICE_COLUMNS):
+        raise ValueError(f"Expected a time column and {', '.join(PRICE_COLUMNS)}; got {list(chunk.columns)}")
+    frame = pd.DataFrame({'datetime': to_utc(chunk[time_col], tz)})
+    for c in PRICE_COLUMNS:
+        frame[c] = pd.to_numeric(chunk[columns[c]], errors='coerce')
+    frame['volume'] = pd.to_numeric(chunk[columns['volume']], errors='coerce').fillna(1.0) if 'volume' in columns else 1.0
+    valid = frame['datetime'].notna() & frame[list(PRICE_COLUMNS)].notna().all(axis=1)
+    return bar_archive.to_records(frame[valid]), int((~valid).sum())
+
+
+def parse_file(path, interval, out_path, chunk_rows=500_000, tz=None):
+    """Worker: parse one export into a temporary archive at `out_path`; returns its stats."""
+    start = time.perf_counter()
+    step = interval_seconds(interval) * 10**9
+    archive = bar_archive.BarArchive(out_path)
+    stats = {'rows': 0, 'invalid': 0, 'duplicates': 0, 'gaps': 0, 'largest_gap': 0, 'first': None, 'last': None}
+    last = None
+    for chunk in pd.read_csv(path, chunksize=chunk_rows):
+        stats['rows'] += len(chunk)
+        recs, invalid = normalize_chunk(chunk, tz)
+        stats['invalid'] += invalid
+        stats['duplicates'] += len(chunk) - invalid - len(recs)
+        if len(recs) == 0:
+            continue
+        times = recs['datetime']
+        diffs = np.diff(times) if last is None or times[0] <= last else np.diff(times, prepend=last)
+        gaps = diffs[diffs > step]
+        stats['gaps'] += len(gaps)
+        if len(gaps):
+            stats['largest_gap'] = max(stats['largest_gap'], int(gaps.max()))
+        # an export out of order across chunks takes the merge path; repeated times count as duplicates
+        merged = archive.merge_from(recs)
+        stats['duplicates'] += merged['updated']
+        last = times[-1] if last is None else max(last, times[-1])
+    if len(archive):
+        recs = archive.records()
+        stats['first'], stats['last'] = int(recs['datetime'][0]), int(recs['datetime'][-1])
+    stats['bars'] = len(archive)
+    stats['bytes'] = os.path.getsize(path)
+    stats['parse_seconds'] = time.perf_counter() - start
+    return stats
+
+
+def _format(path, sym, interval, stats):
+    span = ''
+    if stats['first'] is not None:
+        span = f" {pd.Timestamp(stats['first'])} .. {pd.Timestamp(stats['last'])} UTC"
+    merged = stats.get('merged')
+    merged = (f", new={merged['appended'] + merged['inserted']}, already archived={merged['updated']}"
+              if merged else '')
+    largest = pd.Timedelta(stats['largest_gap']) if stats['gaps'] else '-'
+    return (f"{os.path.basename(path)} [{sym} {interval}]: rows={stats['rows']}, bars={stats['bars']}, "
+            f"invalid={stats['invalid']}, duplicates={stats['duplicates']}{merged}, gaps={stats['gaps']} "
+            f"(largest {largest}){span}, {stats['parse_seconds']:.1f}s")
+
+
+def main(folder, dry_run=False, workers=None, chunk_rows=500_000, tz=None, max_rows=2000):
+    files = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith('.csv'))
     if not files:
         print('No CSV files found in', folder)
-        return
+        return []
+    jobs = []
     for path in files:
         sym, interval = infer_from_filename(path)
         if sym is None:
             print('Skipping (could not infer symbol/interval):', path)
             continue
-        print(f'Bootstrapping {sym} {interval} from {path}...')
-        if not dry_run:
-            bootstrap_from_csv(sym, interval, path)
+        try:
+            interval_seconds(interval)
+        except ValueError:
+            print(f'Skipping (unsupported interval {interval!r}):', path)
+            continue
+        jobs.append((path, sym, interval))
+    # temporary archives next to the real ones, so the final merge stays on one disk
+    tmp_root = data_cache.ARCHIVE_DIR or os.path.join(data_cache.CACHE_DIR, 'archive')
+    os.makedirs(tmp_root, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='import-', dir=tmp_root)
+    summaries = []
+    started = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            futures = {pool.submit(parse_file, path, interval, os.path.join(tmp_dir, f'{n}.bars'), chunk_rows, tz):
+                       (n, path, sym, interval) for n, (path, sym, interval) in enumerate(jobs)}
+            for future in as_completed(futures):
+                n, path, sym, interval = futures[future]
+                try:
+                    stats = future.result()
+                except Exception as e:
+                    print(f'Failed to import {path}: {e}')
+                    continue
+                parsed = bar_archive.BarArchive(os.path.join(tmp_dir, f'{n}.bars'))
+                if not dry_run and len(parsed):
+                    # one series at a time in this process; workers keep parsing meanwhile
+                    stats['merged'] = data_cache.import_records(sym, interval, parsed.records(), max_rows=max_rows)
+                os.remove(parsed.path)
+                print(_format(path, sym, interval, stats))
+                summaries.append(dict(stats, file=path, symbol=sym, interval=interval))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    elapsed = time.perf_counter() - started
+    total_mb = sum(s['bytes'] for s in summaries) / 1e6
+    print(f"{len(summaries)} file(s), {sum(s['bars'] for s in summaries)} bars, {total_mb:.1f} MB "
+          f"in {elapsed:.1f}s ({total_mb / elapsed if elapsed else 0:.1f} MB/s)" + (' (dry run)' if dry_run else ''))
+    return summaries
 
 
 if __name__ == '__main__':
-    p = argparse.ArgumentParser()
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
     p.add_argument('--dir', required=True, help='Folder containing TradingView CSV exports')
-    p.add_argument('--dry-run', action='store_true')
+    p.add_argument('--dry-run', action='store_true', help='parse and summarize without touching the cache')
+    p.add_argument('--workers', type=int, default=None, help='parser processes (default: CPU count)')
+    p.add_argument('--chunk-rows', type=int, default=500_000, help='CSV rows read at a time per file')
+    p.add_argument('--tz', default=None, help='timezone of timestamps without an offset (default UTC)')
+    p.add_argument('--max-rows', type=int, default=2000, help='bars kept in the live cache per series')
     args = p.parse_args()
-    main(args.dir, dry_run=args.dry_run)
+    main(args.dir, dry_run=args.dry_run, workers=args.workers, chunk_rows=args.chunk_rows, tz=args.tz,
+         max_rows=args.max_rows)
@@ -0,0 +1,22 @@
+"""Migrate legacy SYMBOL__interval.csv cache files to the columnar backend.
+
+Usage:
+  python tools/migrate_cache.py
+
+Every CSV in the data cache directory without columnar data is imported. The CSV
+files are kept so DATA_CACHE_BACKEND=csv keeps working. Series are also migrated
+lazily the first time they are loaded, so running this is optional.
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_cache import CACHE_DIR, migrate_all_csv
+
+
+def main():
+    count = migrate_all_csv()
+    print(f"Migrated {count} series in {CACHE_DIR}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+"""Walk-forward parameter sweep of the engine's multi-timeframe entry rule.
+
+Usage:
+  python tools/optimize.py --symbol XAU/USD --ema-lengths 50 70 90 --band-mults 1.0 1.2 1.5 \
+      --agree 2 3 --lookbacks 1 3 5 --folds 4 --spread 0.3
+
+Every combination of ema_length, rsi_length, band_mult, agreement threshold and
+lookback is backtested (see backtest.py) on each walk-forward fold: the history
+is cut into `folds` consecutive out-of-sample test windows, each preceded by its
+training window. The ranked table orders combinations by their summed test
+metric; the walk-forward summary picks the best training combination per fold
+and reports how it did on the following test window.
+
+OHLC arrays are written once to memory-mapped .npy files that every worker
+process opens read-only, so tasks only carry parameters. Completed grid cells
+are appended to a JSONL checkpoint; rerunning the same command resumes from it.
+rsi_length does not change entries, so its cells reuse the (ema_length,
+band_mult) result instead of recomputing it.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import backtest
+from python_signal_engine import EMA_LENGTH, SYMBOL
+from signal_grid import detect_signals_grid, _atr, _true_range
+
+METRICS = ('total_pnl', 'profit_factor', 'hit_rate', 'avg_pnl')
+
+# Worker state, filled by _init_worker from the memory-mapped arrays
+_data = {}
+
+
+def walk_forward_folds(n, folds, train_bars=None, test_bars=None):
+    """Return [(train_start, train_end, test_end)] with contiguous test windows ending at bar n."""
+    test_bars = test_bars or n // (folds + 3)
+    train_bars = train_bars or 3 * test_bars
+    first = n - folds * test_bars - train_bars
+    if test_bars <= 0 or first < 0:
+        raise ValueError(f"{n} bars are not enough for {folds} folds of {train_bars} train + {test_bars} test bars")
+    return [(first + i * test_bars, first + i * test_bars + train_bars, first + (i + 1) * test_bars + train_bars)
+            for i in range(folds)]
+
+
+def _write_arrays(frames, folder):
+    """Save each timeframe's OHLC plus the base-timeline index as .npy files; return the interval order."""
+    intervals = list(frames)
+    base = frames[intervals[0]]
+    np.save(os.path.join(folder, 'times.npy'), base['datetime'].to_numpy(dtype='datetime64[ns]'))
+    for k, interval in enumerate(intervals):
+        ohlc = frames[interval][['open', 'high', 'low', 'close']].to_numpy(dtype=float)
+        np.save(os.path.join(folder, f"ohlc_{k}.npy"), np.ascontiguousarray(ohlc))
+    for k, idx in enumerate(backtest.base_index(frames).values()):
+        np.save(os.path.join(folder, f"index_{k}.npy"), idx)
+    return intervals
+
+
+def _init_worker(folder, intervals, folds, stops, costs):
+    _data['times'] = np.load(os.path.join(folder, 'times.npy'), mmap_mode='r')
+    _data['ohlc'] = [np.load(os.path.join(folder, f"ohlc_{k}.npy"), mmap_mode='r') for k in range(len(intervals))]
+    _data['index'] = {interval: np.load(os.path.join(folder, f"index_{k}.npy"), mmap_mode='r')
+                      for k, interval in enumerate(intervals)}
+    _data['intervals'] = intervals
+    _data['folds'] = folds
+    _data['stops'] = stops
+    _data['costs'] = costs
+    base = _data['ohlc'][0]
+    _data['atr'] = _atr(_true_range(base[:, 1], base[:, 2], base[:, 3]), stops.atr_length)
+
+
+def _evaluate(ema_length, band_mult, agrees, lookbacks):
+    """Backtest every (agree, lookback) for one (ema_length, band_mult) on all folds.
+
+    Returns [((agree, lookback), [{'train': summary, 'test': summary}, ...])].
+    """
+    params = [(ema_length, 14, band_mult)]
+    signals = {}
+    for interval, ohlc in zip(_data['intervals'], _data['ohlc']):
+        grid = detect_signals_grid(ohlc, params)
+        signals[interval] = (grid.long_entry, grid.short_entry)
+    base = _data['ohlc'][0]
+    times, atr = _data['times'], _data['atr']
+    out = []
+    for lookback in lookbacks:
+        long_agree, short_agree = backtest.agreement(signals, _data['index'], lookback)
+        for agree in agrees:
+            sides = backtest.entry_sides(long_agree[0], short_agree[0], agree)
+            folds = []
+            for train_start, train_end, test_end in _data['folds']:
+                fold = {}
+                for name, (a, b) in (('train', (train_start, train_end)), ('test', (train_end, test_end))):
+                    trades = backtest.simulate_arrays(times[a:b], base[a:b, 0], base[a:b, 1], base[a:b, 2],
+                                                      base[a:b, 3], atr[a:b], sides[a:b],
+                                                      _data['stops'], _data['costs'])
+                    fold[name] = backtest.summarize(trades)
+                folds.append(fold)
+            out.append(((agree, lookback), folds))
+    return out
+
+
+def _cell_key(ema_length, rsi_length, band_mult, agree, lookback):
+    return f"{ema_length}|{rsi_length}|{band_mult:g}|{agree}|{lookback}"
+
+
+def load_checkpoint(path, config):
+    """Return {cell key: folds} from a checkpoint written with the same `config`."""
+    done = {}
+    if not path or not os.path.exists(path):
+        return done
+    with open(path) as f:
+        header = json.loads(f.readline() or 'null')
+        if header != config:
+            raise SystemExit(f"{path} was written for a different data/fold/cost setup; use --fresh or another --checkpoint")
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break  # a torn last line from an interrupted run
+            done[record['key']] = record['folds']
+    return done
+
+
+def _aggregate(folds, part, metric):
+    summaries = [f[part] for f in folds]
+    trades = sum(s['trades'] for s in summaries)
+    values = [s[metric] for s in summaries]
+    return {
+        'trades': trades,
+        'total_pnl': sum(s['total_pnl'] for s in summaries),
+        'hit_rate': sum(s['hit_rate'] * s['trades'] for s in summaries) / trades if trades else 0.0,
+        'max_drawdown': max(s['max_drawdown'] for s in summaries),
+        'score': sum(values) if metric == 'total_pnl' else float(np.mean(values)),
+    }
+
+
+def rank(results, metric='total_pnl'):
+    """Rows of (key, train aggregate, test aggregate) ordered by the test score."""
+    rows = [(key, _aggregate(folds, 'train', metric), _aggregate(folds, 'test', metric))
+            for key, folds in results.items()]
+    rows.sort(key=lambda r: r[2]['score'], reverse=True)
+    return rows
+
+
+def walk_forward(results, metric='total_pnl'):
+    """Per fold: the best cell on the training window and its test-window summary."""
+    n_folds = len(next(iter(results.values())))
+    picks = []
+    for i in range(n_folds):
+        key = max(results, key=lambda k: results[k][i]['train'][metric])
+        picks.append((i, key, results[key][i]['train'], results[key][i]['test']))
+    return picks
+
+
+def main(args):
+    frames = backtest.load_frames(args.symbol, htf_source=args.htf_source, start=args.start, end=args.end)
+    n = len(frames[next(iter(frames))])
+    folds = walk_forward_folds(n, args.folds, args.train_bars, args.test_bars)
+    stops = backtest.Stops(args.stop_atr, args.target_atr, args.atr_length, args.max_hold)
+    costs = backtest.Costs(args.spread, args.slippage)
+    config = {'symbol': args.symbol, 'bars': n, 'last': str(frames[next(iter(frames))]['datetime'].iloc[-1]),
+              'htf_source': args.htf_source, 'folds': folds, 'stops': list(stops), 'costs': list(costs)}
+    config = json.loads(json.dumps(config))  # same types as the header read back from a checkpoint
+    if args.fresh and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    results = load_checkpoint(args.checkpoint, config)
+    if not os.path.exists(args.checkpoint):
+        with open(args.checkpoint, 'w') as f:
+            f.write(json.dumps(config) + '\n')
+
+    tasks = []
+    for e, b in itertools.product(args.ema_lengths, args.band_mults):
+        cells = [_cell_key(e, r, b, a, lb) for r, a, lb in itertools.product(args.rsi_lengths, args.agree, args.lookbacks)]
+        if not all(c in results for c in cells):
+            tasks.append((e, b))
+    total = len(args.ema_lengths) * len(args.band_mults) * len(args.rsi_lengths) * len(args.agree) * len(args.lookbacks)
+    print(f"{n} base bars, {len(folds)} folds, {total} combinations ({len(results)} from checkpoint), "
+          f"{len(tasks)} tasks on {args.workers} processes")
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as folder:
+        intervals = _write_arrays(frames, folder)
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                 initargs=(folder, intervals, folds, stops, costs)) as pool, \
+                open(args.checkpoint, 'a') as checkpoint:
+            futures = {pool.submit(_evaluate, e, b, args.agree, args.lookbacks): (e, b) for e, b in tasks}
+            for done, future in enumerate(as_completed(futures), 1):
+                e, b = futures[future]
+                for (a, lb), cell_folds in future.result():
+                    for r in args.rsi_lengths:
+                        key = _cell_key(e, r, b, a, lb)
+                        results[key] = cell_folds
+                        checkpoint.write(json.dumps({'key': key, 'folds': cell_folds}) + '\n')
+                checkpoint.flush()
+                print(f"[{done}/{len(tasks)}] ema_length={e} band_mult={b:g} ({time.perf_counter() - start:.1f}s)")
+
+    wanted = {_cell_key(e, r, b, a, lb) for e, r, b, a, lb in itertools.product(
+        args.ema_lengths, args.rsi_lengths, args.band_mults, args.agree, args.lookbacks)}
+    results = {k: v for k, v in results.items() if k in wanted}
+    print(f"\nTop {args.top} by summed test {args.metric} "
+          f"(ema_length|rsi_length|band_mult|agree|lookback):")
+    print(f"{'rank':>4} | {'params':<20} | {'train pnl':>10} | {'test pnl':>10} | {'test trades':>11} | "
+          f"{'test hit':>8} | {'test max dd':>11}")
+    for i, (key, train, test) in enumerate(rank(results, args.metric)[:args.top], 1):
+        print(f"{i:>4} | {key:<20} | {train['total_pnl']:>10.2f} | {test['total_pnl']:>10.2f} | "
+              f"{test['trades']:>11} | {test['hit_rate']:>8.2%} | {test['max_drawdown']:>11.2f}")
+    print("\nWalk-forward (best training cell per fold, evaluated on the next window):")
+    oos = 0.0
+    for i, key, train, test in walk_forward(results, args.metric):
+        oos += test['total_pnl']
+        print(f"fold {i}: {key:<20} train pnl {train['total_pnl']:>10.2f} -> test pnl {test['total_pnl']:>10.2f} "
+              f"({test['trades']} trades, hit {test['hit_rate']:.2%})")
+    print(f"out-of-sample pnl: {oos:.2f}")
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--symbol', default=SYMBOL)
+    p.add_argument('--htf-source', choices=('resample', 'cache'), default='resample')
+    p.add_argument('--start', help='first bar (timestamp) of the history to use')
+    p.add_argument('--end', help='end of the history to use (exclusive)')
+    p.add_argument('--ema-lengths', type=int, nargs='+', default=[EMA_LENGTH])
+    p.add_argument('--rsi-lengths', type=int, nargs='+', default=[14])
+    p.add_argument('--band-mults', type=float, nargs='+', default=[1.2])
+    p.add_argument('--agree', type=int, nargs='+', default=[2], help='agreement thresholds')
+    p.add_argument('--lookbacks', type=int, nargs='+', default=[3], help='bars per timeframe checked for an entry')
+    p.add_argument('--folds', type=int, default=4)
+    p.add_argument('--train-bars', type=int, help='default: 3x the test window')
+    p.add_argument('--test-bars', type=int, help='default: bars / (folds + 3)')
+    p.add_argument('--stop-atr', type=float, default=backtest.DEFAULT_STOPS.stop_atr)
+    p.add_argument('--target-atr', type=float, default=backtest.DEFAULT_STOPS.target_atr)
+    p.add_argument('--atr-length', type=int, default=backtest.DEFAULT_STOPS.atr_length)
+    p.add_argument('--max-hold', type=int, default=None)
+    p.add_argument('--spread', type=float, default=0.0)
+    p.add_argument('--slippage', type=float, default=0.0)
+    p.add_argument('--metric', choices=METRICS, default='total_pnl')
+    p.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    p.add_argument('--checkpoint', default='optimize_checkpoint.jsonl')
+    p.add_argument('--fresh', action='store_true', help='ignore and overwrite an existing checkpoint')
+    p.add_argument('--top', type=int, default=20)
+    return p.parse_args(argv)
+
+
+if __name__ == '__main__':
+    main(parse_args())
@@ -0,0 +1,136 @@
+"""Lightweight trace spans with a per-cycle timing breakdown.
+
+    with tracing.cycle('engine'):
+        with tracing.span('fetch_ohlc'):
+            ...
+
+Spans nest per thread ('detect_signals/trend_loop'); spans opened on other
+threads while a cycle is active (e.g. the fetch pool) are attributed to it as
+top-level spans. When the cycle ends, count/total/max per span path are written
+as one JSON line to TRACE_FILE, rotated at TRACE_MAX_BYTES with TRACE_BACKUPS
+old files. Outside a cycle, `span()` only checks one global and returns.
+Spans in other processes (eval workers) are not collected.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+TRACE_FILE = os.getenv('TRACE_FILE', os.path.join(os.path.dirname(__file__), 'traces.jsonl'))
+TRACE_MAX_BYTES = int(os.getenv('TRACE_MAX_BYTES', str(5 * 1024 * 1024)))
+TRACE_BACKUPS = int(os.getenv('TRACE_BACKUPS', '3'))
+
+_local = threading.local()
+_cycle = None
+_writer = None
+_writer_lock = threading.Lock()
+
+
+class Cycle:
+    """Span timings collected during one cycle."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        self.duration = None
+        self.spans = {}
+        self._lock = threading.Lock()
+
+    def record(self, path, seconds):
+        with self._lock:
+            s = self.spans.get(path)
+            if s is None:
+                self.spans[path] = [1, seconds, seconds]
+            else:
+                s[0] += 1
+                s[1] += seconds
+                s[2] = max(s[2], seconds)
+
+    def breakdown(self):
+        """{path: {'count', 'total_ms', 'max_ms'}} ordered by total time."""
+        with self._lock:
+            items = sorted(self.spans.items(), key=lambda kv: kv[1][1], reverse=True)
+        return {path: {'count': c, 'total_ms': round(total * 1000, 3), 'max_ms': round(mx * 1000, 3)}
+                for path, (c, total, mx) in items}
+
+    def to_record(self):
+        return {
+            'cycle': self.name,
+            'started_at': self.started_at.isoformat(),
+            'duration_ms': round((self.duration or 0.0) * 1000, 3),
+            'spans': self.breakdown(),
+        }
+
+    def summary(self, top=5):
+        parts = [f"{path}={s['total_ms']:.1f}ms" for path, s in list(self.breakdown().items())[:top]]
+        return f"{self.name} cycle {1000 * (self.duration or 0.0):.1f}ms: " + ', '.join(parts)
+
+
+@contextmanager
+def span(name):
+    """Time the with-block as `name` (nested under the thread's open spans) in the active cycle."""
+    cyc = _cycle
+    if cyc is None:
+        yield
+        return
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    path = f"{stack[-1]}/{name}" if stack else name
+    stack.append(path)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        cyc.record(path, time.perf_counter() - start)
+        stack.pop()
+
+
+def _get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None or _writer.baseFilename != os.path.abspath(TRACE_FILE):
+            if _writer is not None:
+                _writer.close()
+            _writer = logging.handlers.RotatingFileHandler(TRACE_FILE, maxBytes=TRACE_MAX_BYTES,
+                                                           backupCount=TRACE_BACKUPS, encoding='utf-8')
+            _writer.setFormatter(logging.Formatter('%(message)s'))
+        return _writer
+
+
+def write(cyc):
+    """Append the cycle breakdown to TRACE_FILE (one JSON object per line)."""
+    if not TRACE_FILE:
+        return
+    record = logging.LogRecord('tracing', logging.INFO, __file__, 0, json.dumps(cyc.to_record()), None, None)
+    try:
+        _get_writer().handle(record)
+    except OSError as e:
+        logging.warning(f"Could not write trace: {e}")
+
+
+@contextmanager
+def cycle(name, persist=True, log=False):
+    """Collect spans until the block ends and yield the Cycle.
+
+    `persist` writes the breakdown to TRACE_FILE, `log` logs its top spans.
+    A nested cycle collects on its own until it ends.
+    """
+    global _cycle
+    cyc = Cycle(name)
+    previous, _cycle = _cycle, cyc
+    _local.stack = []
+    try:
+        yield cyc
+    finally:
+        cyc.duration = time.perf_counter() - cyc.start
+        _cycle = previous
+        if persist:
+            write(cyc)
+        if log:
+            logging.info(cyc.summary())
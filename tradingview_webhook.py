@@ -13,19 +13,29 @@
 # =====================
 
 
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, request, jsonify, render_template_string
 import requests
 import sys
 import os
+import time
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 import myconfig
-from xauusd_bot import send_telegram_message
+import metrics
+from xauusd_bot import send_telegram_message, CHAT_ID
+from telegram_relay import TelegramRelay
 
 # Optional webhook secret (set WEBHOOK_SECRET env var or in myconfig)
 WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', getattr(myconfig, 'WEBHOOK_SECRET', None))
 
 app = Flask(__name__)
 
+# Alerts are delivered to Telegram by background threads; /webhook only enqueues
+relay = TelegramRelay(send_telegram_message)
+
+WEBHOOK_LATENCY = metrics.histogram('webhook_request_seconds', 'Inbound /webhook handling time', ['status'])
+metrics.gauge('telegram_relay_queue_depth', 'Messages waiting in the Telegram relay queue').set_function(
+    lambda: relay.stats()['queue_depth'])
+
 # Simple status page for root URL
 @app.route("/")
 def index():
@@ -142,7 +152,13 @@ def index():
 
 @app.route('/webhook', methods=['POST'])
 def webhook():
-    data = request.get_json()
+    start = time.perf_counter()
+    resp, status = _handle_webhook()
+    WEBHOOK_LATENCY.labels(status).observe(time.perf_counter() - start)
+    return resp, status
+
+def _handle_webhook():
+    data = request.get_json(silent=True)
     if not data:
         return jsonify({'error': 'No JSON received'}), 400
 
@@ -156,9 +172,12 @@ def webhook():
 
     # Parse fields from TradingView alert JSON
     signal_type = data.get('signal_type')  # e.g., "buy", "sell", "longSignal", "shortSignal"
-    price = float(data.get('price', 0))
+    try:
+        price = float(data.get('price', 0))
+        rsi = float(data.get('rsi', 0))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'price and rsi must be numeric'}), 400
     ema_trend = str(data.get('ema_trend', '')).lower()  # e.g., "up", "down", or numeric
-    rsi = float(data.get('rsi', 0))
     price_near_ema = str(data.get('price_near_ema', 'true')).lower() == 'true'  # default True
     macd_signal = str(data.get('macd_signal', '')).lower()  # optional
     volume_confirmed = str(data.get('volume_confirmed', 'true')).lower() == 'true'  # default True
@@ -175,14 +194,20 @@ def webhook():
         f"MACD: {macd_signal if macd_signal else 'N/A'}\n"
         f"Volume Confirmed: {volume_confirmed}"
     )
-    print(f"Relaying TradingView alert to Telegram: {msg}")
-    try:
-        send_telegram_message(msg)
-    except Exception as e:
-        print(f"Failed to send Telegram message from webhook: {e}")
-        return jsonify({'error': 'failed to send'}), 500
+    print(f"Queueing TradingView alert for Telegram: {msg}")
+    if not relay.submit(msg, chat_id=CHAT_ID):
+        return jsonify({'error': 'relay queue full'}), 503
+
+    return jsonify({'status': 'queued'}), 202
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
-    return jsonify({'status': 'received'}), 200
+@app.route('/relay/stats')
+def relay_stats():
+    """Queue depth, delivery counters and time messages spent in the relay queue."""
+    return jsonify(relay.stats())
 
 if __name__ == '__main__':
     app.run(port=5000)
@@ -0,0 +1,228 @@
+"""Minimal RFC 6455 WebSocket connections over the standard library.
+
+Enough for JSON text streams such as the Twelve Data price feed and its local
+stand-in (ws_standin.py): client and server handshakes, text/binary messages
+(fragmented or not), ping/pong and close. No extensions or compression.
+
+    conn = websocket_lite.connect('wss://ws.twelvedata.com/v1/quotes/price?apikey=...')
+    conn.send_text(json.dumps({'action': 'subscribe', 'params': {'symbols': 'XAU/USD'}}))
+    message = conn.recv(timeout=1.0)   # None on timeout
+"""
+import base64
+import hashlib
+import os
+import socket
+import ssl
+import struct
+import threading
+from urllib.parse import urlsplit
+
+_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+OP_CONT, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+MAX_MESSAGE = 16 * 1024 * 1024
+
+
+class WebSocketClosed(ConnectionError):
+    """The peer closed the connection (or it broke mid-frame)."""
+
+
+def _accept_key(key):
+    return base64.b64encode(hashlib.sha1((key + _GUID).encode('ascii')).digest()).decode('ascii')
+
+
+def _read_http_head(sock):
+    data = b''
+    while b'\r\n\r\n' not in data:
+        chunk = sock.recv(4096)
+        if not chunk:
+            raise WebSocketClosed('Connection closed during handshake')
+        data += chunk
+        if len(data) > 65536:
+            raise ConnectionError('Handshake headers too large')
+    head, rest = data.split(b'\r\n\r\n', 1)
+    lines = head.decode('latin-1').split('\r\n')
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return lines[0], headers, rest
+
+
+class Connection:
+    """One WebSocket; `recv` is for a single reader thread, `send_*` may be called from any thread."""
+
+    def __init__(self, sock, client, buffered=b''):
+        self.sock = sock
+        self.client = client
+        self._buf = bytearray(buffered)
+        self._send_lock = threading.Lock()
+        self._fragments = []
+        self._fragment_op = None
+        self.closed = False
+
+    def _fill(self):
+        chunk = self.sock.recv(65536)
+        if not chunk:
+            self.closed = True
+            raise WebSocketClosed('Connection closed by peer')
+        self._buf += chunk
+
+    def _send_frame(self, opcode, payload):
+        header = bytearray([0x80 | opcode])
+        mask_bit = 0x80 if self.client else 0
+        n = len(payload)
+        if n < 126:
+            header.append(mask_bit | n)
+        elif n < 1 << 16:
+            header.append(mask_bit | 126)
+            header += struct.pack('>H', n)
+        else:
+            header.append(mask_bit | 127)
+            header += struct.pack('>Q', n)
+        if self.client:
+            # clients must mask every frame
+            mask = os.urandom(4)
+            header += mask
+            payload = _mask(payload, mask)
+        with self._send_lock:
+            self.sock.sendall(bytes(header) + payload)
+
+    def send_text(self, text):
+        self._send_frame(OP_TEXT, text.encode('utf-8'))
+
+    def send_binary(self, data):
+        self._send_frame(OP_BINARY, bytes(data))
+
+    def ping(self, data=b''):
+        self._send_frame(OP_PING, data)
+
+    def _parse_frame(self):
+        """(fin, opcode, payload) of the first complete frame in the buffer, or None.
+
+        Nothing is consumed until the whole frame is buffered, so a receive
+        timeout in the middle of a frame loses no data.
+        """
+        buf = self._buf
+        if len(buf) < 2:
+            return None
+        b0, b1 = buf[0], buf[1]
+        n, pos = b1 & 0x7F, 2
+        if n == 126:
+            if len(buf) < 4:
+                return None
+            n, pos = struct.unpack_from('>H', buf, 2)[0], 4
+        elif n == 127:
+            if len(buf) < 10:
+                return None
+            n, pos = struct.unpack_from('>Q', buf, 2)[0], 10
+        if n > MAX_MESSAGE:
+            raise ConnectionError(f'WebSocket frame of {n} bytes exceeds {MAX_MESSAGE}')
+        mask = None
+        if b1 & 0x80:
+            if len(buf) < pos + 4:
+                return None
+            mask, pos = bytes(buf[pos:pos + 4]), pos + 4
+        if len(buf) < pos + n:
+            return None
+        payload = bytes(buf[pos:pos + n])
+        del buf[:pos + n]
+        if mask is not None:
+            payload = _mask(payload, mask)
+        return bool(b0 & 0x80), b0 & 0x0F, payload
+
+    def recv(self, timeout=None):
+        """Next text (str) or binary (bytes) message; None if `timeout` seconds pass without one."""
+        self.sock.settimeout(timeout)
+        while True:
+            frame = self._parse_frame()
+            if frame is None:
+                try:
+                    self._fill()
+                except socket.timeout:
+                    return None
+                continue
+            fin, opcode, payload = frame
+            if opcode == OP_PING:
+                self._send_frame(OP_PONG, payload)
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode == OP_CLOSE:
+                self.closed = True
+                try:
+                    self._send_frame(OP_CLOSE, payload[:2])
+                except OSError:
+                    pass
+                raise WebSocketClosed(f'Closed by peer: {payload[2:].decode("utf-8", "replace")}')
+            if opcode == OP_CONT:
+                self._fragments.append(payload)
+                if not fin:
+                    continue
+                opcode, payload = self._fragment_op, b''.join(self._fragments)
+                self._fragments, self._fragment_op = [], None
+            elif not fin:
+                self._fragment_op, self._fragments = opcode, [payload]
+                continue
+            return payload.decode('utf-8') if opcode == OP_TEXT else payload
+
+    def close(self, code=1000, reason=''):
+        if not self.closed:
+            self.closed = True
+            try:
+                self._send_frame(OP_CLOSE, struct.pack('>H', code) + reason.encode('utf-8'))
+            except OSError:
+                pass
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def _mask(payload, mask):
+    # XOR in one big-integer operation; much faster than a per-byte loop for large frames
+    n = len(payload)
+    if n == 0:
+        return b''
+    key = (mask * (n // 4 + 1))[:n]
+    return (int.from_bytes(payload, 'big') ^ int.from_bytes(key, 'big')).to_bytes(n, 'big')
+
+
+def connect(url, timeout=10.0, headers=None):
+    """Open a client connection to a ws:// or wss:// URL."""
+    parts = urlsplit(url)
+    if parts.scheme not in ('ws', 'wss'):
+        raise ValueError(f'Not a WebSocket URL: {url!r}')
+    port = parts.port or (443 if parts.scheme == 'wss' else 80)
+    sock = socket.create_connection((parts.hostname, port), timeout=timeout)
+    try:
+        if parts.scheme == 'wss':
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=parts.hostname)
+        key = base64.b64encode(os.urandom(16)).decode('ascii')
+        path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        request = [f'GET {path} HTTP/1.1', f'Host: {parts.netloc}', 'Upgrade: websocket', 'Connection: Upgrade',
+                   f'Sec-WebSocket-Key: {key}', 'Sec-WebSocket-Version: 13']
+        request += [f'{k}: {v}' for k, v in (headers or {}).items()]
+        sock.sendall(('\r\n'.join(request) + '\r\n\r\n').encode('latin-1'))
+        status, resp_headers, rest = _read_http_head(sock)
+        if ' 101 ' not in status + ' ':
+            raise ConnectionError(f'WebSocket handshake failed: {status}')
+        if resp_headers.get('sec-websocket-accept') != _accept_key(key):
+            raise ConnectionError('WebSocket handshake failed: bad Sec-WebSocket-Accept')
+    except BaseException:
+        sock.close()
+        raise
+    return Connection(sock, client=True, buffered=rest)
+
+
+def accept(sock):
+    """Complete the server side of the handshake on an accepted socket; returns (Connection, request path)."""
+    request_line, headers, rest = _read_http_head(sock)
+    key = headers.get('sec-websocket-key')
+    if not key or headers.get('upgrade', '').lower() != 'websocket':
+        sock.sendall(b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n')
+        sock.close()
+        raise ConnectionError(f'Not a WebSocket upgrade: {request_line}')
+    sock.sendall(('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                  f'Sec-WebSocket-Accept: {_accept_key(key)}\r\n\r\n').encode('latin-1'))
+    path = request_line.split(' ')[1] if request_line.count(' ') >= 2 else '/'
+    return Connection(sock, client=False, buffered=rest), path
@@ -0,0 +1,162 @@
+"""Local stand-in for the Twelve Data WebSocket price stream, replaying recorded ticks.
+
+Usage:
+  python ws_standin.py --ticks ticks.jsonl [--port 8082] [--speed 1] [--no-rebase] [--disconnect-after 0]
+
+Then point the engine's stream at it:
+  STREAM_TICKS=1 TD_WS_URL=ws://127.0.0.1:8082/v1/quotes/price python python_signal_engine.py
+
+`ticks.jsonl` holds price events ({"symbol", "timestamp", "price", ...} per
+line), e.g. recorded with TICK_RECORD_FILE. The replay clock starts with the
+first subscription and is shared by all connections, so ticks that fall due
+while a client is disconnected are missed, as with the live feed. By default
+timestamps are rebased so the first tick is "now" (bars then close on the wall
+clock); `--speed` compresses the gaps between ticks. Subscribe and heartbeat
+actions are answered like Twelve Data does. `--disconnect-after N` drops each
+connection after N ticks to exercise reconnects.
+"""
+import argparse
+import json
+import logging
+import socket
+import threading
+import time
+
+import websocket_lite
+
+
+def load_ticks(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class TickReplayServer:
+    """Serves `ticks` (price event dicts sorted by timestamp) to WebSocket clients on a daemon thread."""
+
+    def __init__(self, ticks, port=0, host='127.0.0.1', speed=1.0, rebase=True, disconnect_after=0, clock=time.time):
+        self.ticks = sorted(ticks, key=lambda t: float(t['timestamp']))
+        self.speed = float(speed)
+        self.rebase = rebase
+        self.disconnect_after = int(disconnect_after)
+        self._clock = clock
+        self._t0 = None
+        self._cursor = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.connections = 0
+        self.sock = socket.create_server((host, port))
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._accept_loop, name='ws-standin', daemon=True).start()
+
+    def _due(self, tick):
+        """Wall time when `tick` is sent and the timestamp it carries."""
+        first = float(self.ticks[0]['timestamp'])
+        offset = (float(tick['timestamp']) - first) / self.speed
+        return self._t0 + offset, (self._t0 + offset if self.rebase else float(tick['timestamp']))
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                sock, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _serve(self, sock):
+        try:
+            conn, _ = websocket_lite.accept(sock)
+        except OSError as e:
+            logging.warning(f"Stand-in handshake failed: {e}")
+            return
+        self.connections += 1
+        subscribed = set()
+        ready = threading.Event()
+        threading.Thread(target=self._stream, args=(conn, subscribed, ready), daemon=True).start()
+        try:
+            while not self._stop.is_set():
+                message = conn.recv(timeout=0.5)
+                if message is None:
+                    continue
+                action = json.loads(message)
+                if action.get('action') == 'subscribe':
+                    symbols = [s.strip() for s in action.get('params', {}).get('symbols', '').split(',') if s.strip()]
+                    known = {str(t['symbol']).upper() for t in self.ticks}
+                    ok = [s for s in symbols if s.upper() in known]
+                    subscribed.update(s.upper() for s in ok)
+                    conn.send_text(json.dumps({'event': 'subscribe-status', 'status': 'ok' if ok else 'error',
+                                               'success': [{'symbol': s} for s in ok],
+                                               'fails': [{'symbol': s} for s in symbols if s not in ok]}))
+                    with self._lock:
+                        if self._t0 is None:
+                            self._t0 = self._clock()
+                    ready.set()
+                elif action.get('action') == 'heartbeat':
+                    conn.send_text(json.dumps({'event': 'heartbeat', 'status': 'ok'}))
+        except (OSError, ValueError):
+            pass
+        finally:
+            ready.set()
+            conn.close()
+
+    def _stream(self, conn, subscribed, ready):
+        ready.wait()
+        with self._lock:
+            # ticks that fell due while nobody was connected are gone
+            now = self._clock()
+            while self._cursor < len(self.ticks) and self._due(self.ticks[self._cursor])[0] < now - 0.5:
+                self._cursor += 1
+        sent = 0
+        while not self._stop.is_set() and not conn.closed:
+            with self._lock:
+                if self._cursor >= len(self.ticks):
+                    return
+                tick = self.ticks[self._cursor]
+                send_at, stamp = self._due(tick)
+                wait = send_at - self._clock()
+                if wait <= 0:
+                    self._cursor += 1
+            if wait > 0:
+                time.sleep(min(wait, 0.5))
+                continue
+            if str(tick['symbol']).upper() not in subscribed:
+                continue
+            try:
+                conn.send_text(json.dumps(dict(tick, event='price', timestamp=stamp)))
+            except OSError:
+                return
+            sent += 1
+            if self.disconnect_after and sent >= self.disconnect_after:
+                conn.close()
+                return
+
+    def done(self):
+        """True once every tick has been sent (or skipped while no client was connected)."""
+        with self._lock:
+            return self._cursor >= len(self.ticks)
+
+    def close(self):
+        self._stop.set()
+        self.sock.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ticks', required=True, help='JSONL file of price events')
+    parser.add_argument('--port', type=int, default=8082)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--speed', type=float, default=1.0, help='replay speed relative to the recording')
+    parser.add_argument('--no-rebase', action='store_true', help='send the recorded timestamps unchanged')
+    parser.add_argument('--disconnect-after', type=int, default=0, help='drop connections after N ticks (0: never)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    server = TickReplayServer(load_ticks(args.ticks), args.port, args.host, speed=args.speed,
+                              rebase=not args.no_rebase, disconnect_after=args.disconnect_after)
+    print(f"Price stream stand-in on ws://{args.host}:{server.port}/v1/quotes/price ({len(server.ticks)} ticks)")
+    try:
+        while not server.done():
+            time.sleep(1)
+        print("All ticks replayed")
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.close()
@@ -1,21 +1,41 @@
 import os
-import requests
 import time
 import itertools
 import logging
 import myconfig
+import http_client
+import metrics
+from price_moves import PRICE_MOVE_WINDOWS, PRICE_SNAPSHOT_FILE, PriceMoveDetector, parse_windows
 
 # ------------------ CONFIG ------------------ #
 # Use environment variables first, then fall back to myconfig
 GOLDAPI_KEY = os.getenv('GOLDAPI_KEY', getattr(myconfig, 'GOLDAPI_KEY', None))
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', getattr(myconfig, 'TELEGRAM_BOT_TOKEN', None))
 CHAT_ID = os.getenv('CHAT_ID', getattr(myconfig, 'CHAT_ID', None))
-FETCH_INTERVAL = int(os.getenv('FETCH_INTERVAL', getattr(myconfig, 'FETCH_INTERVAL', 60)))
+FETCH_INTERVAL = float(os.getenv('FETCH_INTERVAL', getattr(myconfig, 'FETCH_INTERVAL', 60)))
+# Alert when the price moves this many percent within a window, e.g. '5min:0.5,1h:1' (see price_moves.py)
+PRICE_MOVE_WINDOWS = os.getenv('PRICE_MOVE_WINDOWS', getattr(myconfig, 'PRICE_MOVE_WINDOWS', PRICE_MOVE_WINDOWS))
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
 # -------------------------------------------- #
 
+TELEGRAM_SENDS = metrics.counter('telegram_messages_total', 'Telegram sendMessage calls by outcome', ['outcome'])
+TELEGRAM_LATENCY = metrics.histogram('telegram_send_seconds', 'Telegram sendMessage latency including retries')
+PRICE_MOVES = metrics.counter('price_move_alerts_total', 'Sliding-window price move alerts', ['window', 'direction'])
 
+_detector = None
+
+
+
+def _goldapi_ok(response):
+    try:
+        data = response.json()
+    except ValueError:
+        return False
+    if response.status_code == 200 and "price" in data:
+        return True
+    logging.warning(f"GoldAPI error: {data.get('error', 'No data returned.')}")
+    return False
 
 def get_xauusd_price():
     """Fetch XAU/USD spot price from GoldAPI."""
@@ -24,63 +44,49 @@ def get_xauusd_price():
         "x-access-token": GOLDAPI_KEY,
         "Content-Type": "application/json"
     }
-    max_attempts = 3
-    for attempt in range(1, max_attempts + 1):
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
-            data = response.json()
-            if response.status_code == 200 and "price" in data:
-                return float(data["price"])
-            else:
-                logging.warning(f"GoldAPI error (attempt {attempt}): {data.get('error', 'No data returned.')}")
-        except requests.exceptions.RequestException as e:
-            logging.warning(f"GoldAPI request error (attempt {attempt}): {e}")
-        time.sleep(1 * attempt)
-    return None
+    response = http_client.get(url, headers=headers, policy=http_client.PRICE_RETRY, accept=_goldapi_ok)
+    if response is None:
+        return None
+    return float(response.json()["price"])
 
 def send_telegram_message(message):
     """Send a message to Telegram bot."""
     url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     payload = {"chat_id": CHAT_ID, "text": message}
-    try:
-        response = requests.post(url, data=payload)
-        if response.status_code == 200:
-            logging.info(f"Telegram alert sent: {message}")
-        else:
-            logging.warning(f"Telegram error: {response.text}")
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Failed to send Telegram message: {e}")
+    with metrics.timer(TELEGRAM_LATENCY):
+        response = http_client.post(url, data=payload, accept=lambda r: r.status_code == 200)
+    if response is not None:
+        TELEGRAM_SENDS.labels('sent').inc()
+        logging.info(f"Telegram alert sent: {message}")
+        return True
+    TELEGRAM_SENDS.labels('failed').inc()
+    logging.error("Failed to send Telegram message")
+    return False
+
+def _get_detector():
+    """The process-wide price move detector, restored from its last snapshot on first use."""
+    global _detector
+    if _detector is None:
+        _detector = PriceMoveDetector(parse_windows(PRICE_MOVE_WINDOWS), snapshot_file=PRICE_SNAPSHOT_FILE)
+        restored = _detector.load(time.time())
+        if restored:
+            logging.info(f"Restored {restored} price samples from {PRICE_SNAPSHOT_FILE}")
+    return _detector
+
+def format_move_alert(move):
+    window = move.window if not move.window.replace('.', '', 1).isdigit() else f"{move.window}s"
+    return (f"⚡️ Gold price moved {move.direction} {abs(move.percent):.2f}% in {window}!\n"
+            f"From: {move.ref_price:.2f}\nNow: {move.price:.2f}")
 
 def check_and_alert_price_change():
-    """Check for big price changes and send Telegram alert if ±1% change detected."""
-    import os
-    last_price_file = "last_xauusd_price.txt"
+    """Poll the spot price and send a Telegram alert for every window whose threshold move completed."""
     current_price = get_xauusd_price()
     if current_price is None:
         return
-
-    # Load last price from file
-    if os.path.exists(last_price_file):
-        with open(last_price_file, "r") as f:
-            try:
-                last_price = float(f.read().strip())
-            except Exception:
-                last_price = current_price
-    else:
-        last_price = current_price
-
-    # Calculate percent change
-    if last_price > 0:
-        percent_change = ((current_price - last_price) / last_price) * 100
-        if abs(percent_change) >= 1:
-            direction = "up" if percent_change > 0 else "down"
-            msg = f"⚡️ Gold price moved {direction} {percent_change:.2f}%!\nPrev: {last_price:.2f}\nNow: {current_price:.2f}"
-            send_telegram_message(msg)
-            logging.info("Sent price-change Telegram alert")
-
-    # Save current price for next check
-    with open(last_price_file, "w") as f:
-        f.write(str(current_price))
+    for move in _get_detector().add(time.time(), current_price):
+        PRICE_MOVES.labels(move.window, move.direction).inc()
+        send_telegram_message(format_move_alert(move))
+        logging.info(f"Sent price-change Telegram alert ({move.window}, {move.percent:+.2f}%)")
 
 
 def send_market_status_message(status):